@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from config.admin_pagination import EstimatedCountPaginator
+from .models import User
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    list_display = ['email', 'name', 'role', 'is_active', 'date_joined']
+    list_filter = ['role', 'is_active', 'is_staff']
+    search_fields = ['email', 'name']
+    ordering = ['email']
+    fieldsets = BaseUserAdmin.fieldsets + (('Shop', {'fields': ['name', 'role']}),)
+    add_fieldsets = (
+        (None, {'classes': ['wide'], 'fields': ['email', 'username', 'name', 'role', 'password1', 'password2']}),
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 hasher whose work factor comes from settings.PBKDF2_ITERATIONS.
+
+    Uses the stock 'pbkdf2_sha256' algorithm name, so existing hashes keep
+    verifying and are rehashed on the next login when the cost changes.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
+
+
+def init_pool_worker(hashers, iterations):
+    """Run the parent's hasher settings in a spawned process; kept free of model imports so it unpickles before setup"""
+    import django
+    from django.contrib.auth.hashers import get_hashers
+    django.setup()
+    settings.PASSWORD_HASHERS = hashers
+    settings.PBKDF2_ITERATIONS = iterations
+    get_hashers.cache_clear()
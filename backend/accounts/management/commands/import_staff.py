@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.provisioning import import_staff, read_staff_csv
+
+
+class Command(BaseCommand):
+    help = 'Create cashier and admin accounts from a CSV with email,name,role,password columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--workers', type=int, help='Processes hashing passwords (default: all CPUs)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                rows = read_staff_csv(stream.read())
+        except (OSError, UnicodeDecodeError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        result = import_staff(rows, workers=options['workers'])
+        for error in result['errors']:
+            messages = '; '.join(f'{field}: {" ".join(map(str, problems))}' for field, problems in error['errors'].items())
+            self.stderr.write(f"line {error['line']} ({error['email']}): {messages}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result['created'])} user(s), {len(result['errors'])} row(s) rejected"
+        ))
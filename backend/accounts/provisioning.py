@@ -0,0 +1,141 @@
+"""Bulk staff provisioning from a CSV of users.
+
+Every row is validated first: fields, role and the password validators, plus
+emails repeated in the file or already registered (one query for the whole
+file). Password hashing is CPU bound and holds the GIL, so the passwords of
+the valid rows are hashed across a process pool, and the users are inserted
+with bulk_create.
+
+The pool is shared by every import in the process and bounded by
+STAFF_IMPORT_WORKERS. Its workers are spawned rather than forked, as a web
+worker is multi-threaded and holds database connections and locks that a
+forked child would inherit half-way. Large files belong in `manage.py
+import_staff` rather than a request.
+"""
+import csv
+import io
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .hashers import init_pool_worker
+from .models import User
+from .serializers import StaffRowSerializer
+
+COLUMNS = ['email', 'name', 'role', 'password']
+# Below this many passwords per worker a pool costs more than it saves
+MIN_PASSWORDS_PER_WORKER = 16
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def read_staff_csv(text):
+    """Parse CSV text with an email,name,role,password header into (file line, row dict) pairs; raise ValueError if malformed"""
+    reader = csv.DictReader(io.StringIO(text))
+    try:
+        missing = {'email', 'name', 'password'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f'Missing column(s): {", ".join(sorted(missing))}')
+        # line_num counts the blank lines the reader skips, so errors point at the right line
+        return [(reader.line_num, {key: (value or '') for key, value in row.items() if key in COLUMNS})
+                for row in reader]
+    except csv.Error as exc:
+        raise ValueError(f'Invalid CSV: {exc}')
+
+
+def validate_staff(rows):
+    """Split (line, row) pairs into (valid, errors); errors carry the file line number"""
+    valid, errors = [], []
+    seen = set()
+    for line, row in rows:
+        serializer = StaffRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'line': line, 'email': row.get('email', ''), 'errors': serializer.errors})
+            continue
+        data = dict(serializer.validated_data, email=User.objects.normalize_email(serializer.validated_data['email']))
+        if data['email'] in seen:
+            errors.append({'line': line, 'email': data['email'], 'errors': {'email': ['Duplicate email in file.']}})
+            continue
+        seen.add(data['email'])
+        valid.append((line, data))
+
+    existing = set(User.objects.filter(email__in=seen).values_list('email', flat=True))
+    taken = [(line, data) for line, data in valid if data['email'] in existing]
+    for line, data in taken:
+        errors.append({'line': line, 'email': data['email'], 'errors': {'email': ['User with this email already exists.']}})
+    return [(line, data) for line, data in valid if data['email'] not in existing], errors
+
+
+def get_pool():
+    """This process's hashing pool of STAFF_IMPORT_WORKERS spawned processes (all CPUs when unset)"""
+    global _pool, _pool_key
+    initargs = (list(settings.PASSWORD_HASHERS), getattr(settings, 'PBKDF2_ITERATIONS', None))
+    # A forked child cannot use its parent's pool, and workers keep the hasher settings they started with
+    key = (os.getpid(), repr(initargs))
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None and _pool_key[0] == os.getpid():
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.STAFF_IMPORT_WORKERS or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_pool_worker, initargs=initargs,
+            )
+            _pool_key = key
+        return _pool
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password() for every password, spread over up to `workers` processes of the shared pool"""
+    workers = min(
+        workers or settings.STAFF_IMPORT_WORKERS or os.cpu_count() or 1,
+        math.ceil(len(passwords) / MIN_PASSWORDS_PER_WORKER),
+    )
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    chunksize = math.ceil(len(passwords) / (workers * 4))
+    return list(get_pool().map(make_password, passwords, chunksize=chunksize))
+
+
+def import_staff(rows, workers=None):
+    """Create staff users from read_staff_csv() rows; return {'created': [...], 'errors': [...]}.
+
+    A row whose email is registered by someone else between validation and
+    insert is reported as an error instead of failing the whole import.
+    """
+    valid, errors = validate_staff(rows)
+    hashes = hash_passwords([data['password'] for _, data in valid], workers)
+    users = [
+        User(
+            username=data['email'], email=data['email'], name=data['name'],
+            role=data['role'], password=password,
+        )
+        for (_, data), password in zip(valid, hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=1000, ignore_conflicts=True)
+        # Salted hashes are unique, so they tell our rows from conflicting ones
+        inserted = {
+            (email, password): pk
+            for pk, email, password in User.objects.filter(email__in=[user.email for user in users])
+            .values_list('id', 'email', 'password')
+        }
+
+    created = []
+    for (line, data), user in zip(valid, users):
+        pk = inserted.get((user.email, user.password))
+        if pk is None:
+            errors.append({'line': line, 'email': user.email, 'errors': {'email': ['User with this email already exists.']}})
+        else:
+            created.append({'line': line, 'id': pk, 'email': user.email, 'name': user.name, 'role': user.role})
+    errors.sort(key=lambda error: error['line'])
+    return {'created': created, 'errors': errors}
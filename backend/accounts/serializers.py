@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.password_validation import validate_password
@@ -12,6 +13,8 @@ class LoginSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token['email'] = user.email
         token['role'] = user.role
+        if user.role == User.Role.CASHIER:
+            token.set_exp(lifetime=settings.TILL_REFRESH_TOKEN_LIFETIME)
         return token
 
 
@@ -61,3 +64,34 @@ class CashierSerializer(serializers.ModelSerializer):
             role=User.Role.CASHIER
         )
         return user
+
+
+class StaffRowSerializer(serializers.Serializer):
+    """One staff member from an import file"""
+    email = serializers.EmailField()
+    name = serializers.CharField(max_length=255)
+    role = serializers.ChoiceField(choices=[User.Role.CASHIER, User.Role.ADMIN], default=User.Role.CASHIER)
+    password = serializers.CharField(validators=[validate_password], trim_whitespace=False)
+
+    def to_internal_value(self, data):
+        # An empty role cell means the default
+        if not data.get('role'):
+            data = {key: value for key, value in data.items() if key != 'role'}
+        return super().to_internal_value(data)
+
+
+class StaffImportSerializer(serializers.Serializer):
+    """A staff CSV (email,name,role,password) as an uploaded file or as text"""
+
+    file = serializers.FileField(required=False)
+    csv = serializers.CharField(required=False, trim_whitespace=False)
+
+    def validate(self, attrs):
+        if ('file' in attrs) == ('csv' in attrs):
+            raise serializers.ValidationError("Send either a file or csv text")
+        if 'file' in attrs:
+            try:
+                attrs['csv'] = attrs.pop('file').read().decode('utf-8-sig')
+            except UnicodeDecodeError:
+                raise serializers.ValidationError({'file': ["File must be UTF-8 encoded CSV"]})
+        return attrs
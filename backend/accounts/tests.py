@@ -237,3 +237,396 @@ class TestCreateCashier:
         response = api_client.post(url, data, format='json')
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+STAFF_CSV = """email,name,role,password
+asha@shop.com,Asha,cashier,TillPass123!
+ravi@shop.com,Ravi,,TillPass123!
+meera@shop.com,Meera,admin,AdminPass123!
+asha@shop.com,Asha Again,cashier,TillPass123!
+admin@test.com,Taken,cashier,TillPass123!
+weak@shop.com,Weak,cashier,123
+bad-email,Bad,cashier,TillPass123!
+cust@shop.com,Customer,customer,TillPass123!
+"""
+
+
+@pytest.mark.django_db
+class TestStaffImport:
+    """Tests for bulk staff provisioning from CSV"""
+
+    def test_admin_imports_staff_with_row_errors(self, admin_client):
+        """Valid rows are created; every other row comes back with its line and reason"""
+        from accounts.models import User
+
+        response = admin_client.post(reverse('staff-import'), {'csv': STAFF_CSV}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [(row['line'], row['email'], row['role']) for row in response.data['created']] == [
+            (2, 'asha@shop.com', 'cashier'), (3, 'ravi@shop.com', 'cashier'), (4, 'meera@shop.com', 'admin'),
+        ]
+        errors = {error['line']: error['errors'] for error in response.data['errors']}
+        assert list(errors) == [5, 6, 7, 8, 9]
+        assert 'Duplicate' in str(errors[5]['email'])
+        assert 'already exists' in str(errors[6]['email'])
+        assert 'password' in errors[7] and 'email' in errors[8] and 'role' in errors[9]
+        assert User.objects.get(email='meera@shop.com').check_password('AdminPass123!')
+
+    def test_imported_cashier_can_log_in(self, admin_client, api_client):
+        admin_client.post(reverse('staff-import'), {'csv': STAFF_CSV}, format='json')
+        api_client.credentials()
+
+        response = api_client.post(reverse('login'), {'email': 'ravi@shop.com', 'password': 'TillPass123!'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_file_upload(self, admin_client):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        upload = SimpleUploadedFile('staff.csv', ('\ufeff' + STAFF_CSV).encode(), content_type='text/csv')
+
+        response = admin_client.post(reverse('staff-import'), {'file': upload}, format='multipart')
+
+        assert len(response.data['created']) == 3
+
+    def test_bad_requests(self, admin_client, settings):
+        url = reverse('staff-import')
+        settings.STAFF_IMPORT_MAX_ROWS = 3
+
+        missing_column = admin_client.post(url, {'csv': 'email,name\na@b.com,A\n'}, format='json')
+        too_many = admin_client.post(url, {'csv': STAFF_CSV}, format='json')
+        nothing = admin_client.post(url, {}, format='json')
+
+        assert 'password' in missing_column.data['error']
+        assert too_many.status_code == nothing.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_customer_cannot_import_staff(self, customer_client):
+        response = customer_client.post(reverse('staff-import'), {'csv': STAFF_CSV}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_hashing_in_a_process_pool(self, settings):
+        """Hashes made by pool workers use the parent's hasher settings and verify"""
+        from django.contrib.auth.hashers import check_password
+        from accounts.provisioning import MIN_PASSWORDS_PER_WORKER, hash_passwords
+        settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['default']
+        settings.PBKDF2_ITERATIONS = 1000
+        passwords = [f'Password{i}!' for i in range(2 * MIN_PASSWORDS_PER_WORKER)]
+
+        hashes = hash_passwords(passwords, workers=2)
+
+        assert all(password.startswith('pbkdf2_sha256$1000$') for password in hashes)
+        assert len(set(hashes)) == len(hashes)
+        assert check_password(passwords[5], hashes[5]) and not check_password(passwords[5], hashes[6])
+
+    def test_hashing_pool_is_spawned_and_shared(self):
+        """Imports share one pool whose workers are spawned, not forked from a threaded web worker"""
+        from accounts.provisioning import get_pool
+
+        pool = get_pool()
+
+        assert get_pool() is pool
+        assert pool._mp_context.get_start_method() == 'spawn'
+
+    def test_error_lines_count_blank_lines(self, admin_client):
+        """Reported lines are file lines, also after blank lines the CSV reader skips"""
+        text = 'email,name,role,password\n\nasha@shop.com,Asha,cashier,TillPass123!\n\n\nbad-email,Bad,cashier,TillPass123!\n'
+
+        response = admin_client.post(reverse('staff-import'), {'csv': text}, format='json')
+
+        assert [row['line'] for row in response.data['created']] == [3]
+        assert [error['line'] for error in response.data['errors']] == [6]
+
+    def test_conflicting_insert_is_reported(self, admin_user, monkeypatch):
+        """An email registered between validation and insert becomes a row error"""
+        from accounts import provisioning
+        from accounts.models import User
+        validate = provisioning.validate_staff
+
+        def validate_then_register(rows):
+            result = validate(rows)
+            User.objects.create_user(username='ravi@shop.com', email='ravi@shop.com', name='Ravi', password='x')
+            return result
+        monkeypatch.setattr(provisioning, 'validate_staff', validate_then_register)
+
+        result = provisioning.import_staff(provisioning.read_staff_csv(STAFF_CSV))
+
+        assert [row['email'] for row in result['created']] == ['asha@shop.com', 'meera@shop.com']
+        assert result['errors'][0]['line'] == 3
+        assert 'already exists' in str(result['errors'][0]['errors'])
+
+    def test_import_staff_command(self, admin_user, tmp_path):
+        from django.core.management import call_command
+        from accounts.models import User
+        path = tmp_path / 'staff.csv'
+        path.write_text(STAFF_CSV)
+
+        call_command('import_staff', str(path), workers=1)
+
+        assert set(User.objects.filter(role='cashier').values_list('email', flat=True)) == {'asha@shop.com', 'ravi@shop.com'}
+
+
+@pytest.mark.django_db
+class TestUserAdmin:
+    def test_changelist_queries_do_not_grow_with_users(self, admin_user):
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import CaptureQueriesContext
+        from .models import User
+        client = Client()
+        client.force_login(User.objects.create_superuser(
+            username='root@test.com', email='root@test.com', name='Root', password='RootPass123!'
+        ))
+
+        def page_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(reverse('admin:accounts_user_changelist'), {'q': 'test.com'})
+            assert response.status_code == 200
+            return len(context.captured_queries)
+
+        few = page_queries()
+        for i in range(30):
+            User.objects.create_user(username=f'u{i}@test.com', email=f'u{i}@test.com', name=f'U{i}', password='x')
+
+        assert page_queries() == few
+
+
+class TestTokenBucketStore:
+    """Tests for the in-memory token bucket store"""
+
+    def test_allows_burst_then_blocks(self):
+        """Bucket allows `capacity` requests then reports a wait"""
+        from accounts.throttling import LocalBucketStore
+        now = [0.0]
+        store = LocalBucketStore(timer=lambda: now[0])
+
+        results = [store.consume('k', 3, 1.0) for _ in range(4)]
+
+        assert results[:3] == [0, 0, 0]
+        assert results[3] == pytest.approx(1.0)
+
+    def test_refills_over_time(self):
+        """Tokens refill at the configured rate"""
+        from accounts.throttling import LocalBucketStore
+        now = [0.0]
+        store = LocalBucketStore(timer=lambda: now[0])
+        store.consume('k', 1, 0.5)
+
+        assert store.consume('k', 1, 0.5) == pytest.approx(2.0)
+        now[0] = 2.0
+        assert store.consume('k', 1, 0.5) == 0
+
+    def test_evicts_least_recently_used_keys(self):
+        """Store stays bounded under many distinct keys"""
+        from accounts.throttling import LocalBucketStore
+        store = LocalBucketStore(max_keys=2)
+
+        for key in ('a', 'b', 'c'):
+            store.consume(key, 1, 1.0)
+
+        assert list(store._buckets) == ['b', 'c']
+
+
+@pytest.mark.django_db
+class TestThrottling:
+    """Tests for login, register and purchase throttles"""
+
+    def test_login_throttled_per_account(self, api_client, settings, monkeypatch):
+        """Repeated logins against one email get a 429 without checking the password"""
+        from django.contrib.auth.backends import ModelBackend
+        from rest_framework.settings import api_settings
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'login_account', '2/min')
+        url = reverse('login')
+        data = {'email': 'victim@example.com', 'password': 'Guess123!'}
+        api_client.post(url, data, format='json')
+        api_client.post(url, data, format='json')
+
+        calls = []
+        monkeypatch.setattr(ModelBackend, 'authenticate', lambda *args, **kwargs: calls.append(1))
+        response = api_client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 'Retry-After' in response
+        assert calls == []
+
+    def test_login_throttle_is_per_email(self, api_client, monkeypatch):
+        """A throttled email does not block logins for other accounts"""
+        from rest_framework.settings import api_settings
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'login_account', '1/min')
+        url = reverse('login')
+        api_client.post(url, {'email': 'a@example.com', 'password': 'x'}, format='json')
+
+        blocked = api_client.post(url, {'email': 'A@example.com', 'password': 'x'}, format='json')
+        other = api_client.post(url, {'email': 'b@example.com', 'password': 'x'}, format='json')
+
+        assert blocked.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert other.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_login_throttle_cannot_lock_out_account_owner(self, api_client, create_user, monkeypatch):
+        """Failed logins from other IPs do not use up the owner's login budget"""
+        from rest_framework.settings import api_settings
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'login_account', '10/min')
+        user_data = create_user()
+        url = reverse('login')
+        for i in range(11):
+            api_client.post(url, {'email': user_data['email'], 'password': 'Wrong123!'}, format='json',
+                            REMOTE_ADDR=f'10.0.0.{i + 1}')
+
+        response = api_client.post(url, {'email': user_data['email'], 'password': user_data['password']},
+                                   format='json', REMOTE_ADDR='10.0.1.1')
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_login_throttle_key_is_safe_for_any_email(self, api_client, monkeypatch):
+        """Emails with spaces or control characters still make valid cache keys"""
+        from types import SimpleNamespace
+        from django.core.cache.backends.base import memcache_key_warnings
+        from accounts.throttling import LoginAccountThrottle
+        request = SimpleNamespace(data={'email': 'a b\x00@example.com'}, headers={}, META={'REMOTE_ADDR': '10.0.0.1'})
+
+        key = LoginAccountThrottle().get_cache_key(request, None)
+
+        assert list(memcache_key_warnings(f'throttle:login_account:{key}')) == []
+
+    def test_register_throttled_per_ip(self, api_client, monkeypatch):
+        """Registration is limited per client IP"""
+        from rest_framework.settings import api_settings
+        from accounts.models import User
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'register_ip', '1/min')
+        url = reverse('register')
+        api_client.post(url, {'name': 'One', 'email': 'one@example.com', 'password': 'SecurePass123!'}, format='json')
+
+        response = api_client.post(url, {'name': 'Two', 'email': 'two@example.com', 'password': 'SecurePass123!'}, format='json')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert not User.objects.filter(email='two@example.com').exists()
+
+    def test_purchase_throttled_per_user(self, customer_client, monkeypatch):
+        """Purchases are limited per authenticated user"""
+        from rest_framework.settings import api_settings
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'purchase_user', '1/min')
+        url = reverse('purchase')
+        customer_client.post(url, {'sku_id': 99999, 'quantity': 1}, format='json')
+
+        response = customer_client.post(url, {'sku_id': 99999, 'quantity': 1}, format='json')
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+    def test_throttle_disabled_when_rate_is_none(self, api_client, monkeypatch):
+        """A rate of None turns the throttle off"""
+        from rest_framework.settings import api_settings
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'login_account', None)
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, 'login_ip', None)
+        url = reverse('login')
+
+        for _ in range(15):
+            response = api_client.post(url, {'email': 'a@example.com', 'password': 'x'}, format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_shared_cache_store(self, settings):
+        """Buckets can live in a shared Django cache"""
+        from accounts.throttling import CacheBucketStore
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        store = CacheBucketStore('default', timer=lambda: 100.0)
+
+        assert store.consume('k', 1, 1.0) == 0
+        assert store.consume('k', 1, 1.0) == pytest.approx(1.0)
+
+    def test_shared_cache_store_clear_keeps_other_entries(self, settings):
+        """Clearing the buckets leaves sessions and catalog entries in the shared cache"""
+        from django.core.cache import caches
+        from accounts.throttling import CacheBucketStore
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        store = CacheBucketStore('default', timer=lambda: 100.0)
+        caches['default'].set('session:abc', 'kept')
+        store.consume('k', 1, 1.0)
+
+        store.clear()
+
+        assert caches['default'].get('session:abc') == 'kept'
+        assert caches['default'].get('k') is None
+
+
+@pytest.mark.django_db
+class TestPasswordHashing:
+    """Tests for hasher profiles and rehash-on-login"""
+
+    def test_login_rehashes_with_preferred_hasher(self, api_client, settings):
+        """Existing hashes are upgraded to the profile's preferred hasher on login"""
+        from accounts.models import User
+        settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['default']
+        settings.PBKDF2_ITERATIONS = 1000
+        user = User.objects.create_user(username='c@test.com', email='c@test.com', name='C', password='TillPass123!')
+        assert user.password.startswith('pbkdf2_sha256$')
+
+        settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['fast']
+        response = api_client.post(reverse('login'), {'email': 'c@test.com', 'password': 'TillPass123!'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert user.password.startswith('md5$')
+
+    def test_login_rehashes_when_iterations_change(self, api_client, settings):
+        """Changing PBKDF2_ITERATIONS upgrades hashes transparently"""
+        from accounts.models import User
+        settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['default']
+        settings.PBKDF2_ITERATIONS = 1000
+        user = User.objects.create_user(username='c@test.com', email='c@test.com', name='C', password='TillPass123!')
+
+        settings.PBKDF2_ITERATIONS = 2000
+        response = api_client.post(reverse('login'), {'email': 'c@test.com', 'password': 'TillPass123!'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$2000$')
+
+
+@pytest.mark.django_db
+class TestTillRefresh:
+    """Tests for the long-lived till refresh token flow"""
+
+    def _login(self, api_client, role):
+        from accounts.models import User
+        User.objects.create_user(username='till@test.com', email='till@test.com', name='Till', password='TillPass123!', role=role)
+        response = api_client.post(reverse('login'), {'email': 'till@test.com', 'password': 'TillPass123!'}, format='json')
+        return response.data['refresh']
+
+    def test_cashier_refresh_token_is_long_lived(self, api_client, settings):
+        """Cashier logins receive a refresh token with the till lifetime"""
+        from rest_framework_simplejwt.tokens import RefreshToken
+        refresh = RefreshToken(self._login(api_client, 'cashier'))
+
+        lifetime = refresh['exp'] - refresh['iat']
+
+        assert lifetime == settings.TILL_REFRESH_TOKEN_LIFETIME.total_seconds()
+
+    def test_customer_refresh_token_uses_default_lifetime(self, api_client, settings):
+        """Other roles keep the default refresh lifetime"""
+        from rest_framework_simplejwt.tokens import RefreshToken
+        refresh = RefreshToken(self._login(api_client, 'customer'))
+
+        lifetime = refresh['exp'] - refresh['iat']
+
+        assert lifetime == settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds()
+
+    def test_refresh_issues_access_token_without_password(self, api_client, monkeypatch):
+        """Refreshing skips authentication backends entirely"""
+        from django.contrib.auth.backends import ModelBackend
+        refresh = self._login(api_client, 'cashier')
+        calls = []
+        monkeypatch.setattr(ModelBackend, 'authenticate', lambda *args, **kwargs: calls.append(1))
+
+        response = api_client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'access' in response.data
+        assert calls == []
+
+    def test_refreshed_access_token_keeps_role(self, api_client):
+        """Access tokens from a refresh carry the role claim"""
+        from rest_framework_simplejwt.tokens import AccessToken
+        refresh = self._login(api_client, 'cashier')
+
+        response = api_client.post(reverse('token-refresh'), {'refresh': refresh}, format='json')
+
+        assert AccessToken(response.data['access'])['role'] == 'cashier'
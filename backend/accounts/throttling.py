@@ -0,0 +1,210 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse a DRF style rate ('10/min') into (capacity, refill per second)"""
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """In-process token buckets, O(1) per check with LRU eviction of idle keys"""
+
+    def __init__(self, max_keys=10000, timer=time.monotonic):
+        self.max_keys = max_keys
+        self.timer = timer
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        """Take one token; return 0 if allowed, otherwise seconds until a token is free"""
+        with self._lock:
+            now = self.timer()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens, stamp = bucket
+                tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill_rate
+
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Token buckets kept in a shared Django cache so all workers see one budget.
+
+    The read-modify-write is not atomic; concurrent requests for the same key
+    may occasionally both get through, which is acceptable for abuse limiting.
+    """
+
+    def __init__(self, alias, timer=time.time, max_keys=10000):
+        self.cache = caches[alias]
+        self.timer = timer
+        self.max_keys = max_keys
+        # Keys this store wrote, so clear() leaves the rest of a shared cache alone
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = self.timer()
+        bucket = self.cache.get(key)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens, stamp = bucket
+            tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - tokens) / refill_rate
+
+        # A full refill means the bucket no longer needs to be stored
+        self.cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            if len(self._keys) > self.max_keys:
+                # The oldest buckets have expired from the cache by now
+                self._keys.popitem(last=False)
+        return wait
+
+    def clear(self):
+        """Drop the buckets this store wrote, not the other entries of the cache"""
+        with self._lock:
+            self.cache.delete_many(list(self._keys))
+            self._keys.clear()
+
+
+_store = None
+
+
+def get_bucket_store():
+    """Return the configured bucket store (shared cache if THROTTLE_CACHE_ALIAS is set)"""
+    global _store
+    if _store is None:
+        alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', None)
+        _store = CacheBucketStore(alias) if alias else LocalBucketStore()
+    return _store
+
+
+def reset_bucket_store():
+    """Drop all buckets and re-read the store configuration"""
+    global _store
+    if _store is not None:
+        _store.clear()
+    _store = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket throttle configured from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].
+
+    A rate of '10/min' allows a burst of 10 requests and refills one token
+    every 6 seconds. Checks never touch the database or hash passwords, so
+    rejected requests stay cheap.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(self.scope))
+        self._wait = 0
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        capacity, refill_rate = self.rate
+        self._wait = get_bucket_store().consume(f'throttle:{self.scope}:{key}', capacity, refill_rate)
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Bucket per client IP"""
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Bucket per authenticated user"""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountThrottle(TokenBucketThrottle):
+    """Bucket per client IP and targeted email.
+
+    Keyed on both so that failed guesses from other IPs cannot lock the owner
+    out of their own account; LoginIPThrottle bounds how many accounts one IP
+    can try. The email is hashed, as raw input may not be a valid cache key.
+    """
+
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+        return f'{self.get_ident(request)}:{digest}'
+
+
+class RefreshIPThrottle(IPThrottle):
+    scope = 'refresh_ip'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class PurchaseIPThrottle(IPThrottle):
+    scope = 'purchase_ip'
+
+
+class PurchaseUserThrottle(UserThrottle):
+    scope = 'purchase_user'
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import RegisterView, LoginView, CreateCashierView
+from .views import RegisterView, LoginView, RefreshView, CreateCashierView, StaffImportView
 
 urlpatterns = [
     path('register', RegisterView.as_view(), name='register'),
     path('login', LoginView.as_view(), name='login'),
+    path('refresh', RefreshView.as_view(), name='token-refresh'),
     path('cashiers', CreateCashierView.as_view(), name='create-cashier'),
+    path('staff/import', StaffImportView.as_view(), name='staff-import'),
 ]
@@ -1,9 +1,11 @@
+from django.conf import settings
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated, BasePermission
-from rest_framework_simplejwt.views import TokenObtainPairView
-from .serializers import RegisterSerializer, LoginSerializer, CashierSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .serializers import RegisterSerializer, LoginSerializer, CashierSerializer, StaffImportSerializer
+from .throttling import LoginIPThrottle, LoginAccountThrottle, RefreshIPThrottle, RegisterIPThrottle
 
 
 class IsAdminUser(BasePermission):
@@ -13,10 +15,18 @@ class IsAdminUser(BasePermission):
         return request.user and request.user.is_authenticated and request.user.role == 'admin'
 
 
+class IsStaffUser(BasePermission):
+    """Permission class that only allows cashiers and admins"""
+
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and request.user.role in ('cashier', 'admin')
+
+
 class RegisterView(APIView):
     """Customer registration endpoint"""
 
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle]
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -30,9 +40,17 @@ class LoginView(TokenObtainPairView):
     """User login endpoint"""
 
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
     serializer_class = LoginSerializer
 
 
+class RefreshView(TokenRefreshView):
+    """Exchange a refresh token for a new access token without a password check"""
+
+    permission_classes = [AllowAny]
+    throttle_classes = [RefreshIPThrottle]
+
+
 class CreateCashierView(APIView):
     """Create cashier account - admin only"""
 
@@ -44,3 +62,31 @@ class CreateCashierView(APIView):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class StaffImportView(APIView):
+    """Create cashier and admin accounts in bulk from a CSV - admin only.
+
+    Valid rows are created even when other rows fail; the response lists
+    both, with the file line of each.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        from .provisioning import import_staff, read_staff_csv
+
+        serializer = StaffImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows = read_staff_csv(serializer.validated_data['csv'])
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.STAFF_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f'At most {settings.STAFF_IMPORT_MAX_ROWS} rows per import'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(import_staff(rows))
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from django.urls import reverse
+
+DETAILS = 8
+RTTS_MS = [50, 150, 300]
+
+
+class SlowNetworkClient:
+    """Adds one simulated network round trip to every call of a test client"""
+
+    def __init__(self, client, rtt_ms):
+        self.client = client
+        self.rtt = rtt_ms / 1000
+
+    def get(self, *args, **kwargs):
+        time.sleep(self.rtt)
+        return self.client.get(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        time.sleep(self.rtt)
+        return self.client.post(*args, **kwargs)
+
+
+@pytest.fixture
+def catalog(db):
+    from items.models import Item, SKU
+    items = Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=1000) for i in range(40)
+    )
+    SKU.objects.bulk_create(
+        SKU(item=item, code=f'S-{item.id}-{size}', unit_value=size, price=2500 * size) for item in items for size in (1, 6)
+    )
+
+
+def _home_and_details_separately(client):
+    """What the frontend does today: the list, then one call per item shown"""
+    items = client.get(reverse('list-items')).data
+    return [client.get(reverse('item-detail', args=[item['id']])).data for item in items[:DETAILS]]
+
+
+def _home_and_details_batched(client):
+    """The list, then every detail in one batch"""
+    items = client.get(reverse('list-items')).data
+    requests = [{'path': f"/api/items/{item['id']}"} for item in items[:DETAILS]]
+    responses = client.post(reverse('batch'), {'requests': requests}, format='json').data['responses']
+    return [response['body'] for response in responses]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('rtt_ms', RTTS_MS)
+def test_high_rtt_page_load(catalog, rtt_ms):
+    """Page load time for a client RTT_MS away: one call per resource vs a batch"""
+    from rest_framework.test import APIClient
+    client = SlowNetworkClient(APIClient(), rtt_ms)
+
+    start = time.perf_counter()
+    separate = _home_and_details_separately(client)
+    separate_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    batched = _home_and_details_batched(client)
+    batched_ms = (time.perf_counter() - start) * 1000
+
+    assert batched == separate
+    print(f"\nRTT {rtt_ms:3} ms  list + {DETAILS} details: separate {separate_ms:5.0f} ms ({DETAILS + 1} round trips)  "
+          f"batched {batched_ms:5.0f} ms (2 round trips)  {separate_ms / batched_ms:.1f}x")
+    assert batched_ms < separate_ms
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('workers', [1, 4])
+def test_batch_server_time(catalog, settings, workers):
+    """Server time of a 20-read batch, sequential vs on worker threads"""
+    from rest_framework.test import APIClient
+    from items.models import Item
+    settings.BATCH_WORKERS = workers
+    client = APIClient()
+    requests = [{'path': f'/api/items/{pk}'} for pk in Item.objects.values_list('id', flat=True)[:20]]
+    client.post(reverse('batch'), {'requests': requests}, format='json')
+
+    start = time.perf_counter()
+    for _ in range(20):
+        response = client.post(reverse('batch'), {'requests': requests}, format='json')
+    elapsed = (time.perf_counter() - start) / 20 * 1000
+
+    assert all(r['status'] == 200 for r in response.data['responses'])
+    print(f"\n{workers} worker(s): 20-read batch {elapsed:.1f} ms server time")
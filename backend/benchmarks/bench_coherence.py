@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+from django.urls import reverse
+
+CHANGES = int(os.getenv('BENCH_COHERENCE_CHANGES', '200000'))
+ITEMS = 50
+CALLS = 2000
+
+
+def _per_call_us(func, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+@pytest.fixture
+def weight_catalog(db):
+    """ITEMS weight items with three packs each, behind a change log of CHANGES rows"""
+    from items.models import CatalogChange, Item, SKU
+    Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category='dry', sale_type='weight', inventory_qty=10**9) for i in range(ITEMS)
+    )
+    items = list(Item.objects.order_by('id'))
+    SKU.objects.bulk_create(
+        SKU(item=item, code=f'S-{item.id}-{grams}', unit_value=grams, price=grams * 180) for item in items
+        for grams in (250, 500, 1000)
+    )
+    CatalogChange.objects.bulk_create(
+        (CatalogChange(kind='item', object_id=items[i % ITEMS].id) for i in range(CHANGES)), batch_size=5000
+    )
+    return items
+
+
+def test_check_cost(weight_catalog, settings):
+    """check() with nothing new, against a long change log"""
+    from items.coherence import check
+    from items.pricing import price_weight
+    price_weight(weight_catalog[0].id, 1000)
+    idle_us = _per_call_us(check)
+    settings.CATALOG_COHERENCE_SECONDS = 60
+    interval_us = _per_call_us(check)
+    print(f"\n{CHANGES} logged changes  check per request {idle_us:.1f} us  within a 60 s interval {interval_us:.2f} us")
+
+
+def test_request_overhead(weight_catalog, settings):
+    """Weight price requests with the check on every request vs once a minute"""
+    from rest_framework.test import APIClient
+    from items.pricing import price_weight
+    api_client = APIClient()
+    urls = [reverse('weight-price', args=[item.id]) for item in weight_catalog]
+    for item in weight_catalog:
+        price_weight(item.id, 1000)
+
+    def requests():
+        for url in urls:
+            assert api_client.get(url, {'grams': 700}).status_code == 200
+
+    # Alternating rounds, best of each, to keep machine noise out of a difference this small
+    every, interval = [], []
+    for _ in range(5):
+        settings.CATALOG_COHERENCE_SECONDS = 0
+        every.append(_per_call_us(requests, 4) / len(urls))
+        settings.CATALOG_COHERENCE_SECONDS = 60
+        interval.append(_per_call_us(requests, 4) / len(urls))
+    every_us, interval_us = min(every), min(interval)
+    print(f"\nweight price request: check every request {every_us:.0f} us  once a minute {interval_us:.0f} us  "
+          f"overhead {every_us - interval_us:.0f} us")
+
+
+def test_invalidation_cost(weight_catalog):
+    """An SKU change elsewhere: the check that drops every table, then rebuilding them"""
+    from items.coherence import check
+    from items.models import CatalogChange
+    from items.pricing import price_weight
+    from items.sync import record_changes
+    for item in weight_catalog:
+        price_weight(item.id, 1000)
+
+    record_changes(CatalogChange.Kind.SKU, [1])
+    start = time.perf_counter()
+    kinds = check()
+    check_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for item in weight_catalog:
+        price_weight(item.id, 1000)
+    rebuild_ms = (time.perf_counter() - start) * 1000
+
+    assert kinds == {'sku'}
+    print(f"\nSKU change: check {check_ms:.2f} ms  rebuild {ITEMS} tables {rebuild_ms:.1f} ms")
@@ -0,0 +1,99 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+# 100M rows needs about 5 GB of disk; the default keeps the run short
+ROWS = int(os.getenv('BENCH_COLUMNAR_ROWS', '20000000'))
+SKUS = 500
+DAYS = 3 * 365
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def _build_segment(path, rows):
+    """Write a synthetic, time-ordered segment chunk by chunk without holding it in memory"""
+    from items.columnar import CHUNK_ROWS, COLUMNS, to_micros
+    path.mkdir()
+    columns = {
+        name: np.lib.format.open_memmap(path / f'{name}.npy', mode='w+', dtype=dtype, shape=(rows,))
+        for name, dtype in COLUMNS.items()
+    }
+    rng = np.random.default_rng(1)
+    first = to_micros(START)
+    step = DAYS * 86_400_000_000 // rows
+    for offset in range(0, rows, CHUNK_ROWS):
+        n = min(CHUNK_ROWS, rows - offset)
+        index = np.arange(offset, offset + n, dtype=np.int64)
+        columns['id'][offset:offset + n] = index + 1
+        columns['user_id'][offset:offset + n] = rng.integers(1, 1000, n)
+        columns['sku_id'][offset:offset + n] = rng.integers(1, SKUS + 1, n)
+        quantity = rng.integers(1, 5, n)
+        columns['quantity'][offset:offset + n] = quantity
+        columns['price_paise'][offset:offset + n] = quantity * 45000
+        columns['created_at'][offset:offset + n] = first + index * step
+    for column in columns.values():
+        column.flush()
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def test_segment_aggregates(tmp_path):
+    """Aggregates over a large memory-mapped segment"""
+    from items.columnar import Segment
+    _, build_ms = _timed(_build_segment, tmp_path / 'segment', ROWS)
+    segment, open_ms = _timed(Segment, tmp_path / 'segment')
+    print(f"\n{ROWS} rows  built in {build_ms / 1000:.1f} s  opened in {open_ms:.2f} ms")
+
+    month = (START + timedelta(days=400), START + timedelta(days=430))
+    for label, func, args in [
+        ('by day, one month', segment.sales_by_day, month),
+        ('by sku, one month', segment.sales_by_sku, month),
+        ('by day, all', segment.sales_by_day, ()),
+        ('by sku, all', segment.sales_by_sku, ()),
+    ]:
+        result, ms = _timed(func, *args)
+        rows = segment.between(*args) if args else slice(0, ROWS)
+        print(f"{label:18} {ms:9.1f} ms  {(rows.stop - rows.start) / ms / 1000:7.1f} M rows/s  {len(result[0])} groups")
+        assert int(result[-2].sum()) == int(segment.column('quantity')[rows].sum())
+
+
+@pytest.mark.django_db
+def test_orm_vs_segment(tmp_path, admin_user):
+    """Per-SKU totals through ORM instances, a database GROUP BY and a segment"""
+    from django.db.models import Sum
+    from items.archive import FIELDS
+    from items.columnar import Segment, write_segment
+    from items.models import Item, SKU, Purchase
+    n = 500_000
+    item = Item.objects.create(name='Sweet', category='milk', sale_type='count', inventory_qty=10**9)
+    skus = [SKU.objects.create(item=item, code=f'S-{i}', unit_value=1, price=45000) for i in range(50)]
+    for chunk in range(0, n, 10000):
+        Purchase.objects.bulk_create(
+            Purchase(user=admin_user, sku=skus[i % 50], quantity=1 + i % 4, total_price=45000 * (1 + i % 4),
+                     created_at=START + timedelta(seconds=i * 60))
+            for i in range(chunk, chunk + 10000)
+        )
+    write_segment(tmp_path / 'segment', Purchase.objects.values_list(*FIELDS).iterator(chunk_size=10000))
+
+    def instances():
+        totals = {}
+        for purchase in Purchase.objects.all().iterator(chunk_size=10000):
+            totals[purchase.sku_id] = totals.get(purchase.sku_id, 0) + purchase.total_price
+        return totals
+
+    def group_by():
+        return dict(Purchase.objects.values_list('sku_id').annotate(Sum('total_price')).order_by())
+
+    orm, instances_ms = _timed(instances)
+    grouped, group_ms = _timed(group_by)
+    (sku_ids, _, revenue), segment_ms = _timed(Segment(tmp_path / 'segment').sales_by_sku)
+    print(f"\n{n} rows  ORM instances {instances_ms:8.1f} ms  GROUP BY {group_ms:7.1f} ms  segment {segment_ms:6.1f} ms")
+
+    assert orm == dict(zip(sku_ids.tolist(), revenue.tolist()))
+    assert grouped.keys() == orm.keys()
@@ -0,0 +1,58 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+CLIENTS = 32
+PURCHASES_PER_CLIENT = 15
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('group_commit', [False, True])
+def test_purchase_throughput(settings, group_commit):
+    """Throughput and latency of concurrent purchases, per-request vs group commit"""
+    from accounts.models import User
+    from items.models import Item, SKU, Purchase
+    from items.purchasing import get_dispatcher, reset_dispatcher
+    from rest_framework_simplejwt.tokens import AccessToken
+    settings.PURCHASE_GROUP_COMMIT = group_commit
+    reset_dispatcher()
+    user = User.objects.create_user(username='b@b.com', email='b@b.com', name='B', password='x', role='customer')
+    token = str(AccessToken.for_user(user))
+    skus = []
+    for i in range(4):
+        item = Item.objects.create(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=10**6)
+        skus.append(SKU.objects.create(item=item, code=f'S-{i}', unit_value=1, price=1000).id)
+
+    def client_loop(n):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        latencies = []
+        try:
+            for i in range(PURCHASES_PER_CLIENT):
+                start = time.perf_counter()
+                response = client.post(reverse('purchase'), {'sku_id': skus[(n + i) % 4], 'quantity': 1}, format='json')
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 201
+        finally:
+            connection.close()
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        latencies = [ms for result in pool.map(client_loop, range(CLIENTS)) for ms in result]
+    elapsed = time.perf_counter() - start
+    batches = get_dispatcher().batches if group_commit else len(latencies)
+    reset_dispatcher()
+
+    total = CLIENTS * PURCHASES_PER_CLIENT
+    assert Purchase.objects.count() == total
+    assert sum(Item.objects.values_list('inventory_qty', flat=True)) == 4 * 10**6 - total
+    latencies.sort()
+    print(f"\ngroup_commit={group_commit!s:5} {total / elapsed:7.1f} purchases/s  "
+          f"p50 {statistics.median(latencies):6.1f} ms  p99 {latencies[int(len(latencies) * 0.99)]:6.1f} ms  "
+          f"{batches} transactions")
@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+
+HOLDS = 100_000
+ITEMS = 1000
+
+
+def _timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+@pytest.fixture
+def held_catalog(admin_user):
+    """ITEMS items with HOLDS active holds spread over them"""
+    from items.models import Item, SKU, StockHold
+    Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=10**6, held_qty=HOLDS // ITEMS)
+        for i in range(ITEMS)
+    )
+    items = list(Item.objects.order_by('id'))
+    SKU.objects.bulk_create(SKU(item=item, code=f'S-{item.id}', unit_value=1, price=2500) for item in items)
+    skus = list(SKU.objects.order_by('item_id'))
+    now = timezone.now()
+    for chunk in range(0, HOLDS, 10000):
+        StockHold.objects.bulk_create(
+            StockHold(
+                user=admin_user, item=items[i % ITEMS], sku=skus[i % ITEMS], quantity=1, units=1,
+                expires_at=now + timedelta(minutes=1 + i % 10),
+            )
+            for i in range(chunk, chunk + 10000)
+        )
+    return items, skus
+
+
+@pytest.mark.django_db
+def test_availability_with_active_holds(held_catalog, bench_customer):
+    """Available stock from the held_qty counter vs summing the item's holds"""
+    from items.models import Item, StockHold
+    items, _ = held_catalog
+    item = items[ITEMS // 2]
+
+    counter, counter_ms = _timed(lambda: Item.objects.get(pk=item.pk).available_qty, 200)
+    summed, sum_ms = _timed(
+        lambda: item.inventory_qty - (StockHold.objects.filter(item=item, expires_at__gt=timezone.now())
+                                      .aggregate(Sum('units'))['units__sum'] or 0), 200
+    )
+    _, detail_ms = _timed(lambda: bench_customer.get(reverse('item-detail', args=[item.pk])), 200)
+
+    print(f"\n{HOLDS} holds  available: counter {counter_ms:.3f} ms  sum of holds {sum_ms:.3f} ms  "
+          f"item detail request {detail_ms:.2f} ms")
+    assert counter == summed
+
+
+@pytest.mark.django_db
+def test_hold_and_purchase(held_catalog, bench_customer):
+    """Creating a hold and turning it into a purchase with HOLDS holds active"""
+    _, skus = held_catalog
+
+    start = time.perf_counter()
+    hold_ids = [
+        bench_customer.post(reverse('stock-holds'), {'sku_id': skus[i].id, 'quantity': 1}, format='json').data['id']
+        for i in range(20)
+    ]
+    hold_ms = (time.perf_counter() - start) / 20 * 1000
+    start = time.perf_counter()
+    for hold_id in hold_ids:
+        response = bench_customer.post(reverse('stock-hold-purchase', args=[hold_id]))
+    buy_ms = (time.perf_counter() - start) / 20 * 1000
+
+    assert response.status_code == 201
+    print(f"\nhold request {hold_ms:.2f} ms  purchase from hold {buy_ms:.2f} ms")
+
+
+@pytest.mark.django_db
+def test_expiry_sweep(held_catalog):
+    """Releasing the 10% of holds that expired, found through the expires_at index"""
+    from items.holds import release_all_expired
+    from items.models import Item, StockHold
+    # Holds expire one to ten minutes out, a tenth in each minute
+    sweep_at = timezone.now() + timedelta(minutes=1, seconds=30)
+
+    released, sweep_ms = _timed(lambda: release_all_expired(now=sweep_at))
+    _, empty_ms = _timed(lambda: release_all_expired(now=sweep_at), 20)
+
+    print(f"\nsweep released {released} of {HOLDS} holds in {sweep_ms:.1f} ms; "
+          f"sweep with nothing expired {empty_ms:.3f} ms")
+    assert released == HOLDS // 10
+    assert StockHold.objects.count() == HOLDS - released
+    assert Item.objects.aggregate(Sum('held_qty'))['held_qty__sum'] == HOLDS - released
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+def _mean_ms(func, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1000
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('profile,iterations', [
+    ('default', None),
+    ('default', 100_000),
+    ('fast', None),
+])
+def test_login_latency(settings, profile, iterations):
+    """Login latency per hasher profile, compared with a refresh-token exchange"""
+    from accounts.models import User
+    settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES[profile]
+    settings.PBKDF2_ITERATIONS = iterations
+    User.objects.create_user(username='till@test.com', email='till@test.com', name='Till', password='TillPass123!', role='cashier')
+    client = APIClient()
+    body = {'email': 'till@test.com', 'password': 'TillPass123!'}
+    refresh = client.post(reverse('login'), body, format='json').data['refresh']
+
+    login = _mean_ms(lambda: client.post(reverse('login'), body, format='json'), 5)
+    refreshed = _mean_ms(lambda: client.post(reverse('token-refresh'), {'refresh': refresh}, format='json'), 50)
+
+    print(f"\n{profile:8} iterations={iterations or 'django default':>14}  login {login:8.2f} ms  refresh {refreshed:.2f} ms")
+    assert refreshed < login or profile == 'fast'
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+def test_purchase_queries_with_and_without_reorder_level(bench_customer):
+    """Non-crossing purchases run the same queries whether or not alerts are armed"""
+    from items.models import Item, SKU
+    plain = Item.objects.create(name='Plain', category='dry', sale_type='count', inventory_qty=10**6)
+    armed = Item.objects.create(name='Armed', category='milk', sale_type='count', inventory_qty=10**6, reorder_level=10)
+    skus = {
+        'plain': SKU.objects.create(item=plain, code='P-1', unit_value=1, price=1000),
+        'armed': SKU.objects.create(item=armed, code='A-1', unit_value=1, price=1000),
+    }
+
+    # Per-process caches (catalog version, price lists) load on the first purchase; measure steady state
+    for sku in skus.values():
+        bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+
+    results = {}
+    for label, sku in skus.items():
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(200):
+                bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+            elapsed = (time.perf_counter() - start) / 200 * 1000
+        results[label] = (len(queries) / 200, elapsed)
+        print(f"\n{label:6} {results[label][0]:.1f} queries/purchase  {elapsed:.2f} ms/purchase")
+
+    assert results['plain'][0] == results['armed'][0]
+
+
+@pytest.mark.django_db
+def test_low_stock_lookup(admin_user):
+    """Low-stock query over a large catalog where few items are low"""
+    from items.models import Item
+    n = 50_000
+    Item.objects.bulk_create(
+        Item(
+            name=f'Sweet {i}', category='milk', sale_type='count',
+            inventory_qty=5 if i % 1000 == 0 else 500, reorder_level=10,
+        )
+        for i in range(n)
+    )
+    low = Item.objects.filter(is_active=True, reorder_level__gt=0, inventory_qty__lt=F('reorder_level'))
+
+    plan = ' '.join(str(row) for row in low.explain().splitlines())
+    start = time.perf_counter()
+    for _ in range(20):
+        count = len(list(low.all()))
+    elapsed = (time.perf_counter() - start) / 20 * 1000
+
+    print(f"\n{n} items, {count} low: {elapsed:.2f} ms per lookup\nplan: {plan}")
+    assert count == n // 1000
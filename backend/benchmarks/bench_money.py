@@ -0,0 +1,78 @@
+import time
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models import Sum
+from django.urls import reverse
+from rest_framework import serializers
+
+N = 200_000
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def test_total_and_format():
+    """The per-purchase money work: total = price * quantity, then serialize"""
+    from items.money import RupeesField
+    decimal_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+    rupees_field = RupeesField()
+    decimal_price, paise_price = Decimal('450.00'), 45000
+
+    _, decimal_ms = _timed(lambda: [decimal_field.to_representation(decimal_price * (i % 9 + 1)) for i in range(N)])
+    _, paise_ms = _timed(lambda: [rupees_field.to_representation(paise_price * (i % 9 + 1)) for i in range(N)])
+
+    print(f"\n{N} totals  Decimal {decimal_ms:7.1f} ms  paise {paise_ms:7.1f} ms  ({decimal_ms / paise_ms:.1f}x)")
+    assert paise_ms < decimal_ms
+
+
+@pytest.mark.django_db
+def test_purchase_path(bench_customer):
+    """End-to-end purchase requests with integer totals"""
+    from items.models import Item, SKU
+    item = Item.objects.create(name='Sweet', category='milk', sale_type='count', inventory_qty=10**6)
+    sku = SKU.objects.create(item=item, code='S-1', unit_value=1, price=45000)
+
+    start = time.perf_counter()
+    for _ in range(500):
+        response = bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 2}, format='json')
+    elapsed = (time.perf_counter() - start) / 500 * 1000
+
+    assert response.data['total_price'] == '900.00'
+    print(f"\npurchase request {elapsed:.2f} ms")
+
+
+@pytest.mark.django_db
+def test_bulk_aggregation(admin_user):
+    """Revenue per SKU over many purchases: database SUM, and Python sums of ints vs Decimals"""
+    from items.models import Item, SKU, Purchase
+    n = 500_000
+    item = Item.objects.create(name='Sweet', category='milk', sale_type='count', inventory_qty=10**9)
+    skus = [SKU.objects.create(item=item, code=f'S-{i}', unit_value=1, price=45000) for i in range(20)]
+    for chunk in range(0, n, 10000):
+        Purchase.objects.bulk_create(
+            Purchase(user=admin_user, sku=skus[i % 20], quantity=1 + i % 4, total_price=45000 * (1 + i % 4))
+            for i in range(chunk, chunk + 10000)
+        )
+
+    grouped, sum_ms = _timed(lambda: dict(Purchase.objects.values_list('sku_id').annotate(Sum('total_price')).order_by()))
+    rows, fetch_ms = _timed(lambda: list(Purchase.objects.values_list('sku_id', 'total_price')))
+
+    def python_sum(convert):
+        totals = {}
+        for sku_id, paise in rows:
+            totals[sku_id] = totals.get(sku_id, 0) + convert(paise)
+        return totals
+
+    # Decimal(paise) / 100 is what reading a DecimalField costs per row
+    as_decimal, decimal_ms = _timed(lambda: python_sum(lambda paise: Decimal(paise) / 100))
+    as_int, int_ms = _timed(lambda: python_sum(int))
+
+    print(f"\n{n} purchases  SQL SUM {sum_ms:.1f} ms  fetch {fetch_ms:.1f} ms  "
+          f"Python sum: Decimal {decimal_ms:.1f} ms  int {int_ms:.1f} ms  ({connection.vendor})")
+    assert grouped == as_int
+    assert {sku: total * 100 for sku, total in as_decimal.items()} == as_int
@@ -0,0 +1,47 @@
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+LINES = 10000
+SKUS = 20
+
+
+@pytest.mark.django_db
+def test_offline_batch_upload(bench_cashier):
+    """Time and query count for a 10k-line offline upload and its retry"""
+    from items.models import Item, SKU, Purchase
+    skus = []
+    for i in range(SKUS):
+        item = Item.objects.create(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=400)
+        skus.append(SKU.objects.create(item=item, code=f'S-{i}', unit_value=1, price=1000).id)
+    # One sale a second over the last few hours, inside the offline upload window
+    start = timezone.now() - timedelta(seconds=LINES)
+    lines = [
+        {
+            'client_id': str(uuid.uuid4()),
+            'sku_id': skus[i % SKUS],
+            'quantity': 1,
+            'created_at': (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(LINES)
+    ]
+
+    for label in ('upload', 'retry'):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = bench_cashier.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200
+        counts = {}
+        for result in response.data['results']:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        print(f"\n{label:6} {LINES} lines  {elapsed * 1000:7.1f} ms  {len(queries)} queries  {counts}")
+
+    # 400 pieces per item, so the rest of each item's 500 lines are rejected
+    assert Purchase.objects.count() == SKUS * 400
@@ -0,0 +1,83 @@
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+SKUS = int(os.getenv('BENCH_PRICE_SKUS', '5000'))
+LISTS = 24
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.fixture
+def priced_catalog(db):
+    """SKUS SKUs and LISTS hourly price lists, each repricing every other SKU"""
+    from items.models import Item, SKU
+    from items.pricelists import create_price_list
+    Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=10**9) for i in range(SKUS)
+    )
+    SKU.objects.bulk_create(
+        SKU(item=item, code=f'S-{item.id}', unit_value=1, price=2500) for item in Item.objects.order_by('id')
+    )
+    skus = list(SKU.objects.order_by('id'))
+    start = timezone.now() - timedelta(hours=LISTS - 1)
+    for hour in range(LISTS):
+        create_price_list(f'Hour {hour}', start + timedelta(hours=hour), {sku.id: 2000 + hour for sku in skus[hour % 2::2]})
+    return skus
+
+
+def test_resolution_map_vs_query(priced_catalog):
+    """Resolving every SKU's current price from the in-memory map vs a query per SKU"""
+    from items.models import PriceList, PriceListEntry
+    from items.pricelists import resolve_price
+    skus = priced_catalog
+    resolve_price(skus[0])
+
+    resolved, map_ms = _timed(lambda: [resolve_price(sku)[0] for sku in skus])
+
+    def per_sku_queries():
+        prices = []
+        for sku in skus:
+            current = PriceList.objects.filter(effective_from__lte=timezone.now()).order_by('-effective_from').first()
+            entry = PriceListEntry.objects.filter(price_list=current, sku=sku).values_list('price', flat=True).first()
+            prices.append(sku.price if entry is None else entry)
+        return prices
+    queried, query_ms = _timed(per_sku_queries)
+
+    per_map = map_ms / len(skus) * 1000
+    per_query = query_ms / len(skus) * 1000
+    print(f"\n{len(skus)} SKUs, {LISTS} lists  map {per_map:.2f} us  query per SKU {per_query:.1f} us  "
+          f"({per_query / per_map:.0f}x)")
+    assert resolved == queried
+    assert per_map < per_query
+
+
+def test_cold_map_load(priced_catalog):
+    """First resolution in a process: schedule plus one version's entries"""
+    from items.pricelists import reset_price_lists, resolve_price
+    reset_price_lists()
+
+    _, cold_ms = _timed(lambda: resolve_price(priced_catalog[0]))
+    print(f"\ncold load of a {SKUS // 2}-entry list {cold_ms:.1f} ms")
+
+
+def test_purchase_path(bench_customer, priced_catalog):
+    """End-to-end purchases priced from the list in effect"""
+    skus = priced_catalog[:500]
+
+    start = time.perf_counter()
+    for sku in skus:
+        response = bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+    elapsed = (time.perf_counter() - start) / len(skus) * 1000
+
+    assert response.status_code == 201
+    assert response.data['price_list'] is not None
+    print(f"\npurchase request {elapsed:.2f} ms")
@@ -0,0 +1,65 @@
+import random
+import time
+
+import pytest
+from django.urls import reverse
+
+LADDER = [(100, 19000), (250, 45000), (500, 85000), (1000, 160000), (2000, 300000)]
+N = 100_000
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.mark.parametrize('mode', ['rate', 'packs'])
+def test_table_lookup_vs_fresh_search(mode):
+    """Pricing random weights from a prebuilt table vs searching the ladder per sale"""
+    from items.pricing import build_price_table
+    weights = [random.randint(1, 10000) for _ in range(N)]
+
+    table, build_ms = _timed(lambda: build_price_table(LADDER, 10000, mode))
+    looked_up, lookup_ms = _timed(lambda: [int(table[grams]) for grams in weights])
+    # A fresh search builds the prices up to the requested weight for each sale
+    sample = weights[:200]
+    searched, search_ms = _timed(lambda: [int(build_price_table(LADDER, grams, mode)[grams]) for grams in sample])
+
+    per_lookup = lookup_ms / N * 1000
+    per_search = search_ms / len(sample) * 1000
+    print(f"\n{mode:5}  build {build_ms:6.1f} ms  lookup {per_lookup:6.2f} us  fresh search {per_search:8.1f} us  "
+          f"({per_search / per_lookup:.0f}x)")
+    assert searched == looked_up[:len(sample)]
+    assert per_lookup < per_search
+
+
+@pytest.mark.django_db
+def test_cached_price_weight():
+    """price_weight through the Django cache, as the purchase path calls it"""
+    from items.models import Item, SKU
+    from items.pricing import price_weight
+    item = Item.objects.create(name='Sweet', category='dry', sale_type='weight', inventory_qty=10**9)
+    for grams, price in LADDER:
+        SKU.objects.create(item=item, code=f'S-{grams}', unit_value=grams, price=price)
+    price_weight(item.id, 1)
+
+    _, elapsed = _timed(lambda: [price_weight(item.id, grams) for grams in range(1, 10001)])
+    print(f"\nprice_weight {elapsed / 10000 * 1000:.1f} us per call (cache hit)")
+
+
+@pytest.mark.django_db
+def test_weight_purchase_path(bench_customer):
+    """End-to-end weighed sales"""
+    from items.models import Item, SKU
+    item = Item.objects.create(name='Sweet', category='dry', sale_type='weight', inventory_qty=10**9)
+    for grams, price in LADDER:
+        SKU.objects.create(item=item, code=f'S-{grams}', unit_value=grams, price=price)
+
+    start = time.perf_counter()
+    for grams in range(300, 800):
+        response = bench_customer.post(reverse('purchase-weight'), {'item_id': item.id, 'grams': grams}, format='json')
+    elapsed = (time.perf_counter() - start) / 500 * 1000
+
+    assert response.status_code == 201
+    print(f"\nweight purchase request {elapsed:.2f} ms")
@@ -0,0 +1,95 @@
+import random
+import time
+
+import pytest
+from django.db.models import Q
+from django.urls import reverse
+
+ITEMS = 2000
+RULES = 1000
+LINES = 10_000
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.fixture
+def promoted_catalog(db):
+    """ITEMS items (half by weight, half by count) with two SKUs each and RULES active rules"""
+    from items.models import Item, SKU, Promotion
+    Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category=['dry', 'milk', 'other'][i % 3], sale_type=['weight', 'count'][i % 2],
+             inventory_qty=10**9)
+        for i in range(ITEMS)
+    )
+    items = list(Item.objects.order_by('id'))
+    SKU.objects.bulk_create(
+        SKU(item=item, code=f'S-{item.id}-{size}', unit_value=size * (250 if item.sale_type == 'weight' else 1),
+            price=size * 4500)
+        for item in items for size in (1, 4)
+    )
+    rules = [
+        Promotion(name=f'{category} {percent}%', kind='category_discount', category=category, percent=percent, priority=0)
+        for category, percent in [('dry', 5), ('milk', 10), ('other', 8)]
+    ]
+    for i, item in enumerate(random.sample(items, RULES - len(rules))):
+        if item.sale_type == 'count':
+            rules.append(Promotion(name=f'B{i}', kind='buy_x_get_y', item=item, buy_qty=2, free_qty=1, priority=i % 3))
+        else:
+            rules.append(Promotion(name=f'S{i}', kind='weight_slabs', item=item, slabs=[[1000, 16000], [2000, 15000]],
+                                   priority=i % 3))
+    Promotion.objects.bulk_create(rules)
+    skus = list(SKU.objects.select_related('item'))
+    return [(random.choice(skus), random.randint(1, 6)) for _ in range(LINES)]
+
+
+def test_compiled_vs_scanning_rules(promoted_catalog):
+    """A 10k-line cart against 1k rules: compiled per-item tables vs every rule checked per line"""
+    from django.utils import timezone
+    from items.models import Promotion
+    from items.promotions import RuleBook, price_lines, rulebook
+    lines = promoted_catalog
+    now = timezone.now()
+
+    book, compile_ms = _timed(rulebook)
+    compiled, compiled_ms = _timed(lambda: price_lines(lines, now, book))
+    _, warm_ms = _timed(lambda: price_lines(lines, now, book))
+
+    promotions = list(Promotion.objects.filter(is_active=True).order_by('id'))
+
+    def scan():
+        # Same precedence, but every rule is considered for every line
+        totals = []
+        for sku, quantity in lines:
+            single = RuleBook([p for p in promotions if p.item_id == sku.item_id or p.category == sku.item.category])
+            totals.append(single.apply(sku.item, sku.unit_value, quantity, sku.price * quantity, now)[0])
+        return totals
+    scanned, scan_ms = _timed(scan)
+
+    def query_per_line():
+        totals = []
+        for sku, quantity in lines[:500]:
+            rules = Promotion.objects.filter(Q(item_id=sku.item_id) | Q(category=sku.item.category), is_active=True)
+            totals.append(RuleBook(rules.order_by('id')).apply(sku.item, sku.unit_value, quantity, sku.price * quantity, now)[0])
+        return totals
+    queried, query_ms = _timed(query_per_line)
+
+    assert [line['total_price'] for line in compiled] == scanned
+    assert scanned[:500] == queried
+    print(f"\n{LINES} lines x {RULES} rules  compile {compile_ms:.1f} ms  cold {compiled_ms:.1f} ms  "
+          f"warm {warm_ms:.1f} ms  scan all rules {scan_ms:.0f} ms  query per line {query_ms / 500 * LINES:.0f} ms (est.)")
+    assert warm_ms < scan_ms
+
+
+def test_cart_request(promoted_catalog, bench_customer):
+    """The cart pricing endpoint end to end"""
+    cart = [{'sku_id': sku.id, 'quantity': quantity} for sku, quantity in promoted_catalog]
+    bench_customer.post(reverse('cart-price'), {'items': cart[:1]}, format='json')
+
+    response, elapsed = _timed(lambda: bench_customer.post(reverse('cart-price'), {'items': cart}, format='json'))
+
+    assert response.status_code == 200
+    print(f"\n{LINES}-line cart request {elapsed:.0f} ms")
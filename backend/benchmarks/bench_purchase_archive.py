@@ -0,0 +1,75 @@
+import os
+import statistics
+import time
+from datetime import timedelta
+
+import pytest
+
+# 50M rows needs a PostgreSQL database and a few hours of setup; the default
+# keeps the run short while still showing how both paths scale
+ROWS = int(os.getenv('BENCH_PURCHASE_ROWS', '200000'))
+MONTHS = 24
+
+
+def _insert_latencies(user, sku, n=200):
+    from items.purchasing import purchase_sku
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        purchase_sku(user, sku.id, 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(n * 0.99)]
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.mark.django_db
+def test_purchase_archive(settings, tmp_path, admin_user):
+    """Insert latency and range-query time with full history vs archived history"""
+    from django.core.management import call_command
+    from django.utils import timezone
+    from items.archive import add_months, period_bounds, period_of
+    from items.models import Item, SKU, Purchase
+    from items.reports import sales_by_day
+    settings.PURCHASE_ARCHIVE_DIR = str(tmp_path)
+    item = Item.objects.create(name='Sweet', category='milk', sale_type='count', inventory_qty=10**9)
+    skus = [SKU.objects.create(item=item, code=f'S-{i}', unit_value=1, price=1000) for i in range(10)]
+    current = period_of(timezone.now())
+    oldest, _ = period_bounds(add_months(current, 1 - MONTHS))
+    span = (timezone.now() - oldest).total_seconds()
+
+    start = time.perf_counter()
+    for chunk in range(0, ROWS, 10000):
+        Purchase.objects.bulk_create(
+            Purchase(
+                user=admin_user, sku=skus[i % 10], quantity=1, total_price=1000,
+                created_at=oldest + timedelta(seconds=span * i / ROWS),
+            )
+            for i in range(chunk, min(chunk + 10000, ROWS))
+        )
+    print(f"\nloaded {ROWS} purchases over {MONTHS} months in {time.perf_counter() - start:.1f} s")
+
+    hot_month = period_bounds(add_months(current, -1))
+    cold_month = period_bounds(add_months(current, -12))
+    year = (period_bounds(add_months(current, -11))[0], period_bounds(current)[1])
+
+    def measure(label):
+        p50, p99 = _insert_latencies(admin_user, skus[0])
+        _, hot_ms = _timed(sales_by_day, *hot_month)
+        _, cold_ms = _timed(sales_by_day, *cold_month)
+        rows, year_ms = _timed(sales_by_day, *year)
+        print(f"{label:9} {Purchase.objects.count():9} rows in db  insert p50 {p50:.2f} ms p99 {p99:.2f} ms  "
+              f"month (hot) {hot_ms:7.1f} ms  month (old) {cold_ms:7.1f} ms  year {year_ms:8.1f} ms")
+        return rows
+
+    before = measure('full')
+    _, archive_ms = _timed(call_command, 'archive_purchases', '--keep-months=3')
+    print(f"archived in {archive_ms / 1000:.1f} s")
+    after = measure('archived')
+
+    assert sum(row['quantity'] for row in after) == sum(row['quantity'] for row in before) + 200
@@ -0,0 +1,47 @@
+import random
+import time
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+def _seed(alias):
+    from items.models import Item, SKU
+    for i in range(50):
+        item = Item.objects.using(alias).create(
+            id=i + 1, name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=10**6
+        )
+        SKU.objects.using(alias).create(id=i + 1, item=item, code=f'S-{i}', unit_value=1, price=1000)
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+@pytest.mark.parametrize('replicas', [[], ['replica']])
+def test_primary_load_under_read_heavy_traffic(settings, bench_customer, replicas):
+    """Queries hitting the primary for 90% catalog reads / 10% purchases"""
+    settings.DATABASE_REPLICAS = replicas
+    _seed('default')
+    _seed('replica')
+    anonymous = APIClient()
+    rng = random.Random(3)
+
+    with CaptureQueriesContext(connections['default']) as primary, \
+            CaptureQueriesContext(connections['replica']) as replica:
+        start = time.perf_counter()
+        for _ in range(1000):
+            roll = rng.random()
+            if roll < 0.1:
+                bench_customer.post(reverse('purchase'), {'sku_id': rng.randint(1, 50), 'quantity': 1}, format='json')
+            elif roll < 0.5:
+                anonymous.get(reverse('list-items'))
+            else:
+                anonymous.get(reverse('item-detail', kwargs={'pk': rng.randint(1, 50)}))
+        elapsed = time.perf_counter() - start
+
+    total = len(primary) + len(replica)
+    print(f"\nreplicas={','.join(replicas) or 'none':<8} primary {len(primary):5} queries "
+          f"({len(primary) / total:.0%})  replica {len(replica):5}  {elapsed:.2f}s for 1000 requests")
+    if replicas:
+        assert len(replica) > len(primary)
@@ -0,0 +1,52 @@
+import random
+import statistics
+import time
+
+import pytest
+
+PREFIXES = ['Kaju', 'Kesar', 'Badam', 'Pista', 'Malai', 'Doodh', 'Gulab', 'Mawa', 'Anjeer', 'Coconut']
+BASES = ['Katli', 'Barfi', 'Peda', 'Ladoo', 'Roll', 'Halwa', 'Jamun', 'Rasgulla', 'Sandesh', 'Chikki']
+
+
+def _timed(func, runs=20):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+@pytest.mark.django_db
+def test_search_vs_icontains_at_100k_items():
+    """Indexed search compared with an icontains scan over 100k items"""
+    from items.models import Item
+    from items.search import search_items
+    rng = random.Random(7)
+    Item.objects.bulk_create(
+        (
+            Item(
+                name=f'{rng.choice(PREFIXES)} {rng.choice(BASES)} {i}',
+                category=rng.choice(['dry', 'milk', 'other']),
+                sale_type=rng.choice(['weight', 'count']),
+            )
+            for i in range(100_000)
+        ),
+        batch_size=5000,
+    )
+    Item.objects.create(name='Saffron Kalakand', category='milk', sale_type='weight')
+
+    cases = [
+        ('rare word', 'kalakand', lambda: list(Item.objects.filter(is_active=True, name__icontains='kalakand')[:20])),
+        ('typo', 'kalakhand', lambda: list(Item.objects.filter(is_active=True, name__icontains='kalakhand')[:20])),
+        ('prefix', 'saff', lambda: list(Item.objects.filter(is_active=True, name__icontains='saff')[:20])),
+        ('common', 'kaju barfi', lambda: list(Item.objects.filter(is_active=True, name__icontains='kaju barfi')[:20])),
+    ]
+    for label, query, scan in cases:
+        indexed, found = _timed(lambda: search_items(query))
+        scanned, scan_found = _timed(scan)
+        print(f"\n{label:10} q={query!r:12} search {indexed:7.2f} ms ({len(found)} hits)"
+              f"  icontains {scanned:7.2f} ms ({len(scan_found)} hits)")
+        assert found
+        if label != 'common':
+            assert found[0].name == 'Saffron Kalakand'
@@ -0,0 +1,169 @@
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('gunicorn')
+
+BACKEND = Path(__file__).resolve().parent.parent
+# workers x threads per run, e.g. BENCH_SERVER_CONFIGS=1x1,4x1,2x4
+CONFIGS = [
+    tuple(int(n) for n in config.split('x'))
+    for config in os.getenv('BENCH_SERVER_CONFIGS', '1x1,2x1,4x1,1x4,2x4,4x4').split(',')
+]
+SECONDS = float(os.getenv('BENCH_SERVER_SECONDS', '5'))
+CLIENTS = 16
+ITEMS = 200
+
+SEED = f"""
+from accounts.models import User
+from items.models import Item, SKU
+User.objects.create_user(username='bench@test.com', email='bench@test.com', name='Bench',
+                         password='BenchPass123!', role='customer')
+Item.objects.bulk_create(Item(name=f'Sweet {{i}}', category='milk', sale_type='count', inventory_qty=10**9)
+                         for i in range({ITEMS}))
+SKU.objects.bulk_create(SKU(item=item, code=f'S-{{item.id}}-{{size}}', unit_value=size, price=2500 * size)
+                        for item in Item.objects.all() for size in (1, 6))
+"""
+
+
+def _env(database, **extra):
+    """A production-like environment on a throwaway SQLite database"""
+    env = {key: value for key, value in os.environ.items() if key not in ('POSTGRES_DB', 'DATABASE_REPLICA_HOSTS')}
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'benchmarks.server_settings',
+        'SECRET_KEY': 'bench-server-secret-key',
+        'SQLITE_PATH': str(database),
+        'PASSWORD_HASHER_PROFILE': 'fast',
+        **extra,
+    })
+    return env
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    database = tmp_path_factory.mktemp('server') / 'db.sqlite3'
+    for command in (['migrate', '--verbosity', '0'], ['shell', '-c', SEED]):
+        subprocess.run([sys.executable, 'manage.py', *command], cwd=BACKEND, env=_env(database), check=True,
+                       stdout=subprocess.DEVNULL)
+    return database
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _call(conn, method, path, body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+class Server:
+    """gunicorn.conf.py with the given worker model, on a free local port"""
+
+    def __init__(self, database, workers, threads):
+        self.port = _free_port()
+        env = _env(database, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+                   GUNICORN_BIND=f'127.0.0.1:{self.port}')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'config.wsgi', '-c', 'gunicorn.conf.py'],
+            cwd=BACKEND, env=env, stderr=subprocess.DEVNULL,
+        )
+
+    def connect(self):
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+
+    def wait_until_ready(self):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if _call(self.connect(), 'GET', '/api/items/list')[0] == 200:
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError('gunicorn did not start')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def _load(server, request):
+    """CLIENTS clients sending request(conn) back to back for SECONDS, on keep-alive connections where offered"""
+    latencies, errors = [], []
+    deadline = time.monotonic() + SECONDS
+
+    def client():
+        conn = server.connect()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = request(conn)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                status = None
+            latencies.append(time.perf_counter() - start)
+            if status not in (200, 201):
+                errors.append(status)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'rps': len(latencies) / SECONDS,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99)] * 1000,
+        'errors': len(errors),
+    }
+
+
+@pytest.mark.parametrize('workers,threads', CONFIGS, ids=[f'{w}x{t}' for w, t in CONFIGS])
+def test_worker_model(database, workers, threads):
+    """Catalog reads and purchases against one gunicorn worker model"""
+    server = Server(database, workers, threads)
+    try:
+        server.wait_until_ready()
+        conn = server.connect()
+        _, body = _call(conn, 'POST', '/api/auth/login', {'email': 'bench@test.com', 'password': 'BenchPass123!'})
+        token = json.loads(body)['access']
+        items = [item['id'] for item in json.loads(_call(conn, 'GET', '/api/items/list', token=token)[1])]
+        skus = [sku['id'] for item in items[:50]
+                for sku in json.loads(_call(conn, 'GET', f'/api/items/{item}', token=token)[1])['skus']]
+        conn.close()
+
+        def catalog(conn):
+            if random.random() < 0.2:
+                return _call(conn, 'GET', '/api/items/list', token=token)[0]
+            return _call(conn, 'GET', f'/api/items/{random.choice(items)}', token=token)[0]
+
+        def purchase(conn):
+            body = {'sku_id': random.choice(skus), 'quantity': 1}
+            return _call(conn, 'POST', '/api/items/purchase', body, token=token)[0]
+
+        results = {name: _load(server, request) for name, request in [('catalog', catalog), ('purchase', purchase)]}
+    finally:
+        server.stop()
+
+    print(f"\n{workers} worker(s) x {threads} thread(s)  " + "  ".join(
+        f"{name} {r['rps']:6.0f} req/s p50 {r['p50']:5.1f} ms p99 {r['p99']:6.1f} ms errors {r['errors']}"
+        for name, r in results.items()
+    ))
+    assert results['catalog']['errors'] == 0
+    assert results['catalog']['rps'] > 0 and results['purchase']['rps'] > 0
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+import pytest
+
+ITEMS = int(os.getenv('BENCH_CATALOG_ITEMS', '2000'))
+REQUESTS = 500
+
+
+@pytest.fixture
+def big_catalog(transactional_db):
+    from items.models import Item
+    Item.objects.bulk_create(
+        Item(name=f'Sweet {i}', category='milk', sale_type='count', inventory_qty=100) for i in range(ITEMS)
+    )
+
+
+def _burst(func):
+    """REQUESTS threads calling func at once; sorted latencies in ms"""
+    from django.db import connection
+    barrier = threading.Barrier(REQUESTS)
+    latencies = []
+
+    def request():
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            func()
+        finally:
+            latencies.append((time.perf_counter() - start) * 1000)
+            connection.close()
+
+    threads = [threading.Thread(target=request) for _ in range(REQUESTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies)
+
+
+def _report(name, latencies, builds):
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"\n{name:28} builds {builds:3}  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  max {latencies[-1]:7.1f} ms")
+    return p99
+
+
+def _counting(catalog):
+    builds = []
+    build = catalog.build_item_list
+
+    def counted():
+        builds.append(1)
+        return build()
+    return counted, builds
+
+
+def test_cold_miss_burst(big_catalog):
+    """REQUESTS concurrent requests for a missing list: each rebuilding vs single-flight"""
+    from items import catalog
+    from items.coherence import reset_coherence
+    counted, builds = _counting(catalog)
+
+    naive = _burst(counted)
+    naive_p99 = _report('every request rebuilds', naive, len(builds))
+
+    builds.clear()
+    reset_coherence()
+    original, catalog.build_item_list = catalog.build_item_list, counted
+    try:
+        single = _burst(catalog.item_list)
+    finally:
+        catalog.build_item_list = original
+    single_p99 = _report('single-flight', single, len(builds))
+
+    assert len(builds) == 1
+    assert single_p99 < naive_p99
+
+
+def test_invalidated_burst(big_catalog):
+    """REQUESTS concurrent requests right after a write marked the list stale"""
+    from items import catalog
+    counted, builds = _counting(catalog)
+    catalog.item_list()
+    catalog.invalidate_item_list()
+
+    original, catalog.build_item_list = catalog.build_item_list, counted
+    try:
+        latencies = _burst(catalog.item_list)
+    finally:
+        catalog.build_item_list = original
+
+    _report('stale-while-revalidate', latencies, len(builds))
+    assert len(builds) == 1
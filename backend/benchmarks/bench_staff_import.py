@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+from django.urls import reverse
+
+USERS = int(os.getenv('BENCH_STAFF_USERS', '5000'))
+# Django's own default is far higher; raise this to see production-cost hashing
+ITERATIONS = int(os.getenv('BENCH_PBKDF2_ITERATIONS', '20000'))
+
+
+def _csv(prefix, n):
+    lines = ['email,name,role,password']
+    lines += [f'{prefix}{i}@shop.com,Staff {i},cashier,TillPass{i}!x' for i in range(n)]
+    return '\n'.join(lines)
+
+
+@pytest.fixture
+def pbkdf2(settings):
+    settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['default']
+    settings.PBKDF2_ITERATIONS = ITERATIONS
+
+
+@pytest.mark.django_db
+def test_staff_import(pbkdf2, admin_user):
+    """USERS staff in one import, hashed serially and across all CPUs, vs one request per cashier"""
+    from rest_framework.test import APIClient
+    from accounts.models import User
+    from accounts.provisioning import import_staff, read_staff_csv
+    client = APIClient()
+    client.force_authenticate(admin_user)
+    cpus = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    for i in range(20):
+        client.post(reverse('create-cashier'), {'email': f'one{i}@shop.com', 'name': 'One', 'password': 'TillPass123!x'}, format='json')
+    per_request = (time.perf_counter() - start) / 20
+
+    timings = {}
+    for label, workers in [('serial', 1), (f'{cpus} workers', cpus)]:
+        rows = read_staff_csv(_csv(label.replace(' ', ''), USERS))
+        start = time.perf_counter()
+        result = import_staff(rows, workers=workers)
+        timings[label] = time.perf_counter() - start
+        assert len(result['created']) == USERS
+
+    print(f"\n{USERS} users, PBKDF2 {ITERATIONS} iterations, {cpus} CPU(s)\n"
+          f"  one request per cashier {per_request * USERS:7.1f} s (estimated from 20)\n"
+          + '\n'.join(f"  bulk import, {label:11} {seconds:7.1f} s" for label, seconds in timings.items()))
+    assert User.objects.count() == 2 * USERS + 21
@@ -0,0 +1,83 @@
+import os
+import random
+import time
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+STORES = 200
+# 200 stores x 50k items is 10M stock rows, about two minutes to load on SQLite
+ITEMS = int(os.getenv('BENCH_STORE_ITEMS', '50000'))
+CARTS = 200
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.fixture
+def store_catalog(db):
+    """STORES stores each stocking every one of ITEMS items (one SKU each)"""
+    from items.models import Item, SKU, Store, StoreStock
+    Item.objects.bulk_create(
+        (Item(name=f'Sweet {i}', category='dry', sale_type='count') for i in range(ITEMS)), batch_size=5000
+    )
+    item_ids = list(Item.objects.order_by('id').values_list('id', flat=True))
+    SKU.objects.bulk_create(
+        (SKU(item_id=item_id, code=f'S-{item_id}', unit_value=1, price=2500) for item_id in item_ids), batch_size=5000
+    )
+    Store.objects.bulk_create(
+        Store(name=f'Store {i}', latitude=18.9 + i % 20 * 0.02, longitude=72.8 + i // 20 * 0.02) for i in range(STORES)
+    )
+    store_ids = list(Store.objects.order_by('id').values_list('id', flat=True))
+
+    rng = random.Random(5)
+    now = timezone.now()
+    table = StoreStock._meta.db_table
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        for store_id in store_ids:
+            cursor.executemany(
+                f'INSERT INTO {table} (store_id, item_id, inventory_qty, updated_at) VALUES (%s, %s, %s, %s)',
+                [(store_id, item_id, rng.randrange(0, 50), now) for item_id in item_ids],
+            )
+    print(f"\nloaded {STORES * ITEMS} stock rows in {time.perf_counter() - start:.1f} s")
+    return store_ids, list(SKU.objects.order_by('item_id').values_list('id', 'item_id'))
+
+
+@pytest.mark.django_db
+def test_availability_lookup(store_catalog, bench_customer):
+    """Stores able to fill 5-line carts: grouped index query vs one query per store"""
+    from items.models import StoreStock
+    from items.stores import stores_with_stock
+    store_ids, skus = store_catalog
+    rng = random.Random(9)
+    carts = [{item_id: rng.randint(1, 25) for _, item_id in rng.sample(skus, 5)} for _ in range(CARTS)]
+
+    found, indexed_ms = _timed(lambda: [sorted(stores_with_stock(needed)) for needed in carts])
+
+    def per_store(needed):
+        matching = []
+        for store_id in store_ids:
+            stock = dict(StoreStock.objects.filter(store_id=store_id, item_id__in=needed).values_list('item_id', 'inventory_qty'))
+            if all(stock.get(item_id, 0) >= units for item_id, units in needed.items()):
+                matching.append(store_id)
+        return matching
+
+    looped, loop_ms = _timed(lambda: [per_store(needed) for needed in carts[:10]])
+
+    sku_of = dict((item_id, sku_id) for sku_id, item_id in skus)
+    body = {'items': [{'sku_id': sku_of[item_id], 'quantity': units} for item_id, units in carts[0].items()],
+            'latitude': 19.0, 'longitude': 72.9}
+    _, request_ms = _timed(lambda: [bench_customer.post(reverse('store-availability'), body, format='json') for _ in range(50)])
+
+    per_cart = indexed_ms / CARTS
+    per_cart_loop = loop_ms / 10
+    print(f"{STORES} stores x {ITEMS} items  cart lookup: index {per_cart:.2f} ms  per-store loop {per_cart_loop:.1f} ms  "
+          f"({per_cart_loop / per_cart:.0f}x)  availability request {request_ms / 50:.2f} ms  "
+          f"avg {sum(map(len, found)) / CARTS:.0f} stores per cart")
+    assert found[:10] == looped
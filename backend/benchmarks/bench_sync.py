@@ -0,0 +1,46 @@
+import json
+import time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+def test_delta_sync_vs_full_reload():
+    """Bytes and requests a till needs to catch up after 1% of the catalog changed"""
+    from items.models import Item, SKU
+    n = 2000
+    for i in range(n):
+        item = Item.objects.create(name=f'Sweet {i}', category='milk', sale_type='weight', inventory_qty=5000)
+        SKU.objects.bulk_create(
+            SKU(item=item, code=f'S{i}-{grams}', unit_value=grams, price=grams * 180) for grams in (250, 500, 1000)
+        )
+    client = APIClient()
+    cursor = client.get(reverse('catalog-changes'), {'cursor': 0, 'limit': 5000}).data['cursor']
+    while True:
+        page = client.get(reverse('catalog-changes'), {'cursor': cursor, 'limit': 5000}).data
+        cursor = page['cursor']
+        if not page['has_more']:
+            break
+
+    for item in Item.objects.order_by('pk')[:n // 100]:
+        item.inventory_qty -= 250
+        item.save()
+
+    start = time.perf_counter()
+    listing = client.get(reverse('list-items'))
+    full_bytes, requests = len(listing.content), 1
+    for entry in json.loads(listing.content):
+        full_bytes += len(client.get(reverse('item-detail', kwargs={'pk': entry['id']})).content)
+        requests += 1
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    delta = client.get(reverse('catalog-changes'), {'cursor': cursor})
+    delta_time = time.perf_counter() - start
+
+    print(f"\nfull reload: {requests} requests, {full_bytes / 1024:8.1f} KiB, {full_time * 1000:8.1f} ms")
+    print(f"delta sync:  1 request,  {len(delta.content) / 1024:8.1f} KiB, {delta_time * 1000:8.1f} ms "
+          f"({len(delta.data['items'])} items)")
+    assert len(delta.data['items']) == n // 100
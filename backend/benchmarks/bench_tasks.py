@@ -0,0 +1,40 @@
+import statistics
+import time
+
+import pytest
+from django.urls import reverse
+
+from taskqueue.queue import task, run_pending
+
+SIDE_EFFECT_SECONDS = 0.02
+
+
+@task
+def slow_receipt(purchase_id):
+    """Stand-in for a receipt/rollup side effect"""
+    time.sleep(SIDE_EFFECT_SECONDS)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('mode', ['none', 'queued', 'inline'])
+def test_purchase_latency_with_side_effects(settings, bench_customer, mode):
+    """Purchase latency with no side effect, a queued one, and one run inline"""
+    from items.models import Item, SKU
+    item = Item.objects.create(name='Kaju Katli', category='dry', sale_type='weight', inventory_qty=10**9)
+    sku = SKU.objects.create(item=item, code='KK-250', unit_value=250, price=45000)
+    settings.PURCHASE_TASKS = [] if mode == 'none' else ['benchmarks.bench_tasks.slow_receipt']
+    settings.TASKS_EAGER = mode == 'inline'
+
+    for _ in range(5):
+        bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+    run_pending()
+
+    samples = []
+    for _ in range(50):
+        start = time.perf_counter()
+        response = bench_customer.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 201
+
+    drained = run_pending()
+    print(f"\n{mode:7} median {statistics.median(samples):6.2f} ms  p95 {sorted(samples)[47]:6.2f} ms  worker ran {drained}")
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+from rest_framework.test import APIRequestFactory
+
+
+def _per_call_us(func, n):
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def test_bucket_store_overhead():
+    """Cost of one token bucket check, for a hot key and for many distinct keys"""
+    from accounts.throttling import LocalBucketStore
+    store = LocalBucketStore()
+    n = 200_000
+
+    hot = _per_call_us(lambda i: store.consume('hot', 10**9, 1e6), n)
+    spread = _per_call_us(lambda i: store.consume(f'ip-{i}', 10, 1.0), n)
+
+    print(f"\nhot key:        {hot:.2f} us/check")
+    print(f"distinct keys:  {spread:.2f} us/check (store capped at {store.max_keys} keys)")
+    assert len(store._buckets) == store.max_keys
+    assert hot < 50
+
+
+@pytest.mark.django_db
+def test_rejected_login_vs_password_check(settings):
+    """A throttled login is answered without PBKDF2, compared with a full password check"""
+    settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['default']
+    from rest_framework.settings import api_settings
+    from accounts.throttling import reset_bucket_store
+    from accounts.views import LoginView
+
+    factory = APIRequestFactory()
+    view = LoginView.as_view()
+    body = {'email': 'bench@example.com', 'password': 'WrongPass123!'}
+    rates = api_settings.DEFAULT_THROTTLE_RATES
+    saved = dict(rates)
+    try:
+        rates['login_ip'] = None
+        rates['login_account'] = None
+        reset_bucket_store()
+        full = _per_call_us(lambda i: view(factory.post('/api/auth/login', body, format='json')), 10)
+
+        rates['login_account'] = '1/hour'
+        view(factory.post('/api/auth/login', body, format='json'))
+        rejected = _per_call_us(lambda i: view(factory.post('/api/auth/login', body, format='json')), 500)
+    finally:
+        rates.clear()
+        rates.update(saved)
+        reset_bucket_store()
+
+    print(f"\nlogin with password check: {full / 1000:.2f} ms")
+    print(f"throttled login (429):     {rejected / 1000:.3f} ms")
+    assert rejected < full
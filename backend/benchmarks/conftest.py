@@ -0,0 +1,40 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+
+def _client(email, role):
+    from accounts.models import User
+    User.objects.create_user(username=email, email=email, name='Bench', password='BenchPass123!', role=role)
+    client = APIClient()
+    response = client.post(reverse('login'), {'email': email, 'password': 'BenchPass123!'}, format='json')
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+@pytest.fixture
+def bench_customer(db):
+    """Authenticated customer client with throttles disabled"""
+    return _client('bench@test.com', 'customer')
+
+
+@pytest.fixture
+def bench_cashier(db):
+    """Authenticated cashier (till) client with throttles disabled"""
+    return _client('till@bench.com', 'cashier')
+
+
+@pytest.fixture(autouse=True)
+def no_throttles(monkeypatch):
+    from rest_framework.settings import api_settings
+    for scope in list(api_settings.DEFAULT_THROTTLE_RATES):
+        monkeypatch.setitem(api_settings.DEFAULT_THROTTLE_RATES, scope, None)
+
+
+@pytest.fixture
+def admin_user(db):
+    from accounts.models import User
+    return User.objects.create_user(
+        username='admin@bench.com', email='admin@bench.com', name='Admin',
+        password='AdminPass123!', role='admin'
+    )
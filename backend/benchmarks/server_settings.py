@@ -0,0 +1,9 @@
+"""Production settings for bench_server.py's gunicorn, with throttles off"""
+
+from config.production import *  # noqa: F401,F403
+from config.production import REST_FRAMEWORK
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {scope: None for scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']},
+}
@@ -0,0 +1,44 @@
+"""
+Admin pagination for tables too large to COUNT(*) on every page view.
+
+Counts are exact up to ADMIN_EXACT_COUNT_LIMIT rows, using a COUNT over a
+LIMITed subquery so the database stops early. Beyond that the page count is
+an estimate: the PostgreSQL planner's row estimate for the (possibly
+filtered) query, or on other databases the highest primary key of an
+unfiltered table. Filtered lists on other databases fall back to an exact
+count.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """Cheap row estimate for a queryset, or None if there is none"""
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    if not queryset.query.where:
+        return queryset.aggregate(highest=Max('pk'))['highest'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count stops being exact past ADMIN_EXACT_COUNT_LIMIT rows"""
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        capped = self.object_list.order_by()[:limit + 1].count()
+        if capped <= limit:
+            return capped
+        estimate = estimated_count(self.object_list)
+        if estimate is None:
+            return self.object_list.count()
+        return max(estimate, capped)
@@ -0,0 +1,187 @@
+"""
+Batch endpoint: many API calls in one HTTP round trip.
+
+POST /api/batch takes {"requests": [{"method", "path", "body"}, ...]} for
+routes under /api/items/ and /api/auth/ and answers {"responses": [{"status",
+"body"}, ...]} in the same order. The batch is authenticated once and every
+sub-request runs as that user; throttles still count each sub-request.
+Middleware runs for the batch, not for each sub-request.
+
+Sub-requests run in order, except that each run of consecutive read-only
+(GET) sub-requests executes concurrently on a pool of BATCH_WORKERS threads
+once the writes before it have committed. Identical reads within a batch are
+executed once and share the result. Reads go to replicas unless an earlier
+sub-request wrote or the client is pinned to the primary (config.db_routing).
+Inside a transaction, sub-requests all run on the calling thread, since other
+connections could not see its writes.
+"""
+
+import contextvars
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db_routing import PIN_COOKIE, SAFE_METHODS, pinned_to_primary, wrote_to_primary
+
+# URL prefix -> URLconf that sub-requests may reach
+ROUTES = {
+    '/api/auth/': 'accounts.urls',
+    '/api/items/': 'items.urls',
+}
+METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """One call in a batch"""
+    method = serializers.ChoiceField(choices=METHODS, default='GET')
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if not any(value.startswith(prefix) for prefix in ROUTES):
+            raise serializers.ValidationError(f"Path must start with one of {', '.join(ROUTES)}")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of calls"""
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        limit = settings.BATCH_MAX_REQUESTS
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} requests per batch")
+        return value
+
+
+def get_executor():
+    """This process's worker pool; threads do not survive fork, so each process starts its own"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS, thread_name_prefix='batch')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _sub_request(request, spec):
+    """A WSGIRequest for one sub-request, carrying the batch's headers and user"""
+    url = urlsplit(spec['path'])
+    body = json.dumps(spec['body']).encode() if 'body' in spec else b''
+    environ = {key: value for key, value in request.META.items() if not key.startswith(('wsgi.', 'CONTENT_'))}
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        # DRF's Request uses these instead of running the authenticators again
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    return sub
+
+
+def run_sub_request(request, spec):
+    """Dispatch one sub-request to its view; return {'status', 'body'}"""
+    path = urlsplit(spec['path']).path
+    prefix = next(prefix for prefix in ROUTES if path.startswith(prefix))
+    try:
+        match = resolve('/' + path[len(prefix):], ROUTES[prefix])
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'error': 'Not found'}}
+    sub = _sub_request(request, spec)
+    sub.resolver_match = match
+    response = match.func(sub, *match.args, **match.kwargs)
+    if hasattr(response, 'data'):
+        body = response.data
+    else:
+        body = json.loads(response.content) if response.content else None
+    return {'status': response.status_code, 'body': body}
+
+
+def _run_in_worker(request, spec, pinned):
+    # Pool threads keep their connections between batches, so each sub-request
+    # gets the request cycle's CONN_MAX_AGE, health check and error handling
+    close_old_connections()
+    try:
+        with pinned_to_primary(pinned):
+            return run_sub_request(request, spec)
+    finally:
+        close_old_connections()
+
+
+def run_batch(request, specs):
+    """Responses for sub-requests in order; reads between writes run concurrently"""
+    responses = [None] * len(specs)
+    index = 0
+    while index < len(specs):
+        if specs[index]['method'] not in SAFE_METHODS:
+            with pinned_to_primary(True):
+                responses[index] = run_sub_request(request, specs[index])
+            index += 1
+            continue
+        end = index
+        while end < len(specs) and specs[end]['method'] in SAFE_METHODS:
+            end += 1
+        _run_reads(request, specs, range(index, end), responses)
+        index = end
+    return responses
+
+
+def _run_reads(request, specs, indexes, responses):
+    pinned = PIN_COOKIE in request.COOKIES or wrote_to_primary()
+    # Identical reads are executed once per batch
+    unique = {}
+    for index in indexes:
+        unique.setdefault((specs[index]['path'], json.dumps(specs[index].get('body'))), []).append(index)
+    groups = list(unique.values())
+
+    if len(groups) == 1 or settings.BATCH_WORKERS <= 1 or connection.in_atomic_block:
+        results = []
+        for group in groups:
+            with pinned_to_primary(pinned):
+                results.append(run_sub_request(request, specs[group[0]]))
+    else:
+        executor = get_executor()
+        futures = [
+            executor.submit(contextvars.copy_context().run, _run_in_worker, request, specs[group[0]], pinned)
+            for group in groups
+        ]
+        results = [future.result() for future in futures]
+    for group, result in zip(groups, results):
+        for index in group:
+            responses[index] = result
+
+
+class BatchView(APIView):
+    """Run several API calls in one request - public access, sub-requests keep their own permissions"""
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'responses': run_batch(request, serializer.validated_data['requests'])})
@@ -0,0 +1,114 @@
+"""
+Primary/replica database routing.
+
+Reads go to the aliases listed in settings.DATABASE_REPLICAS; writes always
+go to the primary ('default'). A request is pinned to the primary for the
+rest of its lifetime once it writes (or if it is an unsafe method), inside
+transactions, and for REPLICA_PIN_SECONDS afterwards via a cookie, so
+clients read their own writes despite replication lag.
+
+Pinning on write only applies inside a request (ReplicaPinningMiddleware);
+management commands, the task worker and the shell would otherwise stay on
+the primary for good after their first write. Outside a request, wrap reads
+that must see earlier writes in pinned_to_primary(True) or a transaction.
+"""
+
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+_in_request = ContextVar('in_request', default=False)
+_cycle_lock = threading.Lock()
+_cycles = {}
+
+
+def pin_to_primary():
+    """Send all further reads of the current request/context to the primary"""
+    _pinned.set(True)
+
+
+def wrote_to_primary():
+    """True once the current request/context has written to the primary"""
+    return _wrote.get()
+
+
+@contextmanager
+def pinned_to_primary(pinned):
+    """Pin or unpin the reads of the current context for the duration of the block"""
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def _next_replica(replicas):
+    key = tuple(replicas)
+    with _cycle_lock:
+        if key not in _cycles:
+            _cycles[key] = itertools.cycle(key)
+        return next(_cycles[key])
+
+
+class PrimaryReplicaRouter:
+    """Round-robin reads over replicas, everything else on the primary"""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return _next_replica(replicas)
+
+    def db_for_write(self, model, **hints):
+        if _in_request.get():
+            _pinned.set(True)
+            _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Scope primary pinning to one request and carry it over by cookie"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        request_token = _in_request.set(True)
+        pinned_token = _pinned.set(pinned)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+            _in_request.reset(request_token)
+
+        if wrote and getattr(settings, 'DATABASE_REPLICAS', []):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
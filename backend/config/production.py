@@ -0,0 +1,44 @@
+"""
+Production settings: config.settings with debugging off.
+
+config.wsgi, config.asgi and gunicorn.conf.py use this module. DEBUG is off,
+so connections no longer keep every query of the process in
+connection.queries. Responses are JSON only (no browsable API templates),
+connections are reused across requests, and errors are logged to the
+console, which gunicorn collects.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REST_FRAMEWORK, SECRET_KEY
+
+DEBUG = False
+
+if not SECRET_KEY or SECRET_KEY.startswith('django-insecure'):
+    raise ImproperlyConfigured('Set SECRET_KEY to run with production settings')
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ('rest_framework.renderers.JSONRenderer',),
+}
+
+# Seconds each worker thread keeps its database connections between requests
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '60')), 'CONN_HEALTH_CHECKS': True}
+    for alias, database in DATABASES.items()
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.getenv('LOG_LEVEL', 'WARNING'),
+    },
+}
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     # Local apps
     'accounts',
     'items',
+    'taskqueue',
 ]
 
 # Custom User Model
@@ -58,6 +59,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'config.db_routing.ReplicaPinningMiddleware',
+    'items.coherence.CatalogCoherenceMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -91,10 +94,60 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('SQLITE_PATH') or BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent
+            # stock updates queue up instead of failing mid-transaction
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # File-backed test database so concurrency tests can use real connections
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+if os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+    }
+    # Trigram lookups used by items.search
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Read replicas: comma-separated hosts sharing the primary's credentials
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('DATABASE_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.db_routing.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it wrote (replication lag)
+REPLICA_PIN_SECONDS = 5
+
+
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Optional cache shared by all workers (e.g. redis://localhost:6379/0)
+if os.getenv('SHARED_CACHE_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('SHARED_CACHE_URL'),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -114,6 +167,54 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/6.0/topics/auth/passwords/
+# The first hasher of the profile hashes new passwords; the rest still verify
+# older hashes, which Django rehashes with the preferred hasher on login.
+
+LEGACY_PASSWORD_HASHERS = [
+    'accounts.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASHER_PROFILES = {
+    # Never use outside tests: MD5 is only fast, not secure
+    'fast': ['django.contrib.auth.hashers.MD5PasswordHasher'] + LEGACY_PASSWORD_HASHERS,
+    'default': LEGACY_PASSWORD_HASHERS,
+    # Requires argon2-cffi
+    'argon2': ['django.contrib.auth.hashers.Argon2PasswordHasher'] + LEGACY_PASSWORD_HASHERS,
+    # Requires bcrypt
+    'bcrypt': ['django.contrib.auth.hashers.BCryptSHA256PasswordHasher'] + LEGACY_PASSWORD_HASHERS,
+}
+
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[os.getenv('PASSWORD_HASHER_PROFILE', 'default')]
+
+# PBKDF2 work factor; Django's default is used when unset
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '0')) or None
+
+# Bulk staff import (accounts.provisioning): processes hashing passwords
+# (all CPUs when unset) and the largest file accepted
+STAFF_IMPORT_WORKERS = int(os.getenv('STAFF_IMPORT_WORKERS', '0')) or None
+STAFF_IMPORT_MAX_ROWS = 10000
+
+
+# Batch endpoint (config.batch): most sub-requests per batch, and threads
+# running the read-only ones concurrently (1 runs them one after another)
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+
+# Admin changelists count rows exactly up to this many, then estimate
+# (config.admin_pagination)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Milliseconds a cold start (django.setup() and the URLconf) may spend
+# importing modules before `manage.py profile_startup` and the tests fail
+# (config.startup)
+STARTUP_IMPORT_BUDGET_MS = 1000
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/6.0/topics/i18n/
@@ -147,8 +248,20 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Token bucket rates used by accounts.throttling (burst size / refill period)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '30/min',
+        'login_account': '10/min',
+        'refresh_ip': '120/min',
+        'register_ip': '10/min',
+        'purchase_ip': '300/min',
+        'purchase_user': '60/min',
+    },
 }
 
+# Cache alias for throttle buckets shared across workers; in-process buckets when unset
+THROTTLE_CACHE_ALIAS = os.getenv('THROTTLE_CACHE_ALIAS') or None
+
 
 # Simple JWT settings
 
@@ -158,6 +271,82 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Refresh token lifetime for cashier tills, so a till re-authenticates
+# through the refresh endpoint instead of the password path
+TILL_REFRESH_TOKEN_LIFETIME = timedelta(days=int(os.getenv('TILL_REFRESH_TOKEN_DAYS', '30')))
+
+
+# Background tasks (taskqueue app)
+# Run tasks inline on commit instead of queueing them for `manage.py runworker`
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False').lower() == 'true'
+# Seconds before a running task whose worker died is picked up again
+TASKS_LEASE_SECONDS = 300
+# Base delay in seconds for retries, doubled after every failed attempt
+TASKS_RETRY_DELAY = 5
+# Tasks queued after every committed purchase, called with purchase_id
+PURCHASE_TASKS = []
+# Opt-in group commit: concurrent purchases arriving within the window share
+# one transaction (see items.purchasing.GroupCommitDispatcher)
+PURCHASE_GROUP_COMMIT = os.getenv('PURCHASE_GROUP_COMMIT', 'False').lower() == 'true'
+PURCHASE_GROUP_COMMIT_WINDOW_MS = 5
+PURCHASE_GROUP_COMMIT_MAX_BATCH = 200
+# Months of purchases kept in the database (including the current one);
+# older months are moved to files by `manage.py archive_purchases`
+PURCHASE_HOT_MONTHS = int(os.getenv('PURCHASE_HOT_MONTHS', '3'))
+PURCHASE_ARCHIVE_DIR = os.getenv('PURCHASE_ARCHIVE_DIR') or str(BASE_DIR / 'archive')
+# Production planning (items.forecasting): weeks of history per forecast,
+# weeks in the displayed moving average, smoothing factor and the share
+# added on top of the forecast
+FORECAST_HISTORY_WEEKS = 12
+FORECAST_AVERAGE_WEEKS = 4
+FORECAST_SMOOTHING = 0.3
+FORECAST_SAFETY_MARGIN = 0.1
+# Cart holds (items.holds): minutes a hold reserves stock, and how many
+# unexpired holds one customer may have; run `manage.py release_holds`
+# every minute or so to return expired holds to stock
+STOCK_HOLD_MINUTES = int(os.getenv('STOCK_HOLD_MINUTES', '10'))
+STOCK_HOLDS_PER_USER = 20
+# Loose weight sales (items.pricing): 'rate' interpolates a per-gram rate
+# between an item's packs, 'packs' charges the cheapest packs covering the
+# weight. Prices are rounded to a multiple of WEIGHT_PRICE_ROUNDING paise and
+# tables cover up to WEIGHT_SALE_MAX_GRAMS per sale. Tables are kept in each
+# process (items.coherence) unless WEIGHT_PRICE_CACHE_ALIAS names a cache
+WEIGHT_PRICING = os.getenv('WEIGHT_PRICING', 'rate')
+WEIGHT_PRICE_ROUNDING = int(os.getenv('WEIGHT_PRICE_ROUNDING', '1'))
+WEIGHT_SALE_MAX_GRAMS = 10000
+WEIGHT_PRICE_CACHE_ALIAS = os.getenv('WEIGHT_PRICE_CACHE_ALIAS') or None
+# Backstop for SKU changes that bypass signals, such as queryset.update()
+WEIGHT_PRICE_CACHE_SECONDS = 3600
+# Price lists (items.pricelists): each process re-reads the schedule of
+# lists at least this often, so lists created elsewhere switch on in every
+# process once they are scheduled further ahead than this
+PRICE_LIST_SCHEDULE_SECONDS = 5
+# Most lines a cart can have to be priced in one request (items.promotions)
+CART_MAX_LINES = 10000
+# Largest offline purchase upload accepted in one request (items.purchasing)
+OFFLINE_BATCH_MAX_LINES = 10000
+# Offline sales older than this many seconds, or dated further ahead than the
+# allowed till clock skew, are rejected by the upload (items.purchasing)
+OFFLINE_MAX_AGE_SECONDS = int(os.getenv('OFFLINE_MAX_AGE_SECONDS', str(7 * 86400)))
+OFFLINE_CLOCK_SKEW_SECONDS = 300
+# Seconds after which a gap in catalog change versions is treated as a
+# rolled-back transaction rather than one still in flight (items.sync)
+SYNC_GAP_TIMEOUT = 30
+# Process-local catalog caches are checked against the change log once per
+# request, or at most once per this many seconds when above zero, which is
+# then how long another worker's write can go unseen (items.coherence)
+CATALOG_COHERENCE_SECONDS = float(os.getenv('CATALOG_COHERENCE_SECONDS', '0'))
+# Public item list (items.catalog): seconds it is fresh, seconds it is still
+# served stale while one request rebuilds it, and the longest a rebuild may
+# hold the lock others wait on. Kept in each process unless
+# CATALOG_CACHE_ALIAS names a cache shared by all workers
+CATALOG_CACHE_SECONDS = int(os.getenv('CATALOG_CACHE_SECONDS', '30'))
+CATALOG_STALE_SECONDS = 300
+CATALOG_LOCK_SECONDS = 10
+CATALOG_CACHE_ALIAS = os.getenv('CATALOG_CACHE_ALIAS') or None
+# Tasks queued when an item drops below its reorder level, called with alert_id
+LOW_STOCK_TASKS = []
+
 
 # CORS settings
 
@@ -0,0 +1,126 @@
+"""
+Dogpile protection for expensive cached values.
+
+cached() returns a value from a cache. When the value has to be recomputed,
+only one caller per key does the work:
+
+- Missing value: within a process, the first caller computes it and
+  concurrent callers wait for its result (SingleFlight). Across processes
+  sharing the cache, the caller holding the key's lock (cache.add) computes
+  it; the others wait up to lock_seconds for the value to appear and then
+  compute it themselves.
+- Expired value: the value is kept stale_seconds longer. The caller that
+  takes the lock recomputes it, and everyone else gets the stale value
+  meanwhile (stale-while-revalidate).
+
+expire() marks a value stale without dropping it, so a write triggers a
+refresh without making readers wait for it.
+"""
+
+import threading
+import time
+
+# Seconds between looks at the cache while another process computes a value
+POLL_SECONDS = 0.01
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """One call per key at a time in this process; concurrent callers for the key share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if leader:
+            try:
+                flight.value = func()
+            except Exception as exc:
+                flight.error = exc
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+
+_flights = SingleFlight()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _fresh(entry):
+    return entry is not None and time.time() < entry[1]
+
+
+def _store(cache, key, compute, fresh_seconds, stale_seconds):
+    value = compute()
+    cache.set(key, (value, time.time() + fresh_seconds), fresh_seconds + stale_seconds)
+    return value
+
+
+def _fill(cache, key, compute, fresh_seconds, stale_seconds, lock_seconds):
+    """Compute a missing value, or wait for the process holding the lock to store it"""
+    deadline = time.monotonic() + lock_seconds
+    while not cache.add(_lock_key(key), 1, lock_seconds):
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() > deadline:
+            # The lock holder died or is too slow to wait for
+            return _store(cache, key, compute, fresh_seconds, stale_seconds)
+        time.sleep(POLL_SECONDS)
+    try:
+        # Another process may have stored it between our miss and taking the lock
+        entry = cache.get(key)
+        if _fresh(entry):
+            return entry[0]
+        return _store(cache, key, compute, fresh_seconds, stale_seconds)
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def cached(cache, key, compute, fresh_seconds, stale_seconds, lock_seconds):
+    """The cached value of `key`, computed by compute() with at most one caller computing it at a time"""
+    entry = cache.get(key)
+    if _fresh(entry):
+        return entry[0]
+    if entry is None:
+        return _flights.run((id(cache), key), lambda: _fill(cache, key, compute, fresh_seconds, stale_seconds,
+                                                              lock_seconds))
+    if not cache.add(_lock_key(key), 1, lock_seconds):
+        return entry[0]
+    try:
+        entry = cache.get(key)
+        if _fresh(entry):
+            return entry[0]
+        return _store(cache, key, compute, fresh_seconds, stale_seconds)
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def expire(cache, key, stale_seconds):
+    """Mark a cached value stale: the next caller refreshes it while the others still get it"""
+    # has_key() first: a miss in get() may start tracking (items.coherence.LocalCache)
+    if cache.has_key(key):
+        entry = cache.get(key)
+        if entry is not None:
+            cache.set(key, (entry[0], 0), stale_seconds)
@@ -0,0 +1,83 @@
+"""
+Cold start profile: what importing the project costs a new process.
+
+profile() starts a fresh interpreter with `-X importtime` that runs
+django.setup(), as manage.py does, and with urls=True also loads the URLconf
+and every view, as a worker does on its first request. It sums each imported
+module's own import time into the installed app it belongs to (or its
+top-level package, or 'python' for the standard library).
+
+LAZY_MODULES are imported where they are used rather than at startup; the
+tests check they stay out of a cold start.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+LAZY_MODULES = ('numpy', 'items.reports', 'items.forecasting', 'items.columnar', 'accounts.provisioning')
+
+SETUP = 'import django; django.setup()'
+URLS = 'from django.urls import get_resolver; get_resolver().url_patterns'
+REPORT = 'import sys; print(",".join(sorted(sys.modules)))'
+
+# import time:  self [us] | cumulative | imported package
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| *(\S+)')
+
+
+def parse_importtime(output):
+    """(module, self us, cumulative us) for each line of `-X importtime` output"""
+    rows = []
+    for line in output.splitlines():
+        match = LINE.match(line)
+        if match:
+            rows.append((match[3], int(match[1]), int(match[2])))
+    return rows
+
+
+def group_of(module, app_modules):
+    """The installed app, third-party package or 'python' a module belongs to"""
+    for name in app_modules:
+        if module == name or module.startswith(name + '.'):
+            return name
+    top = module.split('.')[0]
+    if top in sys.stdlib_module_names or top.startswith('_'):
+        return 'python'
+    return top
+
+
+def profile(urls=True):
+    """Import times of a cold start, grouped by app, with the modules it loaded"""
+    code = '; '.join([SETUP, URLS, REPORT] if urls else [SETUP, REPORT])
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    # Longest names first, so django.contrib.admin wins over django
+    app_modules = sorted((config.name for config in apps.get_app_configs()), key=len, reverse=True)
+    rows = parse_importtime(result.stderr)
+    groups = {}
+    for module, self_us, _ in rows:
+        group = groups.setdefault(group_of(module, app_modules), [0, 0])
+        group[0] += self_us
+        group[1] += 1
+    # This project's apps, for the slowest modules of our own
+    local = [config.name for config in apps.get_app_configs() if config.path.startswith(str(settings.BASE_DIR))]
+    local.append('config')
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': sum(row[1] for row in rows) / 1000,
+        'groups': sorted(((name, us / 1000, count) for name, (us, count) in groups.items()), key=lambda g: -g[1]),
+        'slowest': sorted(
+            ((module, cumulative / 1000) for module, _, cumulative in rows if group_of(module, local) in local),
+            key=lambda m: -m[1],
+        ),
+        'modules': set(result.stdout.strip().split(',')),
+    }
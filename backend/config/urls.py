@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .batch import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/items/', include('items.urls')),
+    path('api/batch', BatchView.as_view(), name='batch'),
 ]
@@ -2,6 +2,8 @@
 WSGI config for config project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Servers load it with the production settings unless DJANGO_SETTINGS_MODULE
+says otherwise; gunicorn.conf.py holds the worker model.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
@@ -11,6 +13,6 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.production')
 
 application = get_wsgi_application()
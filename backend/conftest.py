@@ -0,0 +1,44 @@
+import pytest
+
+
+def pytest_configure(config):
+    """Hash fixture passwords with the fast test-only profile"""
+    from django.conf import settings
+    from django.contrib.auth.hashers import get_hashers
+    from django.db import connections
+    settings.PASSWORD_HASHERS = settings.PASSWORD_HASHER_PROFILES['fast']
+    get_hashers.cache_clear()
+
+    # Separate database file standing in for a read replica; only tests that
+    # ask for it (databases=[..., 'replica']) and set DATABASE_REPLICAS use it
+    if 'replica' not in settings.DATABASES and settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        settings.DATABASES['replica'] = {
+            **settings.DATABASES['default'],
+            'TEST': {'NAME': settings.BASE_DIR / 'test_replica.sqlite3'},
+        }
+        # Fill in connection defaults for the alias added after startup
+        connections.configure_settings(settings.DATABASES)
+
+
+@pytest.fixture(autouse=True)
+def reset_throttles():
+    """Start every test with full throttle buckets"""
+    from accounts.throttling import reset_bucket_store
+    reset_bucket_store()
+    yield
+    reset_bucket_store()
+
+
+@pytest.fixture(autouse=True)
+def reset_pricing():
+    """Start every test with no price lists, promotions or process-local catalog caches loaded"""
+    from items.coherence import reset_coherence
+    from items.pricelists import reset_price_lists
+    from items.promotions import reset_promotions
+    reset_price_lists()
+    reset_promotions()
+    reset_coherence()
+    yield
+    reset_price_lists()
+    reset_promotions()
+    reset_coherence()
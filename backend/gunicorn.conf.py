@@ -0,0 +1,48 @@
+"""
+gunicorn settings for production; from backend/ run `gunicorn config.wsgi`.
+
+Workers are processes, WEB_CONCURRENCY of them (2 x CPUs + 1 when unset),
+each serving GUNICORN_THREADS requests at a time. With more than one thread
+workers use the gthread worker, which also keeps idle keep-alive connections
+open without tying up a thread; sync workers close every connection after
+its response and expect a buffering proxy such as nginx in front.
+
+The app is imported once in the master before workers fork, so they share
+its memory pages. Each worker is replaced after roughly GUNICORN_MAX_REQUESTS
+requests (staggered so they do not all restart at once) to bound memory
+growth. benchmarks/bench_server.py sweeps worker and thread counts.
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.production')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.getenv('WEB_CONCURRENCY', '0')) or multiprocessing.cpu_count() * 2 + 1
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = True
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# Seconds an idle keep-alive connection stays open (gthread workers)
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = timeout
+
+# Worker heartbeat files in memory; a slow disk can make workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def pre_fork(server, worker):
+    # Connections opened while the app was preloaded must not be shared by workers
+    from django.db import connections
+    connections.close_all()
@@ -1,3 +1,164 @@
+import uuid
+
 from django.contrib import admin
+from django.utils import timezone
+
+from config.admin_pagination import EstimatedCountPaginator
+from .holds import release_holds
+from .models import Item, SKU, Store, StoreStock, PriceList, PriceListEntry, Promotion, Purchase, StockHold, LowStockAlert
+from .money import format_paise
+
+# List filters only use indexed columns (foreign keys, created_at) on the
+# large tables, so filtering never scans purchases or holds.
+
+
+class SKUInline(admin.TabularInline):
+    model = SKU
+    fields = ['code', 'unit_value', 'price', 'is_active']
+    extra = 0
+
+
+@admin.register(Item)
+class ItemAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'sale_type', 'inventory_qty', 'held_qty', 'reorder_level', 'is_active', 'updated_at']
+    list_filter = ['category', 'sale_type', 'is_active']
+    search_fields = ['name']
+    ordering = ['name']
+    readonly_fields = ['held_qty']
+    inlines = [SKUInline]
+
+
+@admin.register(SKU)
+class SKUAdmin(admin.ModelAdmin):
+    list_display = ['code', 'item', 'unit_value', 'price_rupees', 'is_active']
+    list_select_related = ['item']
+    list_filter = ['is_active']
+    search_fields = ['code', 'item__name']
+    autocomplete_fields = ['item']
+    ordering = ['code']
+
+    @admin.display(description='Price', ordering='price')
+    def price_rupees(self, obj):
+        return format_paise(obj.price)
+
+
+@admin.register(Store)
+class StoreAdmin(admin.ModelAdmin):
+    list_display = ['name', 'latitude', 'longitude', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['name']
+    ordering = ['name']
+
+
+@admin.register(StoreStock)
+class StoreStockAdmin(admin.ModelAdmin):
+    list_display = ['store', 'item', 'inventory_qty', 'updated_at']
+    list_select_related = ['store', 'item']
+    list_filter = ['store']
+    search_fields = ['item__name']
+    autocomplete_fields = ['store', 'item']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PriceListEntryInline(admin.TabularInline):
+    model = PriceListEntry
+    fields = ['sku', 'price']
+    autocomplete_fields = ['sku']
+    extra = 0
+
+
+@admin.register(PriceList)
+class PriceListAdmin(admin.ModelAdmin):
+    """Lists are written once: a price change is a new list, and only lists not yet in effect can be deleted"""
+
+    list_display = ['id', 'name', 'effective_from', 'created_at']
+    list_filter = ['effective_from']
+    search_fields = ['name']
+    inlines = [PriceListEntryInline]
+    actions = None
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return obj is not None and obj.effective_from > timezone.now() and super().has_delete_permission(request, obj)
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'priority', 'category', 'item', 'starts_at', 'ends_at', 'is_active']
+    list_select_related = ['item']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name']
+    autocomplete_fields = ['item']
+    ordering = ['-priority', 'id']
+
+
+@admin.register(Purchase)
+class PurchaseAdmin(admin.ModelAdmin):
+    """Sales are records: they can be browsed but not added or edited here"""
+
+    list_display = ['id', 'created_at', 'user', 'sku', 'store', 'quantity', 'total_rupees', 'price_list', 'promotion']
+    list_select_related = ['user', 'sku__item', 'store', 'price_list', 'promotion']
+    list_filter = ['created_at', 'store']
+    search_fields = ['id', 'client_id']
+    autocomplete_fields = ['user', 'sku', 'store']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Total', ordering='total_price')
+    def total_rupees(self, obj):
+        return format_paise(obj.total_price)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Exact key lookups only: the default text matching scans the whole table
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            pk = int(term)
+            return (queryset.filter(pk=pk) if pk < 2 ** 63 else queryset.none()), False
+        try:
+            client_id = uuid.UUID(term)
+        except ValueError:
+            return queryset.none(), False
+        return queryset.filter(client_id=client_id), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    """Holds are placed from carts; deleting one here releases its stock like the cart would"""
+
+    list_display = ['id', 'user', 'sku', 'quantity', 'units', 'expires_at']
+    list_select_related = ['user', 'sku__item']
+    list_filter = ['expires_at']
+    autocomplete_fields = ['user', 'item', 'sku']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        release_holds([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        release_holds(queryset.values_list('pk', flat=True))
+
 
-# Register your models here.
+@admin.register(LowStockAlert)
+class LowStockAlertAdmin(admin.ModelAdmin):
+    list_display = ['item', 'inventory_qty', 'reorder_level', 'created_at']
+    list_select_related = ['item']
+    list_filter = ['created_at']
+    autocomplete_fields = ['item']
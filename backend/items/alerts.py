@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from taskqueue.queue import enqueue
+from .models import LowStockAlert
+
+
+def record_stock_change(item, previous_qty):
+    """Raise a low-stock alert if this stock change crossed the reorder level.
+
+    Call after ``item.inventory_qty`` has been updated. Changes that do not
+    cross the threshold cost no queries.
+    """
+    if not item.crossed_reorder_level(previous_qty):
+        return None
+    alert = LowStockAlert.objects.create(
+        item=item,
+        inventory_qty=item.inventory_qty,
+        reorder_level=item.reorder_level,
+    )
+    for task_name in settings.LOW_STOCK_TASKS:
+        enqueue(task_name, alert_id=alert.id)
+    return alert
@@ -0,0 +1,135 @@
+"""Monthly partitioning and archival of purchase history.
+
+On PostgreSQL items_purchase is range-partitioned by month (migration 0009):
+new months get their own partition ahead of time and archiving a closed month
+detaches and drops its partition instead of deleting rows one by one. SQLite
+has no partitioning, so there the purchase table holds the hot months and
+archiving deletes closed months after writing them out. Either way each
+archived month ends up as a columnar segment (see items.columnar) under
+PURCHASE_ARCHIVE_DIR.
+"""
+import shutil
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .columnar import Segment, write_segment
+from .models import Purchase, PurchaseArchive
+
+UTC = dt_timezone.utc
+FIELDS = [
+    'id', 'user_id', 'sku_id', 'quantity', 'total_price', 'created_at', 'client_id', 'store_id',
+    'price_list_id', 'promotion_id',
+]
+
+
+def period_of(moment):
+    """Return the YYYYMM period (UTC) a datetime falls in"""
+    return moment.astimezone(UTC).strftime('%Y%m')
+
+
+def add_months(period, months):
+    index = int(period[:4]) * 12 + int(period[4:]) - 1 + months
+    return f'{index // 12:04d}{index % 12 + 1:02d}'
+
+
+def period_bounds(period):
+    """Return the [start, end) datetimes of a period"""
+    start = datetime(int(period[:4]), int(period[4:]), 1, tzinfo=UTC)
+    following = add_months(period, 1)
+    return start, datetime(int(following[:4]), int(following[4:]), 1, tzinfo=UTC)
+
+
+def partition_name(period):
+    return f'items_purchase_{period}'
+
+
+def _table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    return cursor.fetchone()[0] is not None
+
+
+@transaction.atomic
+def create_partition(period):
+    """Create the partition for a period; return False if it already exists (PostgreSQL only)"""
+    name = partition_name(period)
+    start, end = period_bounds(period)
+    with connection.cursor() as cursor:
+        if _table_exists(cursor, name):
+            return False
+        # Rows for the month may already sit in the default partition, which
+        # would make the new bounds overlap it
+        cursor.execute('ALTER TABLE items_purchase DETACH PARTITION items_purchase_default')
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF items_purchase "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        cursor.execute(
+            'INSERT INTO items_purchase SELECT * FROM items_purchase_default '
+            'WHERE created_at >= %s AND created_at < %s', [start, end]
+        )
+        cursor.execute('DELETE FROM items_purchase_default WHERE created_at >= %s AND created_at < %s', [start, end])
+        cursor.execute('ALTER TABLE items_purchase ATTACH PARTITION items_purchase_default DEFAULT')
+    return True
+
+
+def ensure_partitions(months_ahead=2):
+    """Make sure the current month and the next `months_ahead` have partitions"""
+    if connection.vendor != 'postgresql':
+        return []
+    current = period_of(timezone.now())
+    periods = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    return [period for period in periods if create_partition(period)]
+
+
+def closed_periods(keep_months):
+    """Periods with purchases that are older than the last `keep_months` months"""
+    cutoff, _ = period_bounds(add_months(period_of(timezone.now()), 1 - keep_months))
+    months = Purchase.objects.filter(created_at__lt=cutoff).datetimes('created_at', 'month', tzinfo=UTC)
+    return [period_of(month) for month in months]
+
+
+def archive_period(period):
+    """Move one month of purchases from the database into an archive segment.
+
+    The export and the removal share a transaction, and sales for the month
+    are blocked meanwhile, so no row can be removed without being written.
+    Returns the PurchaseArchive, or None if the month had no rows.
+    """
+    start, end = period_bounds(period)
+    directory = Path(settings.PURCHASE_ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    rows = Purchase.objects.filter(created_at__gte=start, created_at__lt=end)
+
+    with transaction.atomic():
+        partitioned = connection.vendor == 'postgresql'
+        if partitioned:
+            with connection.cursor() as cursor:
+                has_partition = _table_exists(cursor, partition_name(period))
+                # Only this month's partition is locked; other sales carry on
+                locked = partition_name(period) if has_partition else 'items_purchase_default'
+                cursor.execute(f'LOCK TABLE {locked} IN SHARE MODE')
+
+        part = (PurchaseArchive.objects.filter(period=period).aggregate(Max('part'))['part__max'] or 0) + 1
+        path = directory / f'purchases-{period}-{part}'
+        count = write_segment(path, rows.values_list(*FIELDS).iterator(chunk_size=5000))
+        if count == 0:
+            shutil.rmtree(path)
+            return None
+
+        if partitioned and has_partition:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE items_purchase DETACH PARTITION {partition_name(period)}')
+                cursor.execute(f'DROP TABLE {partition_name(period)}')
+        # Late offline sales for a dropped month land in the default partition
+        rows.delete()
+        return PurchaseArchive.objects.create(period=period, part=part, path=str(path), rows=count)
+
+
+def read_archive(path):
+    """Yield purchase tuples in FIELDS order"""
+    return Segment(path).rows()
@@ -0,0 +1,57 @@
+"""The public item list, cached with dogpile protection (config.singleflight).
+
+ListItemsView's payload is fresh for CATALOG_CACHE_SECONDS. For
+CATALOG_STALE_SECONDS after that it is still served while one request
+rebuilds it, so a busy moment never has every request running the same
+query and serialization at once. It is kept in each process, where item
+writes from other processes mark it stale through items.coherence, unless
+CATALOG_CACHE_ALIAS names a cache shared by all workers, which then also
+holds the rebuild lock. Stock moves (sales, holds) leave it alone, as it
+carries no stock.
+
+Item writes made here mark the payload stale now and again once the
+transaction commits, like the weight price tables. The second time catches
+a payload rebuilt from the rows as they were before the commit.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from config.singleflight import cached, expire
+
+from .coherence import LocalCache
+from .models import Item, CatalogChange
+from .serializers import ItemSerializer
+
+ITEM_LIST_KEY = 'catalog:items'
+
+
+def _mark_stale(cache):
+    expire(cache, ITEM_LIST_KEY, settings.CATALOG_STALE_SECONDS)
+
+
+# The payload kept in this process, marked stale when another process changes an item
+local_catalog = LocalCache([CatalogChange.Kind.ITEM], on_change=_mark_stale)
+
+
+def _cache():
+    if settings.CATALOG_CACHE_ALIAS:
+        return caches[settings.CATALOG_CACHE_ALIAS]
+    return local_catalog
+
+
+def build_item_list():
+    """Serialized active items, as plain dicts"""
+    return [dict(row) for row in ItemSerializer(Item.objects.filter(is_active=True), many=True).data]
+
+
+def item_list():
+    """The cached ListItemsView payload; only one caller rebuilds it at a time"""
+    return cached(_cache(), ITEM_LIST_KEY, build_item_list, settings.CATALOG_CACHE_SECONDS,
+                  settings.CATALOG_STALE_SECONDS, settings.CATALOG_LOCK_SECONDS)
+
+
+def invalidate_item_list():
+    """Mark the item list stale now and again once the current transaction commits"""
+    expire(_cache(), ITEM_LIST_KEY, settings.CATALOG_STALE_SECONDS)
+    transaction.on_commit(lambda: expire(_cache(), ITEM_LIST_KEY, settings.CATALOG_STALE_SECONDS))
@@ -0,0 +1,180 @@
+"""Keeping process-local catalog caches coherent across workers.
+
+Every gunicorn worker holds its own LocalCache entries, so a write handled
+by one worker must reach the others. Item and SKU writes already append to
+the CatalogChange log inside their transaction (items.sync), so the log is
+the shared version counter: each process remembers the last change it has
+applied, and check() reads the ids of the changes after it. That is one
+indexed query, which normally returns nothing, and it runs without holding
+the module lock so a worker's threads never wait on each other's queries.
+Any LocalCache that depends on a kind that changed is cleared, or marked
+stale when it was created with on_change. Stock-only changes (sales, holds)
+are logged as their own kind, so they leave catalog caches alone.
+
+CatalogCoherenceMiddleware runs check() at the start of every request, or
+at most once per CATALOG_COHERENCE_SECONDS when that is set. A worker
+therefore stops serving an entry within that interval (plus the request in
+flight) after the write commits. Code outside the request cycle, such as
+task workers, calls check() itself.
+
+Changes can commit out of id order, so the position only moves up to the
+first gap that an open transaction may still fill, as for catalog sync.
+Changes past the gap are applied once, and the gap is read again on later
+checks. check() reads through the database router, so a worker on a replica
+sees a change no earlier than the rows it rebuilds from.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import CatalogChange
+from .sync import visible_prefix
+
+_lock = threading.Lock()
+_caches = []
+_cursor = None  # last change applied; None until something is cached
+_applied = set()  # changes past a gap in the log that were already applied
+_checked_at = float('-inf')
+
+
+class LocalCache:
+    """Process-local entries derived from catalog rows of `kinds`, cleared when any of them changes in any process.
+
+    on_change(cache), when given, runs instead of clearing, e.g. to mark entries stale. Implements the part of
+    Django's cache API used here (get, has_key, set, add, delete, delete_many, clear).
+    """
+
+    def __init__(self, kinds, on_change=None):
+        self.kinds = frozenset(kinds)
+        self.on_change = on_change
+        self._entries = {}
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def changed(self):
+        """A row of one of the cache's kinds changed in some process"""
+        if self.on_change is None:
+            self.clear()
+        else:
+            self.on_change(self)
+
+    def _live(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+            return entry
+        return None
+
+    def get(self, key, default=None):
+        entry = self._live(key)
+        if entry is not None:
+            return entry[1]
+        # The position must be taken before the caller reads the rows it caches
+        _start()
+        return default
+
+    def has_key(self, key):
+        return self._live(key) is not None
+
+    def set(self, key, value, timeout=None):
+        self._entries[key] = (None if timeout is None else time.monotonic() + timeout, value)
+
+    def add(self, key, value, timeout=None):
+        """Set a key that holds no live entry; True if it was set"""
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self.set(key, value, timeout)
+            return True
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _start(limit=1000):
+    """Take the position at the last change no open transaction can precede; count newer ones as applied"""
+    global _cursor
+    if _cursor is None:
+        with _lock:
+            if _cursor is None:
+                settled = timezone.now() - timedelta(seconds=settings.SYNC_GAP_TIMEOUT)
+                recent = list(CatalogChange.objects.only('pk', 'created_at').order_by('-pk')[:limit])[::-1]
+                cursor = next((change.pk for change in reversed(recent) if change.created_at <= settled),
+                              recent[0].pk - 1 if recent else 0)
+                newer = [change for change in recent if change.pk > cursor]
+                visible = visible_prefix(newer, cursor)
+                if visible:
+                    cursor = visible[-1].pk
+                _applied.update(change.pk for change in newer if change.pk > cursor)
+                _cursor = cursor
+
+
+def _ids_after(cursor, limit):
+    """Ids of changes after `cursor`; raw SQL, as this runs on every request and the ORM would cost more than the query"""
+    connection = connections[router.db_for_read(CatalogChange)]
+    with connection.cursor() as db:
+        db.execute(f'SELECT id FROM {CatalogChange._meta.db_table} WHERE id > %s ORDER BY id LIMIT %s', [cursor, limit])
+        return [row[0] for row in db.fetchall()]
+
+
+def check(limit=10000):
+    """Update local caches whose rows changed since the last check; return the kinds that changed"""
+    global _cursor, _checked_at
+    if _cursor is None or time.monotonic() - _checked_at < settings.CATALOG_COHERENCE_SECONDS:
+        return set()
+    _checked_at = time.monotonic()
+    cursor = _cursor
+    ids = _ids_after(cursor, limit)
+    if all(pk in _applied for pk in ids):
+        return set()
+    changes = list(CatalogChange.objects.filter(pk__gt=cursor, pk__lte=ids[-1])
+                   .only('pk', 'kind', 'created_at').order_by('pk'))
+    with _lock:
+        if _cursor != cursor:
+            # Another thread applied changes meanwhile; the next check reads from its position
+            return set()
+        kinds = {change.kind for change in changes if change.pk not in _applied}
+        visible = visible_prefix(changes, _cursor)
+        if visible:
+            _cursor = visible[-1].pk
+        _applied.clear()
+        _applied.update(change.pk for change in changes if change.pk > _cursor)
+    for cache in _caches:
+        if cache.kinds & kinds:
+            cache.changed()
+    return kinds
+
+
+def reset_coherence():
+    """Forget the position and every local entry"""
+    global _cursor, _checked_at
+    with _lock:
+        _cursor = None
+        _applied.clear()
+        _checked_at = float('-inf')
+    for cache in _caches:
+        cache.clear()
+
+
+class CatalogCoherenceMiddleware:
+    """Drop stale catalog entries before each request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        check()
+        return self.get_response(request)
@@ -0,0 +1,192 @@
+"""Columnar, memory-mapped storage of purchase history for analytics.
+
+A segment is a directory with one fixed-width .npy array per column, rows
+sorted by sale time. Readers memory-map the columns, so opening a segment
+costs nothing and aggregates only page in the columns they use. Aggregates
+run over chunks of rows with vectorized NumPy operations instead of building
+model instances.
+"""
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+
+UTC = dt_timezone.utc
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROS_PER_DAY = 86_400_000_000
+CHUNK_ROWS = 1 << 22
+
+COLUMNS = {
+    'id': np.int64,
+    'user_id': np.int32,
+    'sku_id': np.int32,
+    'quantity': np.int32,
+    'price_paise': np.int64,
+    'created_at': np.int64,  # microseconds since the Unix epoch, UTC
+    'client_id': np.dtype('V16'),  # UUID bytes, all zero when unset
+    'store_id': np.int32,  # 0 for sales from central stock
+    'price_list_id': np.int32,  # 0 when priced from SKU list prices
+    'promotion_id': np.int32,  # 0 when no promotion applied
+}
+NO_CLIENT_ID = bytes(16)
+
+
+def to_micros(moment):
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    seconds, micros = divmod(int(micros), 1_000_000)
+    return datetime.fromtimestamp(seconds, UTC).replace(microsecond=micros)
+
+
+def day_of(micros):
+    """Return the UTC date of an epoch-microsecond timestamp"""
+    return from_micros(int(micros) // MICROS_PER_DAY * MICROS_PER_DAY).date()
+
+
+def save_segment(path, columns):
+    """Write column arrays as a segment, sorted by created_at.
+
+    The segment is built in a temporary directory and renamed into place, so
+    readers never see a partial segment.
+    """
+    path = Path(path)
+    order = np.argsort(columns['created_at'], kind='stable')
+    temporary = path.with_name(path.name + '.tmp')
+    shutil.rmtree(temporary, ignore_errors=True)
+    temporary.mkdir(parents=True)
+    for name, dtype in COLUMNS.items():
+        data = np.asarray(columns[name]).astype(dtype, copy=False)[order]
+        with open(temporary / f'{name}.npy', 'wb') as stream:
+            np.save(stream, data)
+            stream.flush()
+            os.fsync(stream.fileno())
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary, path)
+    return len(order)
+
+
+def write_segment(path, rows):
+    """Write purchase rows in items.archive.FIELDS order; return the count"""
+    columns = {name: [] for name in COLUMNS}
+    for pk, user_id, sku_id, quantity, total_price, created_at, client_id, store_id, price_list_id, promotion_id in rows:
+        columns['id'].append(pk)
+        columns['user_id'].append(user_id)
+        columns['sku_id'].append(sku_id)
+        columns['quantity'].append(quantity)
+        columns['price_paise'].append(total_price)
+        columns['created_at'].append(to_micros(created_at))
+        columns['client_id'].append(client_id.bytes if client_id else NO_CLIENT_ID)
+        columns['store_id'].append(store_id or 0)
+        columns['price_list_id'].append(price_list_id or 0)
+        columns['promotion_id'].append(promotion_id or 0)
+    arrays = {name: np.array(values, dtype=COLUMNS[name]) for name, values in columns.items()}
+    arrays['client_id'] = np.frombuffer(b''.join(columns['client_id']), dtype=COLUMNS['client_id'])
+    return save_segment(path, arrays)
+
+
+def _group_sums(keys, weights):
+    """Sum each array in `weights` per distinct key; return (keys, [sums]).
+
+    Uses a dense bincount when the key range is small and a sort otherwise.
+    Sums are exact for integers while each total stays below 2**53.
+    """
+    if not len(keys):
+        return keys[:0], [np.zeros(0, dtype=np.int64) for _ in weights]
+    low = int(keys.min())
+    span = int(keys.max()) - low + 1
+    if span <= max(4 * len(keys), 1 << 20):
+        index = keys - low
+        present = np.flatnonzero(np.bincount(index, minlength=span))
+        sums = [np.bincount(index, weights=w, minlength=span)[present] for w in weights]
+        keys = present + low
+    else:
+        keys, index = np.unique(keys, return_inverse=True)
+        sums = [np.bincount(index, weights=w) for w in weights]
+    return keys, [np.rint(s).astype(np.int64) for s in sums]
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment directory"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._columns = {}
+
+    def column(self, name):
+        if name not in self._columns:
+            path = self.path / f'{name}.npy'
+            if path.exists():
+                self._columns[name] = np.load(path, mmap_mode='r')
+            else:
+                # Column added after the segment was written
+                self._columns[name] = np.zeros(len(self), dtype=COLUMNS[name])
+        return self._columns[name]
+
+    def __len__(self):
+        return len(self.column('id'))
+
+    def between(self, start=None, end=None):
+        """Row slice for start <= created_at < end, found by binary search"""
+        created = self.column('created_at')
+        first = 0 if start is None else int(np.searchsorted(created, to_micros(start), 'left'))
+        last = len(created) if end is None else int(np.searchsorted(created, to_micros(end), 'left'))
+        return slice(first, last)
+
+    @staticmethod
+    def _chunks(rows):
+        for first in range(rows.start, rows.stop, CHUNK_ROWS):
+            yield slice(first, min(first + CHUNK_ROWS, rows.stop))
+
+    def rows(self, start=None, end=None):
+        """Yield purchase tuples in items.archive.FIELDS order, with None for unset ids"""
+        for chunk in self._chunks(self.between(start, end)):
+            columns = [self.column(name)[chunk] for name in COLUMNS]
+            for pk, user_id, sku_id, quantity, paise, created_at, client_id, *optional_ids in zip(*columns):
+                client_id = client_id.tobytes()
+                yield (
+                    int(pk), int(user_id), int(sku_id), int(quantity), int(paise),
+                    from_micros(created_at), uuid.UUID(bytes=client_id) if client_id != NO_CLIENT_ID else None,
+                    # store_id, price_list_id, promotion_id
+                    *(int(value) or None for value in optional_ids),
+                )
+
+    def _aggregate(self, rows, by_day):
+        """Group quantity and revenue by SKU, or by (day, SKU), over a row slice"""
+        if rows.start >= rows.stop:
+            empty = np.zeros(0, dtype=np.int64)
+            return [empty] * (4 if by_day else 3)
+        skus = self.column('sku_id')[rows]
+        sku_low = int(skus.min())
+        sku_span = int(skus.max()) - sku_low + 1
+        # Rows are time-ordered, so the first row has the earliest day
+        first_day = int(self.column('created_at')[rows.start]) // MICROS_PER_DAY
+
+        partial = []
+        for chunk in self._chunks(rows):
+            # Dense keys keep the key range small enough for a bincount
+            keys = self.column('sku_id')[chunk].astype(np.int64) - sku_low
+            if by_day:
+                keys += (self.column('created_at')[chunk] // MICROS_PER_DAY - first_day) * sku_span
+            partial.append(_group_sums(keys, [self.column('quantity')[chunk], self.column('price_paise')[chunk]]))
+
+        keys = np.concatenate([keys for keys, _ in partial])
+        quantity = np.concatenate([sums[0] for _, sums in partial])
+        revenue = np.concatenate([sums[1] for _, sums in partial])
+        keys, (quantity, revenue) = _group_sums(keys, [quantity, revenue])
+        if by_day:
+            return [keys // sku_span + first_day, keys % sku_span + sku_low, quantity, revenue]
+        return [keys + sku_low, quantity, revenue]
+
+    def sales_by_day(self, start=None, end=None):
+        """Return (day number, sku_id, quantity, revenue in paise) arrays per UTC day and SKU"""
+        return self._aggregate(self.between(start, end), by_day=True)
+
+    def sales_by_sku(self, start=None, end=None):
+        """Return (sku_id, quantity, revenue in paise) arrays"""
+        return self._aggregate(self.between(start, end), by_day=False)
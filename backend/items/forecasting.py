@@ -0,0 +1,102 @@
+"""Demand forecasting for daily production planning.
+
+Sales history is loaded into an items x days matrix of units sold (grams for
+weight items, pieces for count items). Demand depends strongly on the day of
+the week, so a forecast for a date looks only at the same weekday in past
+weeks: an items x weeks matrix smoothed for all items at once.
+"""
+import math
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+
+from .models import Item
+from .reports import EPOCH_DATE, units_by_item_day
+
+
+def demand_matrix(item_ids, first_day, days, entries):
+    """Scatter (item_id, day number, units) arrays into an items x days matrix.
+
+    Row i belongs to item_ids[i], which must be sorted; column j to day
+    number first_day + j. Entries for other items or days are ignored.
+    """
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    if not len(item_ids):
+        return np.zeros((0, days))
+    entry_items, entry_days, entry_units = entries
+    rows = np.minimum(np.searchsorted(item_ids, entry_items), len(item_ids) - 1)
+    columns = entry_days - first_day
+    keep = (item_ids[rows] == entry_items) & (columns >= 0) & (columns < days)
+    flat = rows[keep] * days + columns[keep]
+    counts = np.bincount(flat, weights=entry_units[keep], minlength=len(item_ids) * days)
+    return counts.reshape(len(item_ids), days)
+
+
+def moving_average(series, window):
+    """Mean of the last `window` columns of each row"""
+    window = min(window, series.shape[1])
+    if window == 0:
+        return np.zeros(series.shape[0])
+    return series[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing(series, alpha):
+    """Simple exponential smoothing level of each row, oldest column first.
+
+    Equivalent to level = alpha * x + (1 - alpha) * level over the columns,
+    starting from the first value, but done as one weighted sum.
+    """
+    periods = series.shape[1]
+    if periods == 0:
+        return np.zeros(series.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(periods - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (periods - 1)
+    return series @ weights
+
+
+def forecast_day(matrix, first_day, day, alpha, window):
+    """Forecast demand on `day` from the same weekday in earlier weeks.
+
+    Returns (forecast, moving average of the last `window` weeks) arrays
+    with one value per row.
+    """
+    series = matrix[:, (day - first_day) % 7:day - first_day:7]
+    return exponential_smoothing(series, alpha), moving_average(series, window)
+
+
+def suggest_production(day, category=None):
+    """Suggested production for `day` for every active item.
+
+    The forecast is padded by FORECAST_SAFETY_MARGIN and reduced by the
+    stock on hand, so an item with enough stock gets a suggestion of 0.
+    """
+    items = Item.objects.filter(is_active=True).order_by('id')
+    if category:
+        items = items.filter(category=category)
+    items = list(items)
+    item_ids = [item.id for item in items]
+
+    weeks = settings.FORECAST_HISTORY_WEEKS
+    target = (day - EPOCH_DATE).days
+    first_day = target - weeks * 7
+    start = datetime.combine(day - timedelta(weeks=weeks), time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    matrix = demand_matrix(item_ids, first_day, weeks * 7, units_by_item_day(start, end))
+
+    forecast, average = forecast_day(
+        matrix, first_day, target, settings.FORECAST_SMOOTHING, settings.FORECAST_AVERAGE_WEEKS
+    )
+    margin = 1 + settings.FORECAST_SAFETY_MARGIN
+    return [
+        {
+            'item_id': item.id,
+            'name': item.name,
+            'sale_type': item.sale_type,
+            'inventory_qty': item.inventory_qty,
+            'average': round(avg, 1),
+            'forecast': round(expected, 1),
+            'suggested': max(0, math.ceil(round(expected * margin, 6)) - item.inventory_qty),
+        }
+        for item, expected, avg in zip(items, forecast.tolist(), average.tolist())
+    ]
@@ -0,0 +1,84 @@
+"""Cart holds: stock reserved for a customer for STOCK_HOLD_MINUTES.
+
+Item.held_qty is the total held across the item's holds, kept in step with
+the hold rows, so available stock is inventory_qty - held_qty without summing
+holds. Expired holds keep their stock until released: `manage.py
+release_holds` sweeps them in expires_at order through the index, and a
+sale or hold that comes up short first releases the item's own expired holds.
+
+Rows are locked holds first, then items, everywhere a hold is touched, and
+the releases that run while an item is locked skip holds locked by others.
+
+held_qty moves through queryset updates, which send no signals, so each one
+logs a stock change itself; tills syncing the catalog see available stock
+follow holds being placed and released.
+"""
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Item, StockHold, CatalogChange
+from .sync import record_changes
+
+
+def release_expired(item_id=None, now=None, limit=1000):
+    """Release up to `limit` expired holds, oldest first; return how many were released"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        expired = StockHold.objects.filter(expires_at__lte=now)
+        if item_id is not None:
+            expired = expired.filter(item_id=item_id)
+        rows = list(
+            expired.select_for_update(skip_locked=True)
+            .order_by('expires_at')
+            .values_list('id', 'item_id', 'units')[:limit]
+        )
+        _give_back(rows)
+    return len(rows)
+
+
+def release_holds(hold_ids):
+    """Release the given holds whether or not they expired; return how many were released"""
+    with transaction.atomic():
+        rows = list(
+            StockHold.objects.filter(pk__in=list(hold_ids))
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'item_id', 'units')
+        )
+        _give_back(rows)
+    return len(rows)
+
+
+def _give_back(rows):
+    """Delete locked (id, item_id, units) hold rows and return their units to the items"""
+    if not rows:
+        return
+    StockHold.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    # Items in id order so concurrent sweeps lock them in the same order
+    rows = sorted(rows, key=lambda row: row[1])
+    released = []
+    for item_id, group in groupby(rows, key=lambda row: row[1]):
+        units = sum(row[2] for row in group)
+        Item.objects.filter(pk=item_id).update(held_qty=F('held_qty') - units, updated_at=timezone.now())
+        released.append(item_id)
+    record_changes(CatalogChange.Kind.STOCK, released)
+
+
+def release_all_expired(now=None, batch=1000):
+    """Release every hold expired at `now` in batches; return how many were released"""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        count = release_expired(now=now, limit=batch)
+        released += count
+        if count < batch:
+            return released
+
+
+def available_stock(item, needed):
+    """Available stock of a locked item, first releasing its expired holds if `needed` is short"""
+    if item.available_qty < needed and item.held_qty and release_expired(item.pk):
+        item.held_qty = Item.objects.values_list('held_qty', flat=True).get(pk=item.pk)
+    return item.available_qty
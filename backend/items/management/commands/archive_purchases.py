@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from items.archive import archive_period, closed_periods, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming purchase partitions and archive closed months to files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.PURCHASE_HOT_MONTHS,
+            help='Months kept in the database, including the current one'
+        )
+        parser.add_argument('--months-ahead', type=int, default=2, help='Partitions to create ahead (PostgreSQL)')
+
+    def handle(self, *args, **options):
+        for period in ensure_partitions(options['months_ahead']):
+            self.stdout.write(f'Created partition for {period}')
+
+        for period in closed_periods(max(options['keep_months'], 1)):
+            archive = archive_period(period)
+            if archive is not None:
+                self.stdout.write(f'Archived {archive.rows} purchase(s) from {period} to {archive.path}')
+        self.stdout.write(self.style.SUCCESS('Purchase archive up to date'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from items.sync import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Remove catalog change-log entries superseded by newer ones'
+
+    def handle(self, *args, **options):
+        removed = compact_changes()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} superseded change(s)'))
@@ -0,0 +1,36 @@
+from datetime import datetime, time, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from items.archive import FIELDS
+from items.columnar import write_segment
+from items.models import Purchase
+from items.reports import archived_purchases
+
+
+def _day(value):
+    try:
+        return datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min, tzinfo=timezone.utc)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Export purchases, hot and archived, into a columnar segment for analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory to write the segment to')
+        parser.add_argument('--start', help='First day (UTC) to include, YYYY-MM-DD')
+        parser.add_argument('--end', help='Last day (UTC) to include, YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        start = _day(options['start']) if options['start'] else datetime(1970, 1, 1, tzinfo=timezone.utc)
+        end = _day(options['end']) + timedelta(days=1) if options['end'] else datetime(9999, 1, 1, tzinfo=timezone.utc)
+        hot = Purchase.objects.filter(created_at__gte=start, created_at__lt=end).values_list(*FIELDS)
+
+        def rows():
+            yield from archived_purchases(start, end)
+            yield from hot.iterator(chunk_size=5000)
+
+        count = write_segment(options['path'], rows())
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} purchase(s) to {options["path"]}'))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config.startup import profile
+
+
+class Command(BaseCommand):
+    help = 'Report the import time of a cold start, per app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--setup-only', action='store_true',
+                            help='Profile django.setup() only, as manage.py does, without loading the URLconf')
+        parser.add_argument('--top', type=int, default=15, help='Apps and modules listed')
+        parser.add_argument('--budget', type=float, default=settings.STARTUP_IMPORT_BUDGET_MS,
+                            help='Fail when imports take longer than this many milliseconds')
+
+    def handle(self, *args, **options):
+        result = profile(urls=not options['setup_only'])
+        top = options['top']
+        self.stdout.write(f"Cold start: {result['import_ms']:.0f} ms of imports, {len(result['modules'])} modules "
+                          f"({result['wall_ms']:.0f} ms wall, including interpreter start)")
+        self.stdout.write('\nPer app or package (own import time):')
+        for name, ms, count in result['groups'][:top]:
+            self.stdout.write(f'  {ms:8.1f} ms  {name} ({count} modules)')
+        self.stdout.write('\nSlowest project modules (including what they import):')
+        for module, ms in result['slowest'][:top]:
+            self.stdout.write(f'  {ms:8.1f} ms  {module}')
+
+        if result['import_ms'] > options['budget']:
+            raise CommandError(f"Imports took {result['import_ms']:.0f} ms, over the {options['budget']:.0f} ms budget")
+        self.stdout.write(self.style.SUCCESS(f"\nWithin the {options['budget']:.0f} ms budget"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from items.holds import release_all_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the stock of expired cart holds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Holds released per transaction')
+
+    def handle(self, *args, **options):
+        released = release_all_expired(batch=max(options['batch'], 1))
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired hold(s)'))
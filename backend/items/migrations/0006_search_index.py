@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-19 13:14
+
+from django.db import migrations
+
+SKU_CODES = (
+    "COALESCE((SELECT group_concat(code, ' ') FROM items_sku "
+    "WHERE item_id = {item} AND is_active), '')"
+)
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE items_search USING fts5(name, codes, tokenize='trigram')",
+    "INSERT INTO items_search(rowid, name, codes) "
+    f"SELECT id, name, {SKU_CODES.format(item='items_item.id')} FROM items_item",
+    "CREATE TRIGGER items_search_item_insert AFTER INSERT ON items_item BEGIN "
+    "INSERT INTO items_search(rowid, name, codes) VALUES (new.id, new.name, ''); END",
+    "CREATE TRIGGER items_search_item_rename AFTER UPDATE OF name ON items_item "
+    "WHEN old.name IS NOT new.name BEGIN "
+    "UPDATE items_search SET name = new.name WHERE rowid = new.id; END",
+    "CREATE TRIGGER items_search_item_delete AFTER DELETE ON items_item BEGIN "
+    "DELETE FROM items_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER items_search_sku_insert AFTER INSERT ON items_sku BEGIN "
+    f"UPDATE items_search SET codes = {SKU_CODES.format(item='new.item_id')} WHERE rowid = new.item_id; END",
+    "CREATE TRIGGER items_search_sku_update AFTER UPDATE OF code, is_active, item_id ON items_sku "
+    "WHEN old.code IS NOT new.code OR old.is_active IS NOT new.is_active OR old.item_id IS NOT new.item_id BEGIN "
+    f"UPDATE items_search SET codes = {SKU_CODES.format(item='old.item_id')} WHERE rowid = old.item_id; "
+    f"UPDATE items_search SET codes = {SKU_CODES.format(item='new.item_id')} WHERE rowid = new.item_id; END",
+    "CREATE TRIGGER items_search_sku_delete AFTER DELETE ON items_sku BEGIN "
+    f"UPDATE items_search SET codes = {SKU_CODES.format(item='old.item_id')} WHERE rowid = old.item_id; END",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS items_search_sku_delete",
+    "DROP TRIGGER IF EXISTS items_search_sku_update",
+    "DROP TRIGGER IF EXISTS items_search_sku_insert",
+    "DROP TRIGGER IF EXISTS items_search_item_delete",
+    "DROP TRIGGER IF EXISTS items_search_item_rename",
+    "DROP TRIGGER IF EXISTS items_search_item_insert",
+    "DROP TABLE IF EXISTS items_search",
+]
+
+# Trigram GIN indexes are maintained by PostgreSQL itself
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS item_name_trgm_idx ON items_item USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS sku_code_trgm_idx ON items_sku USING gin (code gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS sku_code_trgm_idx",
+    "DROP INDEX IF EXISTS item_name_trgm_idx",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0005_low_stock'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
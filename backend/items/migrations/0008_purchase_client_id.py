@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 13:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0007_catalog_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='client_id',
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='purchase',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 6.0 on 2026-10-19 13:25
+
+import django.utils.timezone
+import re
+
+from django.db import migrations, models
+
+
+def partition_purchases(apps, schema_editor):
+    """Rebuild items_purchase as a table range-partitioned by month on created_at.
+
+    PostgreSQL only; SQLite keeps a single hot table and relies on archiving.
+    The partition key has to be part of every unique constraint, so the
+    primary key becomes (id, created_at) and client_id is unique per sale
+    time, which still catches re-uploads since they repeat the timestamp.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'items_purchase'::regclass AND contype IN ('p', 'u', 'f')"
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'items_purchase' "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'items_purchase'::regclass)"
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT date_trunc('month', min(created_at) AT TIME ZONE 'UTC'), "
+            "date_trunc('month', greatest(max(created_at), now()) AT TIME ZONE 'UTC') FROM items_purchase"
+        )
+        first, last = cursor.fetchone()
+
+    statements = ['ALTER TABLE items_purchase RENAME TO items_purchase_unpartitioned']
+    # Constraint and index names are schema-wide; free them for the new table
+    statements += [f'ALTER TABLE items_purchase_unpartitioned DROP CONSTRAINT {name}' for name, _, _ in constraints]
+    statements += [f'DROP INDEX {name}' for name, _ in indexes]
+    statements += [
+        'CREATE TABLE items_purchase (LIKE items_purchase_unpartitioned INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (created_at)',
+        'CREATE SEQUENCE items_purchase_partitioned_id_seq OWNED BY items_purchase.id',
+        "ALTER TABLE items_purchase ALTER COLUMN id SET DEFAULT nextval('items_purchase_partitioned_id_seq')",
+    ]
+    for name, kind, definition in constraints:
+        if kind in ('p', 'u'):
+            definition = re.sub(r'\((.*)\)', r'(\1, created_at)', definition, count=1)
+        statements.append(f'ALTER TABLE items_purchase ADD CONSTRAINT {name} {definition}')
+    statements += [definition for _, definition in indexes]
+    statements.append('CREATE TABLE items_purchase_default PARTITION OF items_purchase DEFAULT')
+
+    if first is None:
+        first = last
+    month = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    # One partition per month of existing data, up to two months ahead
+    for _ in range((last.year - first.year) * 12 + last.month - first.month + 3):
+        following = month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+        statements.append(
+            f"CREATE TABLE items_purchase_{month:%Y%m} PARTITION OF items_purchase "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}+00') TO ('{following:%Y-%m-%d}+00')"
+        )
+        month = following
+
+    statements += [
+        'INSERT INTO items_purchase SELECT * FROM items_purchase_unpartitioned',
+        "SELECT setval('items_purchase_partitioned_id_seq', COALESCE(max(id), 0) + 1, false) FROM items_purchase",
+        'DROP TABLE items_purchase_unpartitioned',
+    ]
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0008_purchase_client_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='purchase',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='PurchaseArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6)),
+                ('part', models.PositiveIntegerField(default=1)),
+                ('path', models.CharField(max_length=500)),
+                ('rows', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'part'), name='purchase_archive_part_uniq')],
+            },
+        ),
+        # The partitioned table keeps working with the earlier schema, so
+        # there is nothing to undo when migrating backwards
+        migrations.RunPython(partition_purchases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+from importlib import import_module
+
+import items.money
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Cast, Round
+
+AMOUNTS = [('sku', 'price'), ('purchase', 'total_price')]
+
+
+def to_paise(apps, schema_editor):
+    for model_name, field in AMOUNTS:
+        model = apps.get_model('items', model_name)
+        model.objects.using(schema_editor.connection.alias).update(**{
+            f'{field}_paise': Cast(Round(F(field) * 100), models.BigIntegerField())
+        })
+
+
+def to_rupees(apps, schema_editor):
+    for model_name, field in AMOUNTS:
+        model = apps.get_model('items', model_name)
+        model.objects.using(schema_editor.connection.alias).update(**{
+            field: Cast(
+                Cast(F(f'{field}_paise'), models.FloatField()) / 100,
+                models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        })
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite drops triggers when it rebuilds items_sku; put the search ones back"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_index = import_module('items.migrations.0006_search_index')
+    for sql in search_index.SQLITE_BACKWARD + search_index.SQLITE_FORWARD:
+        if 'TRIGGER items_search_sku' in sql:
+            schema_editor.execute(sql, params=None)
+
+
+def _operations():
+    before, add, after = [], [], []
+    for model_name, field in AMOUNTS:
+        # Nullable while both columns exist, so every step can run backwards
+        before += [
+            migrations.AlterField(
+                model_name=model_name, name=field,
+                field=models.DecimalField(max_digits=10, decimal_places=2, null=True),
+            ),
+            migrations.AddField(model_name=model_name, name=f'{field}_paise', field=models.BigIntegerField(null=True)),
+        ]
+        after += [
+            migrations.RemoveField(model_name=model_name, name=field),
+            migrations.RenameField(model_name=model_name, old_name=f'{field}_paise', new_name=field),
+            migrations.AlterField(model_name=model_name, name=field, field=items.money.PaiseField()),
+        ]
+    return (
+        [migrations.RunPython(migrations.RunPython.noop, restore_search_triggers)]
+        + before
+        + [migrations.RunPython(to_paise, to_rupees)]
+        + after
+        + [migrations.RunPython(restore_search_triggers, migrations.RunPython.noop)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0009_purchase_partitions'),
+    ]
+
+    operations = _operations()
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+from importlib import import_module
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def restore_search_triggers(apps, schema_editor):
+    """SQLite drops triggers when it rebuilds items_item; put the search ones back"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_index = import_module('items.migrations.0006_search_index')
+    for sql in search_index.SQLITE_BACKWARD + search_index.SQLITE_FORWARD:
+        if 'items_search_item_' in sql:
+            schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0010_money_in_paise'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='item',
+            name='held_qty',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('units', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='items.item')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='items.sku')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', 'expires_at'], name='stock_hold_item_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 14:01
+
+import django.db.models.deletion
+import items.money
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0012_stores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceList',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('effective_from', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='price_list',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='purchases', to='items.pricelist'),
+        ),
+        migrations.CreateModel(
+            name='PriceListEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', items.money.PaiseField()),
+                ('price_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='items.pricelist')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_list_entries', to='items.sku')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('price_list', 'sku'), name='price_list_entry_sku_uniq')],
+            },
+        ),
+    ]
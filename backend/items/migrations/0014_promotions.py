@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0013_price_lists'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('category_discount', 'Category discount'), ('buy_x_get_y', 'Buy X get Y free'), ('weight_slabs', 'Per-kg slabs')], max_length=20)),
+                ('priority', models.IntegerField(default=0)),
+                ('category', models.CharField(blank=True, choices=[('dry', 'Dry'), ('milk', 'Milk'), ('other', 'Other')], max_length=20)),
+                ('percent', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('buy_qty', models.PositiveIntegerField(blank=True, null=True)),
+                ('free_qty', models.PositiveIntegerField(blank=True, null=True)),
+                ('slabs', models.JSONField(blank=True, default=list)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='items.item')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='items.promotion'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0014_promotions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='catalogchange',
+            name='kind',
+            field=models.CharField(choices=[('item', 'Item'), ('sku', 'SKU'), ('stock', 'Stock')], max_length=10),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from .money import PaiseField
 
 
 class Item(models.Model):
@@ -18,10 +21,35 @@ class Item(models.Model):
     category = models.CharField(max_length=20, choices=Category.choices)
     sale_type = models.CharField(max_length=20, choices=SaleType.choices)
     inventory_qty = models.PositiveIntegerField(default=0)  # grams for weight, pieces for count
+    reorder_level = models.PositiveIntegerField(default=0)  # same unit as inventory_qty, 0 disables alerts
+    held_qty = models.PositiveIntegerField(default=0)  # same unit, reserved by cart holds (items.holds)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Only items currently below their reorder level are indexed
+            models.Index(
+                fields=['inventory_qty'],
+                name='item_low_stock_idx',
+                condition=models.Q(is_active=True, reorder_level__gt=0, inventory_qty__lt=models.F('reorder_level')),
+            ),
+        ]
+
+    @property
+    def available_qty(self):
+        """Stock on hand that is not reserved by a cart hold"""
+        return max(0, self.inventory_qty - self.held_qty)
+
+    @property
+    def is_low_stock(self):
+        return self.inventory_qty < self.reorder_level
+
+    def crossed_reorder_level(self, previous_qty):
+        """True if stock just went from at/above the reorder level to below it"""
+        return 0 < self.reorder_level <= previous_qty and self.is_low_stock
+
     @property
     def inventory_unit(self):
         """Return the inventory unit based on sale type"""
@@ -39,7 +67,7 @@ class SKU(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='skus')
     code = models.CharField(max_length=50, unique=True)
     unit_value = models.PositiveIntegerField()  # grams for weight, pieces for count
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    price = PaiseField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -61,14 +89,187 @@ class SKU(models.Model):
         return f"{self.item.name} - {self.code}"
 
 
+class Store(models.Model):
+    """A shop outlet with its own stock (see StoreStock)"""
+
+    name = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class StoreStock(models.Model):
+    """Stock of one item at one store, in the item's inventory unit"""
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='stock')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='store_stock')
+    inventory_qty = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['store', 'item'], name='store_stock_store_item_uniq'),
+        ]
+        indexes = [
+            # Stores holding at least N of an item are one range scan
+            models.Index(fields=['item', 'inventory_qty'], name='store_stock_item_qty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.store.name} - {self.item.name}: {self.inventory_qty}"
+
+
+class PriceList(models.Model):
+    """A version of the shop's prices, in effect from effective_from (see items.pricelists).
+
+    Entries override SKU.price for the SKUs they list. A list and its entries
+    are written once and never edited; a price change is a new list.
+    """
+
+    name = models.CharField(max_length=255)
+    effective_from = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"v{self.pk} {self.name} from {self.effective_from}"
+
+
+class PriceListEntry(models.Model):
+    """Price of one SKU in a price list"""
+
+    price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name='entries')
+    sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name='price_list_entries')
+    price = PaiseField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['price_list', 'sku'], name='price_list_entry_sku_uniq'),
+        ]
+
+    def __str__(self):
+        return f"v{self.price_list_id} {self.sku_id}: {self.price}"
+
+
+class Promotion(models.Model):
+    """A discount rule; see items.promotions for how rules are applied"""
+
+    class Kind(models.TextChoices):
+        CATEGORY_DISCOUNT = 'category_discount', 'Category discount'
+        BUY_X_GET_Y = 'buy_x_get_y', 'Buy X get Y free'
+        WEIGHT_SLABS = 'weight_slabs', 'Per-kg slabs'
+
+    name = models.CharField(max_length=255)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    priority = models.IntegerField(default=0)  # higher wins when several rules apply to a line
+    category = models.CharField(max_length=20, choices=Item.Category.choices, blank=True)  # category_discount
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, null=True, blank=True, related_name='promotions')  # buy_x_get_y, weight_slabs
+    percent = models.PositiveSmallIntegerField(null=True, blank=True)  # category_discount
+    buy_qty = models.PositiveIntegerField(null=True, blank=True)  # buy_x_get_y, in packs of one SKU
+    free_qty = models.PositiveIntegerField(null=True, blank=True)
+    slabs = models.JSONField(default=list, blank=True)  # weight_slabs: [[min_grams, paise_per_kg], ...]
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Purchase(models.Model):
     """Purchase record for tracking sales"""
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='purchases')
     sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name='purchases')
+    store = models.ForeignKey(Store, on_delete=models.PROTECT, null=True, blank=True, related_name='purchases')  # null: central stock
     quantity = models.PositiveIntegerField()
-    total_price = models.DecimalField(max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(auto_now_add=True)
+    total_price = PaiseField()
+    price_list = models.ForeignKey(PriceList, on_delete=models.PROTECT, null=True, blank=True, related_name='purchases')  # null: base SKU prices
+    promotion = models.ForeignKey(Promotion, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchases')
+    client_id = models.UUIDField(null=True, blank=True, unique=True)  # set by tills for idempotent offline upload
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)  # sale time, supplied by tills for offline sales
 
     def __str__(self):
         return f"{self.user.email} - {self.sku.code} x {self.quantity}"
+
+
+class StockHold(models.Model):
+    """Stock reserved for a customer's cart until expires_at"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stock_holds')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='holds')
+    sku = models.ForeignKey(SKU, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    units = models.PositiveIntegerField()  # sku.unit_value * quantity, counted in item.held_qty
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', 'expires_at'], name='stock_hold_item_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.sku.code} x {self.quantity} until {self.expires_at}"
+
+
+class PurchaseArchive(models.Model):
+    """A closed month of purchases moved out of the database into a file.
+
+    A month can be archived more than once when late offline sales arrive
+    after it was closed; each run writes a new part.
+    """
+
+    period = models.CharField(max_length=6)  # YYYYMM, UTC
+    part = models.PositiveIntegerField(default=1)
+    path = models.CharField(max_length=500)
+    rows = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'part'], name='purchase_archive_part_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} part {self.part} ({self.rows} rows)"
+
+
+class LowStockAlert(models.Model):
+    """Raised once each time an item's stock drops below its reorder level"""
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='low_stock_alerts')
+    inventory_qty = models.PositiveIntegerField()
+    reorder_level = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.item.name} below {self.reorder_level}"
+
+
+class CatalogChange(models.Model):
+    """Append-only log of Item/SKU changes; the id is the catalog version"""
+
+    class Kind(models.TextChoices):
+        ITEM = 'item', 'Item'
+        SKU = 'sku', 'SKU'
+        # Only the item's stock changed: synced as an item row, but catalog caches are kept
+        STOCK = 'stock', 'Stock'
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"v{self.pk} {self.kind} {self.object_id}"
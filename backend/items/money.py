@@ -0,0 +1,76 @@
+"""Money as integer paise (1 rupee = 100 paise).
+
+Models opt in with PaiseField, so prices and totals are plain integers in
+the database and in Python: the purchase path multiplies integers and
+aggregates sum an integer column. Rupee strings such as "120.00" only appear
+at the boundaries: the API through RupeesField, and model forms such as the
+admin through RupeesFormField.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django import forms
+from django.db import models
+from rest_framework import serializers
+
+
+def to_paise(rupees):
+    """Convert a rupee amount (Decimal, str, int or float) to paise, rounding half up"""
+    return int((Decimal(str(rupees)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_paise(paise):
+    """Format paise as a rupee string with two decimals, e.g. 12000 -> "120.00" """
+    rupees, rest = divmod(abs(paise), 100)
+    return f"{'-' if paise < 0 else ''}{rupees}.{rest:02d}"
+
+
+class RupeesFormField(forms.DecimalField):
+    """Form field for a paise amount, shown and entered in rupees ("120.00")"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 10)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        return format_paise(value) if isinstance(value, int) else value
+
+    def clean(self, value):
+        value = super().clean(value)
+        return None if value is None else int(value.scaleb(self.decimal_places))
+
+    def has_changed(self, initial, data):
+        try:
+            data = self.clean(data)
+        except forms.ValidationError:
+            return True
+        return initial != data
+
+
+class PaiseField(models.BigIntegerField):
+    """An amount of money stored as integer paise"""
+
+    description = 'Amount of money in paise'
+
+    def formfield(self, **kwargs):
+        # The BigIntegerField bounds are in paise; RupeesFormField's max_digits bounds rupees
+        return models.Field.formfield(self, **{'form_class': RupeesFormField, **kwargs})
+
+
+class RupeesField(serializers.DecimalField):
+    """Serializer field for a paise amount, read and written as a rupee string.
+
+    Input is validated like DecimalField(max_digits=10, decimal_places=2) by
+    default; the output matches DecimalField's "120.00" strings.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', 10)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        return int(super().to_internal_value(data).scaleb(self.decimal_places))
+
+    def to_representation(self, value):
+        return format_paise(value)
@@ -0,0 +1,105 @@
+"""Scheduled price lists.
+
+A PriceList is a version of the shop's prices: its entries override
+SKU.price for the SKUs they list, from its effective_from onwards. The
+version in effect at any instant is the list with the latest effective_from
+at or before it, so a festival list created ahead of time takes over at
+midnight without anyone editing SKUs, and a list effective now switches at
+once. The switch is the single comparison in current_version().
+
+Lists are never edited once written, so the price map of a version is read
+from the database once per process and kept in memory under its version.
+Only the schedule (version, effective_from pairs) is re-read, when a list is
+created or deleted in this process and at least every
+PRICE_LIST_SCHEDULE_SECONDS for lists created by other processes. Schedule a
+list further ahead than that for every process to switch at the same
+instant.
+"""
+import threading
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PriceList, PriceListEntry
+
+# Version of the plain SKU prices, in effect before the first list
+BASE = 0
+
+_lock = threading.Lock()
+_schedule = None  # (loaded_at, [effective_from, ...], [version, ...])
+_maps = {BASE: {}}
+
+
+def _load_schedule():
+    rows = list(PriceList.objects.order_by('effective_from', 'pk').values_list('effective_from', 'pk'))
+    return time.monotonic(), [when for when, _ in rows], [version for _, version in rows]
+
+
+def schedule():
+    """(effective_from list, version list) of all price lists, oldest first"""
+    global _schedule
+    current = _schedule
+    if current is None or time.monotonic() - current[0] >= settings.PRICE_LIST_SCHEDULE_SECONDS:
+        current = _load_schedule()
+        with _lock:
+            _schedule = current
+            for version in set(_maps) - set(current[2]) - {BASE}:
+                del _maps[version]
+    return current[1], current[2]
+
+
+def invalidate_schedule():
+    """Re-read the schedule on next use, now and once the current transaction commits"""
+    global _schedule
+    _schedule = None
+
+    def reset():
+        global _schedule
+        _schedule = None
+    transaction.on_commit(reset)
+
+
+def reset_price_lists():
+    """Forget the schedule and every loaded price map"""
+    global _schedule
+    with _lock:
+        _schedule = None
+        _maps.clear()
+        _maps[BASE] = {}
+
+
+def current_version(at=None):
+    """Version of the price list in effect at `at` (default now), or BASE"""
+    starts, versions = schedule()
+    index = bisect_right(starts, at or timezone.now())
+    return versions[index - 1] if index else BASE
+
+
+def price_map(version):
+    """{sku_id: paise} of a price list, loaded once per process"""
+    prices = _maps.get(version)
+    if prices is None:
+        prices = dict(PriceListEntry.objects.filter(price_list_id=version).values_list('sku_id', 'price'))
+        with _lock:
+            _maps[version] = prices
+    return prices
+
+
+def resolve_price(sku, at=None):
+    """(unit price in paise, version) of a SKU at `at`, without a query once warm"""
+    version = current_version(at)
+    return price_map(version).get(sku.pk, sku.price), version
+
+
+@transaction.atomic
+def create_price_list(name, effective_from, prices):
+    """Create a price list from {sku_id: paise}; it takes effect at effective_from"""
+    price_list = PriceList.objects.create(name=name, effective_from=effective_from)
+    PriceListEntry.objects.bulk_create(
+        [PriceListEntry(price_list=price_list, sku_id=sku_id, price=price) for sku_id, price in prices.items()],
+        batch_size=1000,
+    )
+    return price_list
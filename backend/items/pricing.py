@@ -0,0 +1,138 @@
+"""Pricing loose weight sales from an item's SKU ladder.
+
+Counters weigh out arbitrary amounts (350 g, 1.2 kg) instead of whole packs.
+Each weight item gets a price table indexed by grams, built once from its
+active SKUs, so pricing a sale is an array lookup rather than a fresh search.
+Tables are per price list version (items.pricelists), with the pack prices
+of that version. Saving or deleting one of the item's SKUs drops its tables
+(see items.signals). Tables live in each process, and SKU changes made by
+other processes reach them through items.coherence, unless the
+WEIGHT_PRICE_CACHE_ALIAS cache is set to hold them instead.
+
+WEIGHT_PRICING picks how a weight is priced:
+
+- 'rate': the per-gram rate interpolated linearly between the packs (and
+  from zero up to the smallest one); past the largest pack its rate applies.
+  An amount equal to a pack costs exactly that pack.
+- 'packs': the cheapest combination of packs weighing at least the amount,
+  i.e. what the customer would pay buying packs.
+
+Prices are rounded half up to the nearest paisa, then half up to a multiple
+of WEIGHT_PRICE_ROUNDING paise (100 prices in whole rupees).
+
+numpy is imported when the first table is built rather than with this
+module, which every process loads at startup through items.signals.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .coherence import LocalCache
+from .models import SKU, CatalogChange
+from .pricelists import current_version, price_map, schedule, BASE
+
+MODES = ('rate', 'packs')
+
+
+# Tables kept in this process, dropped when another process changes an SKU
+local_tables = LocalCache([CatalogChange.Kind.SKU])
+
+
+def _cache():
+    if settings.WEIGHT_PRICE_CACHE_ALIAS:
+        return caches[settings.WEIGHT_PRICE_CACHE_ALIAS]
+    return local_tables
+
+
+def _cache_key(item_id, version):
+    return f'weight-prices:{item_id}:{version}'
+
+
+def load_ladder(item_id, version=BASE):
+    """Active packs of an item as sorted (grams, paise) pairs at a price list version, the cheapest per size"""
+    prices = price_map(version)
+    ladder = {}
+    for pk, unit_value, price in SKU.objects.filter(item_id=item_id, is_active=True).values_list('pk', 'unit_value', 'price'):
+        price = prices.get(pk, price)
+        if unit_value > 0:
+            ladder[unit_value] = min(price, ladder.get(unit_value, price))
+    return sorted(ladder.items())
+
+
+def round_half_up(numerator, denominator):
+    """numerator / denominator rounded half up, for non-negative integers or integer arrays"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def rate_prices(ladder, max_grams):
+    """Paise for 0..max_grams grams at the rate interpolated between the packs"""
+    import numpy as np
+
+    grams = np.arange(max_grams + 1, dtype=np.int64)
+    units = np.array([0] + [unit for unit, _ in ladder], dtype=np.int64)
+    prices = np.array([0] + [price for _, price in ladder], dtype=np.int64)
+
+    upper = np.clip(np.searchsorted(units, grams), 1, len(units) - 1)
+    lower = upper - 1
+    span = units[upper] - units[lower]
+    numerator = prices[lower] * span + (prices[upper] - prices[lower]) * (grams - units[lower])
+    beyond = grams > units[-1]
+    numerator[beyond] = prices[-1] * grams[beyond]
+    span[beyond] = units[-1]
+    return round_half_up(numerator, span)
+
+
+def pack_prices(ladder, max_grams):
+    """Paise for 0..max_grams grams as the cheapest packs covering the weight"""
+    import numpy as np
+
+    cost = [0] * (max_grams + 1)
+    for grams in range(1, max_grams + 1):
+        cost[grams] = min(cost[max(grams - unit, 0)] + price for unit, price in ladder)
+    return np.array(cost, dtype=np.int64)
+
+
+def build_price_table(ladder, max_grams, mode='rate', rounding=1):
+    """Price in paise for every whole gram from 0 to max_grams"""
+    if mode not in MODES:
+        raise ValueError(f'Unknown weight pricing mode {mode!r}')
+    prices = rate_prices(ladder, max_grams) if mode == 'rate' else pack_prices(ladder, max_grams)
+    if rounding > 1:
+        prices = round_half_up(prices, rounding) * rounding
+    return prices
+
+
+def price_table(item_id, version=None):
+    """The cached price table of an item at a version (default the current one), or None if it has no active packs"""
+    if version is None:
+        version = current_version()
+    cache = _cache()
+    prices = cache.get(_cache_key(item_id, version))
+    if prices is None:
+        ladder = load_ladder(item_id, version)
+        if not ladder:
+            return None
+        prices = build_price_table(
+            ladder, settings.WEIGHT_SALE_MAX_GRAMS, settings.WEIGHT_PRICING, settings.WEIGHT_PRICE_ROUNDING
+        )
+        cache.set(_cache_key(item_id, version), prices, timeout=settings.WEIGHT_PRICE_CACHE_SECONDS)
+    return prices
+
+
+def price_weight(item_id, grams, version=None):
+    """Price in paise of `grams` of an item at a version (default the current one), or None if it cannot be priced"""
+    if not 0 < grams <= settings.WEIGHT_SALE_MAX_GRAMS:
+        return None
+    prices = price_table(item_id, version)
+    return None if prices is None else int(prices[grams])
+
+
+def invalidate_price_table(item_id):
+    """Drop an item's tables now and again once the current transaction commits.
+
+    The second delete catches a table rebuilt by another request from the
+    rows as they were before the commit.
+    """
+    keys = [_cache_key(item_id, version) for version in [BASE] + schedule()[1]]
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
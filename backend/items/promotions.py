@@ -0,0 +1,162 @@
+"""Promotion rules, compiled into per-item lookup tables.
+
+Three kinds of rule (items.models.Promotion):
+
+- category_discount: `percent` off every line of an item in `category`.
+- buy_x_get_y: on a count item, free_qty of every buy_qty + free_qty packs
+  of one SKU on a line are free.
+- weight_slabs: on a weight item, the weight of the line picks the slab with
+  the largest min_grams it reaches, charged at that slab's paise per kg.
+
+Rules do not stack. Of the rules that lower the price of a line, the one
+with the highest priority wins, then the one giving the lowest price, then
+the oldest. Promotions apply on top of the price list in effect
+(items.pricelists).
+
+Active rules are compiled into a RuleBook: rules grouped by item and by
+category, and for each item, once it is first priced, the tuple of rules
+that can apply to it in precedence order. Pricing a cart costs one query
+that fingerprints the rules (their count and latest updated_at) and then one
+dictionary lookup per line. Saving or deleting a rule changes the
+fingerprint, so every process recompiles on its next cart.
+"""
+import threading
+from bisect import bisect_right
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Item, SKU, Promotion
+from .pricelists import resolve_price
+from .pricing import round_half_up
+
+_lock = threading.Lock()
+_compiled = None  # (fingerprint, RuleBook)
+
+
+class Rule:
+    """One active promotion, reduced to what pricing a line needs"""
+
+    __slots__ = ('id', 'kind', 'priority', 'starts_at', 'ends_at', 'percent', 'buy_qty', 'free_qty',
+                 'slab_grams', 'slab_rates')
+
+    def __init__(self, promotion):
+        self.id = promotion.pk
+        self.kind = promotion.kind
+        self.priority = promotion.priority
+        self.starts_at = promotion.starts_at
+        self.ends_at = promotion.ends_at
+        self.percent = promotion.percent
+        self.buy_qty = promotion.buy_qty
+        self.free_qty = promotion.free_qty
+        slabs = sorted(promotion.slabs or [])
+        self.slab_grams = [grams for grams, _ in slabs]
+        self.slab_rates = [rate for _, rate in slabs]
+
+    def active_at(self, at):
+        return (self.starts_at is None or self.starts_at <= at) and (self.ends_at is None or at < self.ends_at)
+
+    def total(self, unit_value, quantity, base_total):
+        """Line total in paise under this rule"""
+        if self.kind == Promotion.Kind.CATEGORY_DISCOUNT:
+            return base_total - round_half_up(base_total * self.percent, 100)
+        if self.kind == Promotion.Kind.BUY_X_GET_Y:
+            free = quantity // (self.buy_qty + self.free_qty) * self.free_qty
+            return base_total // quantity * (quantity - free)
+        grams = unit_value * quantity
+        slab = bisect_right(self.slab_grams, grams) - 1
+        if slab < 0:
+            return base_total
+        return round_half_up(self.slab_rates[slab] * grams, 1000)
+
+
+class RuleBook:
+    """Compiled active promotions"""
+
+    def __init__(self, promotions):
+        self.by_item = {}
+        self.by_category = {}
+        for promotion in promotions:
+            rule = Rule(promotion)
+            if promotion.kind == Promotion.Kind.CATEGORY_DISCOUNT:
+                self.by_category.setdefault(promotion.category, []).append(rule)
+            else:
+                self.by_item.setdefault(promotion.item_id, []).append(rule)
+        self._items = {}
+
+    def rules_for(self, item):
+        """Rules that can apply to an item, highest priority first, oldest first within one"""
+        key = (item.pk, item.category, item.sale_type)
+        rules = self._items.get(key)
+        if rules is None:
+            kinds = {Promotion.Kind.CATEGORY_DISCOUNT}
+            kinds.add(Promotion.Kind.WEIGHT_SLABS if item.sale_type == Item.SaleType.WEIGHT else Promotion.Kind.BUY_X_GET_Y)
+            rules = tuple(sorted(
+                (rule for rule in self.by_item.get(item.pk, []) + self.by_category.get(item.category, [])
+                 if rule.kind in kinds),
+                key=lambda rule: (-rule.priority, rule.id),
+            ))
+            self._items[key] = rules
+        return rules
+
+    def apply(self, item, unit_value, quantity, base_total, at):
+        """(line total, promotion id or None) for `quantity` packs of `unit_value` of an item"""
+        best_total, best_rule = base_total, None
+        for rule in self.rules_for(item):
+            if best_rule is not None and rule.priority < best_rule.priority:
+                break
+            if not rule.active_at(at):
+                continue
+            total = rule.total(unit_value, quantity, base_total)
+            if total < best_total:
+                best_total, best_rule = total, rule
+        return best_total, best_rule and best_rule.id
+
+
+def rulebook():
+    """The compiled active promotions, recompiled if any rule changed since"""
+    global _compiled
+    fingerprint = tuple(Promotion.objects.aggregate(count=Count('id'), latest=Max('updated_at')).values())
+    compiled = _compiled
+    if compiled is None or compiled[0] != fingerprint:
+        compiled = (fingerprint, RuleBook(Promotion.objects.filter(is_active=True).order_by('id')))
+        with _lock:
+            _compiled = compiled
+    return compiled[1]
+
+
+def reset_promotions():
+    """Forget the compiled rules"""
+    global _compiled
+    with _lock:
+        _compiled = None
+
+
+def price_lines(lines, at=None, book=None):
+    """Price (sku, quantity) lines, each SKU with its item loaded.
+
+    Returns one dict per line with the price list price (base_price), the
+    price after promotions (total_price), and the price list and promotion
+    used.
+    """
+    at = at or timezone.now()
+    book = book or rulebook()
+    priced = []
+    for sku, quantity in lines:
+        unit_price, version = resolve_price(sku, at)
+        base_price = unit_price * quantity
+        total_price, promotion_id = book.apply(sku.item, sku.unit_value, quantity, base_price, at)
+        priced.append({
+            'sku': sku, 'quantity': quantity, 'base_price': base_price, 'total_price': total_price,
+            'price_list_id': version or None, 'promotion_id': promotion_id,
+        })
+    return priced
+
+
+def price_cart(lines, at=None):
+    """price_lines() for (sku_id, quantity) lines; raise SKU.DoesNotExist for unknown SKUs"""
+    skus = SKU.objects.filter(is_active=True).select_related('item').in_bulk({sku_id for sku_id, _ in lines})
+    missing = {sku_id for sku_id, _ in lines} - skus.keys()
+    if missing:
+        raise SKU.DoesNotExist(f'SKU not found: {", ".join(map(str, sorted(missing)))}')
+    return price_lines([(skus[sku_id], quantity) for sku_id, quantity in lines], at)
@@ -0,0 +1,439 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from taskqueue.queue import enqueue_many
+from .alerts import record_stock_change
+from .holds import available_stock
+from .models import Item, SKU, Purchase, CatalogChange, StockHold, Store, StoreStock
+from .pricelists import current_version
+from .pricing import price_weight
+from .promotions import price_lines, rulebook
+from .sync import record_changes
+
+LOOSE_SKU_PREFIX = 'LOOSE-'
+
+
+class PurchaseRejected(Exception):
+    """Purchase refused because of stock; the message is shown to the client"""
+
+
+def check_stock(available, needed):
+    """Raise PurchaseRejected if `needed` units cannot be taken from `available`"""
+    if available == 0:
+        raise PurchaseRejected('Item is out of stock')
+    if available < needed:
+        raise PurchaseRejected('Insufficient inventory available')
+
+
+def priced(sku, quantity, at, book=None):
+    """Purchase fields pricing `quantity` of a SKU (item loaded) with the price list and promotions at `at`"""
+    line, = price_lines([(sku, quantity)], at, book)
+    return {
+        'total_price': line['total_price'], 'price_list_id': line['price_list_id'],
+        'promotion_id': line['promotion_id'], 'created_at': at,
+    }
+
+
+def queue_purchase_tasks(purchases):
+    # Side effects run in workers after commit, not under the inventory row lock
+    enqueue_many(
+        (task_name, {'purchase_id': purchase.id}) for purchase in purchases for task_name in settings.PURCHASE_TASKS
+    )
+
+
+@transaction.atomic
+def purchase_sku(user, sku_id, quantity):
+    """Buy `quantity` of an active SKU in its own transaction"""
+    # Get SKU (must be active) and lock its item row until commit
+    sku = get_object_or_404(SKU, pk=sku_id, is_active=True)
+    item = Item.objects.select_for_update().get(pk=sku.item_id)
+    sku.item = item
+
+    # Calculate total inventory needed and check it against unheld stock
+    total_needed = sku.unit_value * quantity
+    check_stock(available_stock(item, total_needed), total_needed)
+
+    # Deduct inventory
+    previous_qty = item.inventory_qty
+    item.inventory_qty -= total_needed
+    item.save(update_fields=['inventory_qty', 'updated_at'])
+    record_stock_change(item, previous_qty)
+
+    purchase = Purchase.objects.create(
+        user=user,
+        sku=sku,
+        quantity=quantity,
+        **priced(sku, quantity, timezone.now())
+    )
+    queue_purchase_tasks([purchase])
+    return purchase
+
+
+@transaction.atomic
+def purchase_store_sku(user, store_id, sku_id, quantity):
+    """Buy `quantity` of an active SKU from one store's stock"""
+    store = get_object_or_404(Store, pk=store_id, is_active=True)
+    sku = get_object_or_404(SKU.objects.select_related('item'), pk=sku_id, is_active=True)
+    stock = StoreStock.objects.select_for_update().filter(store=store, item_id=sku.item_id).first()
+
+    total_needed = sku.unit_value * quantity
+    check_stock(stock.inventory_qty if stock else 0, total_needed)
+    stock.inventory_qty -= total_needed
+    stock.save(update_fields=['inventory_qty', 'updated_at'])
+
+    purchase = Purchase.objects.create(
+        user=user,
+        sku=sku,
+        store=store,
+        quantity=quantity,
+        **priced(sku, quantity, timezone.now())
+    )
+    queue_purchase_tasks([purchase])
+    return purchase
+
+
+def loose_sku(item):
+    """The inactive 1 g SKU that weighed sales of an item are recorded against.
+
+    With the grams as the purchase quantity, reports, archives and forecasts
+    keep counting units as quantity * unit_value. Being inactive it is never
+    listed or sold as a pack, and it stays out of the price ladder.
+    """
+    sku, _ = SKU.objects.get_or_create(
+        code=f'{LOOSE_SKU_PREFIX}{item.pk}',
+        defaults={'item': item, 'unit_value': 1, 'price': 0, 'is_active': False},
+    )
+    return sku
+
+
+@transaction.atomic
+def purchase_weight(user, item_id, grams):
+    """Sell `grams` of a weight item off the scale, priced from its SKU ladder"""
+    item = get_object_or_404(Item.objects.select_for_update(), pk=item_id, is_active=True)
+    if item.sale_type != Item.SaleType.WEIGHT:
+        raise PurchaseRejected('Item is not sold by weight')
+    now = timezone.now()
+    version = current_version(now)
+    base_price = price_weight(item.pk, grams, version)
+    if base_price is None:
+        raise PurchaseRejected('Item has no price for this weight')
+    total_price, promotion_id = rulebook().apply(item, 1, grams, base_price, now)
+    check_stock(available_stock(item, grams), grams)
+
+    previous_qty = item.inventory_qty
+    item.inventory_qty -= grams
+    item.save(update_fields=['inventory_qty', 'updated_at'])
+    record_stock_change(item, previous_qty)
+
+    purchase = Purchase.objects.create(
+        user=user, sku=loose_sku(item), quantity=grams, total_price=total_price,
+        price_list_id=version or None, promotion_id=promotion_id, created_at=now,
+    )
+    queue_purchase_tasks([purchase])
+    return purchase
+
+
+@transaction.atomic
+def create_hold(user, sku_id, quantity):
+    """Reserve `quantity` of an active SKU for the user's cart for STOCK_HOLD_MINUTES"""
+    sku = get_object_or_404(SKU, pk=sku_id, is_active=True)
+    now = timezone.now()
+    if StockHold.objects.filter(user=user, expires_at__gt=now).count() >= settings.STOCK_HOLDS_PER_USER:
+        raise PurchaseRejected('Too many items held; buy or release some first')
+
+    item = Item.objects.select_for_update().get(pk=sku.item_id)
+    units = sku.unit_value * quantity
+    check_stock(available_stock(item, units), units)
+
+    Item.objects.filter(pk=item.pk).update(held_qty=F('held_qty') + units, updated_at=now)
+    record_changes(CatalogChange.Kind.STOCK, [item.pk])
+    return StockHold.objects.create(
+        user=user, item=item, sku=sku, quantity=quantity, units=units,
+        expires_at=now + timedelta(minutes=settings.STOCK_HOLD_MINUTES),
+    )
+
+
+@transaction.atomic
+def release_hold(user, hold_id):
+    """Give back the stock of one of the user's holds; return False if it is gone"""
+    hold = StockHold.objects.select_for_update().filter(pk=hold_id, user=user).first()
+    if hold is None:
+        return False
+    hold.delete()
+    Item.objects.filter(pk=hold.item_id).update(held_qty=F('held_qty') - hold.units, updated_at=timezone.now())
+    record_changes(CatalogChange.Kind.STOCK, [hold.item_id])
+    return True
+
+
+@transaction.atomic
+def purchase_hold(user, hold_id):
+    """Turn one of the user's unexpired holds into a Purchase.
+
+    The stock is already reserved, so this deletes the hold and moves its
+    units out of inventory_qty and held_qty in one write to the item row.
+    """
+    hold = (
+        StockHold.objects.select_for_update().select_related('sku')
+        .filter(pk=hold_id, user=user, expires_at__gt=timezone.now()).first()
+    )
+    if hold is None:
+        raise PurchaseRejected('Hold has expired')
+    hold.delete()
+
+    item = Item.objects.select_for_update().get(pk=hold.item_id)
+    # Only short if an admin set the stock below what is held
+    check_stock(item.inventory_qty, hold.units)
+    previous_qty = item.inventory_qty
+    item.inventory_qty -= hold.units
+    item.held_qty -= hold.units
+    item.save(update_fields=['inventory_qty', 'held_qty', 'updated_at'])
+    record_stock_change(item, previous_qty)
+
+    hold.sku.item = item
+    purchase = Purchase.objects.create(
+        user=user, sku=hold.sku, quantity=hold.quantity, **priced(hold.sku, hold.quantity, timezone.now())
+    )
+    queue_purchase_tasks([purchase])
+    return purchase
+
+
+def apply_purchases(purchases):
+    """Apply unsaved purchases in order inside the current transaction.
+
+    Each entry needs user, sku and quantity set, and is priced with the price
+    list and promotions in effect at its created_at, so offline sales keep
+    the prices the customer paid at the counter; upload_offline_purchases
+    only lets created_at reach back OFFLINE_MAX_AGE_SECONDS. Touched items
+    are locked once, stock is checked per entry in list order, stock changes
+    are written per item in aggregate and accepted purchases are inserted
+    with one bulk_create. Returns, per entry, the saved Purchase or a
+    PurchaseRejected.
+    """
+    items = Item.objects.select_for_update().in_bulk({purchase.sku.item_id for purchase in purchases})
+    book = rulebook()
+    now = timezone.now()
+    previous = {pk: item.inventory_qty for pk, item in items.items()}
+
+    results = []
+    accepted = []
+    for purchase in purchases:
+        item = items[purchase.sku.item_id]
+        total_needed = purchase.sku.unit_value * purchase.quantity
+        try:
+            check_stock(available_stock(item, total_needed), total_needed)
+        except PurchaseRejected as exc:
+            results.append(exc)
+            continue
+        item.inventory_qty -= total_needed
+        purchase.sku.item = item
+        for field, value in priced(purchase.sku, purchase.quantity, purchase.created_at, book).items():
+            setattr(purchase, field, value)
+        results.append(purchase)
+        accepted.append(purchase)
+
+    changed = [item for pk, item in items.items() if item.inventory_qty != previous[pk]]
+    for item in changed:
+        item.updated_at = now
+    Item.objects.bulk_update(changed, ['inventory_qty', 'updated_at'])
+    record_changes(CatalogChange.Kind.STOCK, [item.pk for item in changed])
+    for item in changed:
+        record_stock_change(item, previous[item.pk])
+
+    Purchase.objects.bulk_create(accepted)
+    queue_purchase_tasks(accepted)
+    return results
+
+
+class _Request:
+    __slots__ = ('purchase', 'future')
+
+    def __init__(self, purchase):
+        self.purchase = purchase
+        self.future = Future()
+
+
+class GroupCommitDispatcher:
+    """Collects concurrent purchases for a few milliseconds and commits them together.
+
+    Each batch locks the touched items once, applies the requests in arrival
+    order (so every caller still gets its own stock check), writes the
+    aggregated stock per item and inserts all purchases with one bulk_create.
+    One transaction, and on SQLite one fsync, serves the whole batch.
+    """
+
+    def __init__(self, window=0.005, max_batch=200):
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, user, sku, quantity):
+        """Queue a purchase; the returned future resolves after its batch commits"""
+        self._ensure_running()
+        request = _Request(Purchase(user=user, sku=sku, quantity=quantity))
+        self._queue.put(request)
+        return request.future
+
+    def _ensure_running(self):
+        # Threads do not survive fork, so each worker process starts its own
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='purchase-group-commit', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Commit what is queued, then end the dispatcher thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def _collect(self):
+        """Return (batch, stop) after the window closes or the batch is full"""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._dispatch(batch)
+        connection.close()
+
+    def _dispatch(self, batch):
+        try:
+            with transaction.atomic():
+                results = apply_purchases([request.purchase for request in batch])
+        except Exception as exc:
+            connection.close()
+            for request in batch:
+                request.future.set_exception(exc)
+            return
+        self.batches += 1
+        for request, result in zip(batch, results):
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Return this process's dispatcher, created from the PURCHASE_GROUP_COMMIT_* settings"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = GroupCommitDispatcher(
+                window=settings.PURCHASE_GROUP_COMMIT_WINDOW_MS / 1000,
+                max_batch=settings.PURCHASE_GROUP_COMMIT_MAX_BATCH,
+            )
+        return _dispatcher
+
+
+def reset_dispatcher():
+    """Stop the dispatcher so the next purchase starts one with current settings"""
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.stop()
+
+
+def purchase_sku_grouped(user, sku_id, quantity):
+    """Buy through the group-commit dispatcher; blocks until the batch commits"""
+    sku = get_object_or_404(SKU, pk=sku_id, is_active=True)
+    return get_dispatcher().submit(user, sku, quantity).result(timeout=30)
+
+
+def upload_offline_purchases(user, lines):
+    """Record sales a till made while offline, idempotently.
+
+    `lines` are dicts with client_id, sku_id, quantity and created_at. Lines
+    whose client_id was already uploaded are reported as duplicates, lines
+    dated in the future or older than OFFLINE_MAX_AGE_SECONDS are rejected,
+    and the rest are applied in sale-time order so earlier sales win when
+    stock ran out.
+    Returns one result dict per input line, in input order. The number of
+    queries grows with the number of distinct SKUs/items in chunks, not with
+    the number of lines.
+    """
+    results = [None] * len(lines)
+    first_seen = {}
+    for index, line in enumerate(lines):
+        if line['client_id'] in first_seen:
+            results[index] = {'client_id': line['client_id'], 'status': 'duplicate'}
+        else:
+            first_seen[line['client_id']] = index
+
+    skus = SKU.objects.filter(is_active=True).in_bulk({lines[i]['sku_id'] for i in first_seen.values()})
+    now = timezone.now()
+    earliest = now - timedelta(seconds=settings.OFFLINE_MAX_AGE_SECONDS)
+    latest = now + timedelta(seconds=settings.OFFLINE_CLOCK_SKEW_SECONDS)
+
+    with transaction.atomic():
+        # Checked under the transaction so concurrent retries of a batch serialize
+        existing = Purchase.objects.in_bulk(list(first_seen), field_name='client_id')
+        pending = []
+        for client_id, index in first_seen.items():
+            line = lines[index]
+            if client_id in existing:
+                results[index] = {'client_id': client_id, 'status': 'duplicate', 'purchase_id': existing[client_id].id}
+            elif line['created_at'] > latest:
+                results[index] = {'client_id': client_id, 'status': 'rejected', 'error': 'Sale time is in the future'}
+            elif line['created_at'] < earliest:
+                results[index] = {'client_id': client_id, 'status': 'rejected',
+                                  'error': 'Sale is older than the offline upload window'}
+            elif line['sku_id'] not in skus:
+                results[index] = {'client_id': client_id, 'status': 'rejected', 'error': 'SKU not found'}
+            else:
+                pending.append((index, Purchase(
+                    user=user,
+                    sku=skus[line['sku_id']],
+                    quantity=line['quantity'],
+                    client_id=client_id,
+                    created_at=line['created_at'],
+                )))
+
+        pending.sort(key=lambda entry: entry[1].created_at)
+        applied = apply_purchases([purchase for _, purchase in pending])
+
+    for (index, purchase), result in zip(pending, applied):
+        if isinstance(result, PurchaseRejected):
+            results[index] = {'client_id': purchase.client_id, 'status': 'rejected', 'error': str(result)}
+        else:
+            results[index] = {'client_id': purchase.client_id, 'status': 'created', 'purchase_id': result.id}
+    return results
@@ -0,0 +1,141 @@
+"""Sales reporting over hot purchases and archived segments.
+
+Hot months are grouped in the database; archived months are grouped with
+vectorized operations over their memory-mapped segments. Either way no
+Purchase instances are built.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+
+from .archive import UTC, period_of
+from .columnar import Segment, day_of
+from .models import Purchase, PurchaseArchive, SKU
+
+EPOCH_DATE = date(1970, 1, 1)
+
+
+def archived_segments(start, end):
+    """Segments of the archived months overlapping start <= created_at < end"""
+    last = period_of(end - timedelta(microseconds=1))
+    archives = PurchaseArchive.objects.filter(period__gte=period_of(start), period__lte=last).order_by('period', 'part')
+    return [Segment(archive.path) for archive in archives]
+
+
+def archived_purchases(start, end):
+    """Yield archived purchase tuples (see read_archive) with start <= created_at < end"""
+    for segment in archived_segments(start, end):
+        yield from segment.rows(start, end)
+
+
+def _sku_lookup():
+    """Arrays indexed by SKU id giving its item id and unit value (0 for gaps)"""
+    skus = list(SKU.objects.values_list('id', 'item_id', 'unit_value'))
+    size = max(sku_id for sku_id, _, _ in skus) + 1 if skus else 1
+    item_of = np.zeros(size, dtype=np.int64)
+    unit_of = np.zeros(size, dtype=np.int64)
+    for sku_id, item_id, unit_value in skus:
+        item_of[sku_id] = item_id
+        unit_of[sku_id] = unit_value
+    return item_of, unit_of
+
+
+def sales_by_day(start, end):
+    """Quantity and revenue (paise) per UTC day and SKU for start <= created_at < end.
+
+    Reads the database and any archived segments covering the range, so
+    callers do not need to know which months have been archived.
+    """
+    totals = defaultdict(lambda: [0, 0])  # quantity, revenue
+    hot = (
+        Purchase.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at', tzinfo=UTC))
+        .values('day', 'sku_id')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+        .order_by()
+    )
+    for row in hot:
+        total = totals[row['day'], row['sku_id']]
+        total[0] += row['quantity']
+        total[1] += row['revenue']
+
+    for segment in archived_segments(start, end):
+        days, skus, quantities, revenues = segment.sales_by_day(start, end)
+        for day, sku_id, quantity, revenue in zip(days.tolist(), skus.tolist(), quantities.tolist(), revenues.tolist()):
+            total = totals[day_of(day * 86_400_000_000), sku_id]
+            total[0] += quantity
+            total[1] += revenue
+
+    return [
+        {'date': day, 'sku_id': sku_id, 'quantity': quantity, 'revenue': revenue}
+        for (day, sku_id), (quantity, revenue) in sorted(totals.items())
+    ]
+
+
+def sales_by_item(start, end):
+    """Units sold (grams for weight items, pieces for count items) and revenue (paise) per item"""
+    totals = defaultdict(lambda: [0, 0])  # units, revenue
+    hot = (
+        Purchase.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values('sku__item_id')
+        .annotate(units=Sum(F('quantity') * F('sku__unit_value')), revenue=Sum('total_price'))
+        .order_by()
+    )
+    for row in hot:
+        total = totals[row['sku__item_id']]
+        total[0] += row['units']
+        total[1] += row['revenue']
+
+    segments = archived_segments(start, end)
+    if segments:
+        item_of, unit_of = _sku_lookup()
+        for segment in segments:
+            sku_ids, quantities, revenues = segment.sales_by_sku(start, end)
+            known = sku_ids < len(item_of)
+            sku_ids, quantities, revenues = sku_ids[known], quantities[known], revenues[known]
+            items = item_of[sku_ids]
+            units = np.bincount(items, weights=quantities * unit_of[sku_ids])
+            revenue = np.bincount(items, weights=revenues)
+            for item_id in np.flatnonzero(np.bincount(items)).tolist():
+                if item_id:
+                    total = totals[item_id]
+                    total[0] += int(round(units[item_id]))
+                    total[1] += int(round(revenue[item_id]))
+
+    return [
+        {'item_id': item_id, 'units': units, 'revenue': revenue}
+        for item_id, (units, revenue) in sorted(totals.items())
+    ]
+
+
+def units_by_item_day(start, end):
+    """Units sold per item and UTC day as (item_id, day number, units) arrays.
+
+    Day numbers count days since the Unix epoch, as in items.columnar. Pairs
+    can repeat when a day spans the database and an archived segment.
+    """
+    hot = list(
+        Purchase.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at', tzinfo=UTC))
+        .values_list('sku__item_id', 'day')
+        .annotate(units=Sum(F('quantity') * F('sku__unit_value')))
+        .order_by()
+    )
+    item_ids = [np.array([row[0] for row in hot], dtype=np.int64)]
+    days = [np.array([(row[1] - EPOCH_DATE).days for row in hot], dtype=np.int64)]
+    units = [np.array([row[2] for row in hot], dtype=np.int64)]
+
+    segments = archived_segments(start, end)
+    if segments:
+        item_of, unit_of = _sku_lookup()
+        for segment in segments:
+            day_numbers, sku_ids, quantities, _ = segment.sales_by_day(start, end)
+            known = sku_ids < len(item_of)
+            item_ids.append(item_of[sku_ids[known]])
+            days.append(day_numbers[known])
+            units.append(quantities[known] * unit_of[sku_ids[known]])
+
+    return np.concatenate(item_ids), np.concatenate(days), np.concatenate(units)
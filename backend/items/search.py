@@ -0,0 +1,166 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Item, SKU
+
+MIN_SIMILARITY = 0.3
+CANDIDATE_LIMIT = 200
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+
+def trigrams(word):
+    """Trigrams of a word padded like pg_trgm ('  w', ' wo', ..., 'rd ')"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+
+def score(query_words, target_words):
+    """Average over query words of the best prefix/trigram match in the target"""
+    total = 0
+    for q in query_words:
+        best = 0
+        for t in target_words:
+            if t.startswith(q):
+                best = 1
+                break
+            best = max(best, similarity(q, t))
+        total += best
+    return total / len(query_words)
+
+
+def _filters(category, sale_type):
+    filters = Q(is_active=True)
+    if category:
+        filters &= Q(category=category)
+    if sale_type:
+        filters &= Q(sale_type=sale_type)
+    return filters
+
+
+def _code_matches(query):
+    """Items with an active SKU whose code starts with `query`"""
+    return Q(pk__in=SKU.objects.filter(is_active=True, code__istartswith=query).values('item_id'))
+
+
+def search_items(query, category=None, sale_type=None, limit=20):
+    """Return active items whose name or SKU codes match `query`, best first.
+
+    Matches word prefixes ('kaj' -> 'Kaju Katli') and tolerates typos
+    ('katly' -> 'Katli'). Uses the FTS5 trigram index on SQLite and pg_trgm
+    on PostgreSQL; other backends fall back to an icontains scan.
+    """
+    query_words = words(query)
+    if not query_words:
+        return []
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(query_words, category, sale_type, limit)
+    if connection.vendor == 'postgresql':
+        return _search_postgres(' '.join(query_words), category, sale_type, limit)
+    items = Item.objects.filter(_filters(category, sale_type), name__icontains=query)
+    return list(items[:limit])
+
+
+def match_terms(word):
+    """Substrings of which at least one survives a single typo in `word`.
+
+    Long words are split in two halves (a typo can only break one of them),
+    short ones into trigrams. Words under three letters yield nothing.
+    """
+    if len(word) < 3:
+        return set()
+    if len(word) < 6:
+        return {word[i:i + 3] for i in range(len(word) - 2)}
+    middle = len(word) // 2
+    return {word[:middle], word[middle:]}
+
+
+def _fetch_rows(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _candidates(where, params, order_by, category, sale_type):
+    """Up to CANDIDATE_LIMIT (item_id, name, codes) index rows of items passing the filters.
+
+    The filters run in the same query, ahead of the LIMIT, so inactive or
+    filtered-out matches never take the place of items that could be shown.
+    """
+    conditions, filter_params = ['item.is_active'], []
+    if category:
+        conditions.append('item.category = %s')
+        filter_params.append(category)
+    if sale_type:
+        conditions.append('item.sale_type = %s')
+        filter_params.append(sale_type)
+    return _fetch_rows(
+        'SELECT items_search.rowid, items_search.name, items_search.codes FROM items_search '
+        'JOIN items_item item ON item.id = items_search.rowid '
+        f'WHERE ({where}) AND {" AND ".join(conditions)} ORDER BY {order_by} LIMIT %s',
+        [*params, *filter_params, CANDIDATE_LIMIT],
+    )
+
+
+def _rank(rows, query_words, category, sale_type):
+    scored = {}
+    for item_id, name, codes in rows:
+        rank = score(query_words, words(name) + words(codes))
+        if rank >= MIN_SIMILARITY:
+            scored[item_id] = rank
+    items = Item.objects.filter(_filters(category, sale_type), pk__in=scored)
+    return sorted(items, key=lambda item: (-scored[item.pk], item.name))
+
+
+def _search_sqlite(query_words, category, sale_type, limit):
+    if all(len(word) >= 3 for word in query_words):
+        # Exact substrings first
+        match = ' AND '.join(f'"{word}"' for word in query_words)
+        rows = _candidates('items_search MATCH %s', [match], 'bm25(items_search)', category, sale_type)
+        items = _rank(rows, query_words, category, sale_type)
+        if len(items) >= limit:
+            return items[:limit]
+
+    terms = set()
+    for word in query_words:
+        terms.update(match_terms(word))
+
+    if terms:
+        # Any matching substring makes a candidate; ranking happens in Python
+        match = ' OR '.join(f'"{term}"' for term in sorted(terms))
+        rows = _candidates('items_search MATCH %s', [match], 'bm25(items_search)', category, sale_type)
+    else:
+        # Words shorter than a trigram can only match as prefixes
+        prefix = f'{query_words[0]}%'
+        rows = _candidates(
+            'items_search.name LIKE %s OR items_search.codes LIKE %s', [prefix, prefix], 'item.name',
+            category, sale_type,
+        )
+    return _rank(rows, query_words, category, sale_type)[:limit]
+
+
+def _search_postgres(query, category, sale_type, limit):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    matches = (
+        Q(name__trigram_word_similar=query)
+        | Q(name__istartswith=query)
+        | _code_matches(query)
+    )
+    items = (
+        Item.objects.filter(_filters(category, sale_type), matches)
+        .annotate(rank=TrigramWordSimilarity(query, 'name'))
+        .order_by('-rank', 'name')
+    )
+    return list(items[:limit])
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Item, SKU, Purchase
+from .models import Item, SKU, Purchase, PriceList, Promotion, StockHold, Store
+from .money import RupeesField, format_paise
+from .pricelists import create_price_list, current_version, price_map
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -17,6 +21,7 @@ class SKUSerializer(serializers.ModelSerializer):
     """Serializer for creating and displaying SKUs"""
 
     display_unit = serializers.ReadOnlyField()
+    price = RupeesField()
 
     class Meta:
         model = SKU
@@ -34,6 +39,7 @@ class SKUListSerializer(serializers.ModelSerializer):
     """Serializer for displaying SKUs in item detail (without item field)"""
 
     display_unit = serializers.ReadOnlyField()
+    price = RupeesField(read_only=True)
 
     class Meta:
         model = SKU
@@ -44,21 +50,58 @@ class ItemDetailSerializer(serializers.ModelSerializer):
     """Serializer for item detail with nested SKUs"""
 
     inventory_unit = serializers.ReadOnlyField()
+    available_qty = serializers.ReadOnlyField()
     skus = serializers.SerializerMethodField()
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'category', 'sale_type', 'inventory_unit', 'inventory_qty', 'is_active', 'created_at', 'updated_at', 'skus']
+        fields = ['id', 'name', 'category', 'sale_type', 'inventory_unit', 'inventory_qty', 'available_qty', 'reorder_level', 'is_active', 'created_at', 'updated_at', 'skus']
 
     def get_skus(self, obj):
-        """Return only active SKUs"""
-        active_skus = obj.skus.filter(is_active=True)
+        """Return only active SKUs, at the prices in effect now"""
+        prices = price_map(current_version())
+        active_skus = list(obj.skus.filter(is_active=True))
+        for sku in active_skus:
+            sku.price = prices.get(sku.pk, sku.price)
         return SKUListSerializer(active_skus, many=True).data
 
 
+class StoreSerializer(serializers.ModelSerializer):
+    """Serializer for Store model"""
+
+    latitude = serializers.FloatField(required=False, allow_null=True, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, allow_null=True, min_value=-180, max_value=180)
+
+    class Meta:
+        model = Store
+        fields = ['id', 'name', 'latitude', 'longitude', 'is_active', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+
+class StoreItemDetailSerializer(ItemDetailSerializer):
+    """Item detail with the stock of one store (context: store, inventory_qty)"""
+
+    store_id = serializers.SerializerMethodField()
+    inventory_qty = serializers.SerializerMethodField()
+    available_qty = serializers.SerializerMethodField()
+
+    class Meta(ItemDetailSerializer.Meta):
+        fields = ItemDetailSerializer.Meta.fields + ['store_id']
+
+    def get_store_id(self, obj):
+        return self.context['store'].id
+
+    def get_inventory_qty(self, obj):
+        return self.context['inventory_qty']
+
+    def get_available_qty(self, obj):
+        return self.context['inventory_qty']
+
+
 class InventorySerializer(serializers.Serializer):
     """Serializer for setting inventory"""
     quantity = serializers.IntegerField(min_value=0)
+    reorder_level = serializers.IntegerField(min_value=0, required=False)
 
     def validate_quantity(self, value):
         if value < 0:
@@ -66,6 +109,212 @@ class InventorySerializer(serializers.Serializer):
         return value
 
 
+class LowStockItemSerializer(serializers.ModelSerializer):
+    """Serializer for items below their reorder level"""
+
+    inventory_unit = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Item
+        fields = ['id', 'name', 'category', 'sale_type', 'inventory_unit', 'inventory_qty', 'reorder_level']
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Serializer for catalog search parameters"""
+    q = serializers.CharField(max_length=100)
+    category = serializers.ChoiceField(choices=Item.Category.choices, required=False)
+    sale_type = serializers.ChoiceField(choices=Item.SaleType.choices, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class SyncItemSerializer(serializers.ModelSerializer):
+    """Item row in the catalog change feed"""
+
+    available_qty = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Item
+        fields = ['id', 'name', 'category', 'sale_type', 'inventory_qty', 'available_qty', 'is_active', 'updated_at']
+
+
+class SyncSKUSerializer(serializers.ModelSerializer):
+    """SKU row in the catalog change feed"""
+
+    price = RupeesField(read_only=True)
+
+    class Meta:
+        model = SKU
+        fields = ['id', 'item', 'code', 'unit_value', 'price', 'is_active', 'updated_at']
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    """Serializer for change feed parameters"""
+    cursor = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=500)
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    """Serializer for sales report parameters; both dates are inclusive (UTC)"""
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        if data['end'] < data['start']:
+            raise serializers.ValidationError("End date must not be before start date")
+        if (data['end'] - data['start']).days > 366:
+            raise serializers.ValidationError("Reports cover at most one year")
+        return data
+
+
+class SalesReportRowSerializer(serializers.Serializer):
+    """Serializer for one day of sales of one SKU"""
+    date = serializers.DateField()
+    sku_id = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    revenue = RupeesField(max_digits=14, read_only=True)
+
+
+class ItemSalesReportRowSerializer(serializers.Serializer):
+    """Serializer for the sales of one item; units are grams or pieces by sale type"""
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    sale_type = serializers.CharField()
+    units = serializers.IntegerField()
+    revenue = RupeesField(max_digits=14, read_only=True)
+
+
+class ProductionPlanQuerySerializer(serializers.Serializer):
+    """Serializer for production plan parameters; date defaults to tomorrow (UTC)"""
+    date = serializers.DateField(required=False)
+    category = serializers.ChoiceField(choices=Item.Category.choices, required=False)
+
+
+class ProductionPlanRowSerializer(serializers.Serializer):
+    """Serializer for one item of the production plan, in grams or pieces"""
+    item_id = serializers.IntegerField()
+    name = serializers.CharField()
+    sale_type = serializers.CharField()
+    inventory_qty = serializers.IntegerField()
+    average = serializers.FloatField()
+    forecast = serializers.FloatField()
+    suggested = serializers.IntegerField()
+
+
+class PriceListEntrySerializer(serializers.Serializer):
+    """Price of one SKU in a price list"""
+    sku_id = serializers.IntegerField()
+    price = RupeesField()
+
+    def validate_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Price must be positive")
+        return value
+
+
+class PriceListSerializer(serializers.ModelSerializer):
+    """Serializer for creating and displaying price lists; effective_from defaults to now"""
+    effective_from = serializers.DateTimeField(required=False)
+    entries = PriceListEntrySerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = PriceList
+        fields = ['id', 'name', 'effective_from', 'created_at', 'entries']
+        read_only_fields = ['id', 'created_at']
+
+    def validate_effective_from(self, value):
+        if value < timezone.now():
+            raise serializers.ValidationError("Price lists cannot take effect in the past")
+        return value
+
+    def validate_entries(self, value):
+        sku_ids = [entry['sku_id'] for entry in value]
+        if len(set(sku_ids)) != len(sku_ids):
+            raise serializers.ValidationError("Each SKU can be priced only once per list")
+        missing = set(sku_ids) - set(SKU.objects.filter(pk__in=sku_ids).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError(f"Unknown SKU id(s): {', '.join(map(str, sorted(missing)))}")
+        return value
+
+    def create(self, validated_data):
+        return create_price_list(
+            validated_data['name'],
+            validated_data.get('effective_from') or timezone.now(),
+            {entry['sku_id']: entry['price'] for entry in validated_data['entries']},
+        )
+
+
+class PromotionSlabSerializer(serializers.Serializer):
+    """One per-kg slab of a weight_slabs promotion"""
+    min_grams = serializers.IntegerField(min_value=0)
+    price_per_kg = RupeesField()
+
+    def validate_price_per_kg(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Price must be positive")
+        return value
+
+
+class SlabsField(serializers.ListField):
+    """Slabs stored as [[min_grams, paise_per_kg], ...], read and written as objects"""
+    child = PromotionSlabSerializer()
+
+    def to_internal_value(self, data):
+        slabs = sorted([slab['min_grams'], slab['price_per_kg']] for slab in super().to_internal_value(data))
+        if len({grams for grams, _ in slabs}) != len(slabs):
+            raise serializers.ValidationError("Each min_grams can appear only once")
+        return slabs
+
+    def to_representation(self, value):
+        return [{'min_grams': grams, 'price_per_kg': format_paise(paise)} for grams, paise in value]
+
+
+class PromotionSerializer(serializers.ModelSerializer):
+    """Serializer for creating, updating and displaying promotions"""
+    percent = serializers.IntegerField(min_value=1, max_value=100, required=False, allow_null=True)
+    buy_qty = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    free_qty = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    slabs = SlabsField(required=False)
+
+    # Fields each kind needs, and the sale type its item must have
+    REQUIRED = {
+        Promotion.Kind.CATEGORY_DISCOUNT: (['category', 'percent'], None),
+        Promotion.Kind.BUY_X_GET_Y: (['item', 'buy_qty', 'free_qty'], Item.SaleType.COUNT),
+        Promotion.Kind.WEIGHT_SLABS: (['item', 'slabs'], Item.SaleType.WEIGHT),
+    }
+
+    class Meta:
+        model = Promotion
+        fields = ['id', 'name', 'kind', 'priority', 'category', 'item', 'percent', 'buy_qty', 'free_qty', 'slabs',
+                  'starts_at', 'ends_at', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        def value(name):
+            return attrs[name] if name in attrs else getattr(self.instance, name, None)
+
+        required, sale_type = self.REQUIRED[value('kind')]
+        missing = [name for name in required if not value(name)]
+        if missing:
+            raise serializers.ValidationError({name: "This field is required for this kind of promotion." for name in missing})
+        if sale_type and value('item').sale_type != sale_type:
+            raise serializers.ValidationError({'item': f"This kind of promotion needs an item sold by {sale_type}."})
+        if value('kind') == Promotion.Kind.CATEGORY_DISCOUNT and value('item'):
+            raise serializers.ValidationError({'item': "Category discounts apply to a whole category."})
+        if value('starts_at') and value('ends_at') and value('ends_at') <= value('starts_at'):
+            raise serializers.ValidationError({'ends_at': "Must be after starts_at."})
+        return attrs
+
+
+class CartLineSerializer(serializers.Serializer):
+    """Serializer for one priced cart line"""
+    sku_id = serializers.IntegerField(source='sku.id')
+    quantity = serializers.IntegerField()
+    base_price = RupeesField(max_digits=14, read_only=True)
+    total_price = RupeesField(max_digits=14, read_only=True)
+    price_list = serializers.IntegerField(source='price_list_id', allow_null=True)
+    promotion = serializers.IntegerField(source='promotion_id', allow_null=True)
+
+
 class PurchaseCreateSerializer(serializers.Serializer):
     """Serializer for creating a purchase"""
     sku_id = serializers.IntegerField()
@@ -77,11 +326,93 @@ class PurchaseCreateSerializer(serializers.Serializer):
         return value
 
 
+class WeightSerializer(serializers.Serializer):
+    """Serializer for a weighed amount in grams"""
+    grams = serializers.IntegerField(min_value=1)
+
+    def validate_grams(self, value):
+        limit = settings.WEIGHT_SALE_MAX_GRAMS
+        if value > limit:
+            raise serializers.ValidationError(f"At most {limit} grams can be sold at once")
+        return value
+
+
+class WeightPurchaseSerializer(WeightSerializer):
+    """Serializer for selling a weighed amount of an item"""
+    item_id = serializers.IntegerField()
+
+
+class WeightPriceSerializer(serializers.Serializer):
+    """Serializer for the price of a weighed amount"""
+    item_id = serializers.IntegerField()
+    grams = serializers.IntegerField()
+    price = RupeesField(read_only=True)
+
+
+class StockHoldSerializer(serializers.ModelSerializer):
+    """Serializer for a cart hold"""
+    sku = SKUListSerializer(read_only=True)
+
+    class Meta:
+        model = StockHold
+        fields = ['id', 'sku', 'quantity', 'units', 'expires_at']
+
+
+class StoreAvailabilityQuerySerializer(serializers.Serializer):
+    """Serializer for a cart to route to stores, with the customer's optional location"""
+    items = PurchaseCreateSerializer(many=True, allow_empty=False)
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+
+    def validate(self, attrs):
+        if ('latitude' in attrs) != ('longitude' in attrs):
+            raise serializers.ValidationError("Give both latitude and longitude, or neither")
+        return attrs
+
+
+class CartPriceQuerySerializer(serializers.Serializer):
+    """Serializer for a cart to price"""
+    items = PurchaseCreateSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, value):
+        limit = settings.CART_MAX_LINES
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} lines per cart")
+        return value
+
+
+class StoreAvailabilityRowSerializer(serializers.Serializer):
+    """Serializer for a store that can fill the cart"""
+    store_id = serializers.IntegerField()
+    name = serializers.CharField()
+    distance_km = serializers.FloatField(allow_null=True)
+
+
+class OfflinePurchaseSerializer(serializers.Serializer):
+    """A sale recorded by a till while offline, keyed by a till-generated UUID"""
+    client_id = serializers.UUIDField()
+    sku_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    created_at = serializers.DateTimeField()
+
+
+class OfflinePurchaseBatchSerializer(serializers.Serializer):
+    """Serializer for an offline purchase upload"""
+    purchases = OfflinePurchaseSerializer(many=True, allow_empty=False)
+
+    def validate_purchases(self, value):
+        limit = settings.OFFLINE_BATCH_MAX_LINES
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} purchases per upload")
+        return value
+
+
 class PurchaseResponseSerializer(serializers.ModelSerializer):
     """Serializer for purchase response"""
     sku = SKUListSerializer(read_only=True)
     user = serializers.IntegerField(source='user.id')
+    total_price = RupeesField(read_only=True)
 
     class Meta:
         model = Purchase
-        fields = ['id', 'user', 'sku', 'quantity', 'total_price', 'created_at']
+        fields = ['id', 'user', 'sku', 'store', 'quantity', 'total_price', 'price_list', 'promotion', 'created_at']
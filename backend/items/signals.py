@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_item_list
+from .models import Item, SKU, CatalogChange, PriceList
+from .pricelists import invalidate_schedule
+from .pricing import invalidate_price_table
+from .sync import record_changes
+
+
+# Saves limited to these fields only move stock, which catalog caches do not hold
+STOCK_FIELDS = frozenset(['inventory_qty', 'held_qty', 'updated_at'])
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and STOCK_FIELDS.issuperset(update_fields):
+        record_changes(CatalogChange.Kind.STOCK, [instance.pk])
+        return
+    record_changes(CatalogChange.Kind.ITEM, [instance.pk])
+    invalidate_item_list()
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    record_changes(CatalogChange.Kind.ITEM, [instance.pk], deleted=True)
+    invalidate_item_list()
+
+
+@receiver(post_save, sender=SKU)
+def sku_saved(sender, instance, **kwargs):
+    record_changes(CatalogChange.Kind.SKU, [instance.pk])
+    invalidate_price_table(instance.item_id)
+
+
+@receiver(post_delete, sender=SKU)
+def sku_deleted(sender, instance, **kwargs):
+    record_changes(CatalogChange.Kind.SKU, [instance.pk], deleted=True)
+    invalidate_price_table(instance.item_id)
+
+
+@receiver([post_save, post_delete], sender=PriceList)
+def price_list_changed(sender, instance, **kwargs):
+    invalidate_schedule()
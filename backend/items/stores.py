@@ -0,0 +1,77 @@
+"""Per-store stock and finding the stores that can fill a cart.
+
+Item.inventory_qty stays the central stock behind the online purchase path;
+each Store keeps its own StoreStock rows. Cart holds and low-stock alerts
+only cover central stock.
+
+Stores that can fill a cart are found with one grouped query: for every item
+in the cart the (item, inventory_qty) index yields the stores holding enough
+of it, and only stores that appear for every item are kept. The cost grows
+with the cart and the number of stores, not with the size of the catalog.
+"""
+import math
+from collections import defaultdict
+
+from django.db.models import Count, Q
+
+from .models import SKU, Store, StoreStock
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def cart_units(lines):
+    """Units needed per item for (sku_id, quantity) lines; raise SKU.DoesNotExist for unknown SKUs"""
+    sku_ids = {sku_id for sku_id, _ in lines}
+    skus = {pk: (item_id, unit_value) for pk, item_id, unit_value in (
+        SKU.objects.filter(pk__in=sku_ids, is_active=True).values_list('id', 'item_id', 'unit_value')
+    )}
+    missing = sku_ids - skus.keys()
+    if missing:
+        raise SKU.DoesNotExist(f'SKU not found: {", ".join(map(str, sorted(missing)))}')
+    needed = defaultdict(int)
+    for sku_id, quantity in lines:
+        item_id, unit_value = skus[sku_id]
+        needed[item_id] += unit_value * quantity
+    return dict(needed)
+
+
+def stores_with_stock(needed):
+    """Ids of active stores holding at least needed[item_id] of every item"""
+    condition = Q()
+    for item_id, units in needed.items():
+        condition |= Q(item_id=item_id, inventory_qty__gte=units)
+    return list(
+        StoreStock.objects.filter(condition, store__is_active=True)
+        .values('store_id')
+        .annotate(covered=Count('id'))
+        .filter(covered=len(needed))
+        .values_list('store_id', flat=True)
+    )
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle distance between two points given in degrees"""
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    half_chord = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi) * math.cos(other_phi) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(half_chord))
+
+
+def rank_stores(needed, latitude=None, longitude=None):
+    """Stores that can fill the whole cart, nearest first when a location is given.
+
+    Without a location, or for stores without coordinates, stores are
+    ordered by name (after those with a distance).
+    """
+    stores = Store.objects.filter(pk__in=stores_with_stock(needed)).order_by('name')
+    rows = []
+    for store in stores:
+        distance = None
+        if latitude is not None and store.latitude is not None and store.longitude is not None:
+            distance = distance_km(latitude, longitude, store.latitude, store.longitude)
+        rows.append({'store_id': store.id, 'name': store.name, 'distance_km': distance})
+    # sort() is stable, so ties and stores without a distance keep name order
+    rows.sort(key=lambda row: (row['distance_km'] is None, row['distance_km'] or 0))
+    return rows
@@ -0,0 +1,94 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Item, SKU, CatalogChange
+
+
+def record_changes(kind, object_ids, deleted=False):
+    """Append one change per object; call inside the writing transaction"""
+    CatalogChange.objects.bulk_create(
+        CatalogChange(kind=kind, object_id=object_id, deleted=deleted) for object_id in object_ids
+    )
+
+
+def visible_prefix(changes, cursor):
+    """Changes up to the first gap that may still be filled by an open transaction.
+
+    Versions are handed out at insert time, so a later version can commit
+    before an earlier one. Returning past such a gap would make the client
+    skip the earlier change forever. Gaps older than SYNC_GAP_TIMEOUT come from
+    rolled-back transactions and are skipped.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.SYNC_GAP_TIMEOUT)
+    expected = cursor + 1
+    visible = []
+    for change in changes:
+        if change.pk != expected and change.created_at > settled:
+            break
+        visible.append(change)
+        expected = change.pk + 1
+    return visible
+
+
+def changes_since(cursor, limit=500):
+    """Return the catalog delta after `cursor` as a dict for the sync endpoint"""
+    changes = list(CatalogChange.objects.filter(pk__gt=cursor).order_by('pk')[:limit + 1])
+    has_more = len(changes) > limit
+    changes = visible_prefix(changes[:limit], cursor)
+    if changes:
+        cursor = changes[-1].pk
+
+    # Only the latest state of each object matters
+    latest = {}
+    for change in changes:
+        kind = CatalogChange.Kind.ITEM if change.kind == CatalogChange.Kind.STOCK else change.kind
+        latest[(kind, change.object_id)] = change.deleted
+    ids = {kind: set() for kind in CatalogChange.Kind.values}
+    deleted = {kind: [] for kind in CatalogChange.Kind.values}
+    for (kind, object_id), is_deleted in latest.items():
+        if is_deleted:
+            deleted[kind].append(object_id)
+        else:
+            ids[kind].add(object_id)
+
+    items = Item.objects.in_bulk(ids[CatalogChange.Kind.ITEM])
+    skus = SKU.objects.in_bulk(ids[CatalogChange.Kind.SKU])
+    # Rows deleted after their change was logged count as tombstones too
+    deleted['item'] += sorted(ids['item'] - items.keys())
+    deleted['sku'] += sorted(ids['sku'] - skus.keys())
+
+    return {
+        'cursor': cursor,
+        'has_more': has_more,
+        'items': [items[pk] for pk in sorted(items)],
+        'skus': [skus[pk] for pk in sorted(skus)],
+        'deleted_items': sorted(deleted['item']),
+        'deleted_skus': sorted(deleted['sku']),
+    }
+
+
+def compact_changes(batch_size=1000):
+    """Drop settled log entries superseded by a newer entry for the same object.
+
+    Only entries older than SYNC_GAP_TIMEOUT are removed, so the gaps this
+    leaves are never mistaken for in-flight transactions.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.SYNC_GAP_TIMEOUT)
+    latest = {}
+    superseded = []
+    rows = (
+        CatalogChange.objects.filter(created_at__lt=settled)
+        .order_by('pk')
+        .values_list('pk', 'kind', 'object_id')
+    )
+    for pk, kind, object_id in rows.iterator():
+        key = (kind, object_id)
+        if key in latest:
+            superseded.append(latest[key])
+        latest[key] = pk
+
+    for start in range(0, len(superseded), batch_size):
+        CatalogChange.objects.filter(pk__in=superseded[start:start + batch_size]).delete()
+    return len(superseded)
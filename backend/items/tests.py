@@ -1,5 +1,6 @@
 import pytest
 from django.urls import reverse
+from hypothesis import assume, given, strategies as st
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -61,6 +62,25 @@ def customer_client(api_client, customer_user):
     return api_client
 
 
+@pytest.fixture
+def cashier_client(api_client, db):
+    """API client authenticated as a till cashier"""
+    from accounts.models import User
+    User.objects.create_user(
+        username='cashier@test.com',
+        email='cashier@test.com',
+        name='Cashier User',
+        password='CashierPass123!',
+        role='cashier'
+    )
+    response = api_client.post(reverse('login'), {
+        'email': 'cashier@test.com',
+        'password': 'CashierPass123!'
+    }, format='json')
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return api_client
+
+
 @pytest.mark.django_db
 class TestCreateItem:
     """Tests for admin creating items - US-2.1"""
@@ -366,11 +386,11 @@ def item_with_skus(db):
     """Create an item with multiple SKUs"""
     from items.models import Item, SKU
     item = Item.objects.create(name='Kaju Katli', category='dry', sale_type='weight')
-    SKU.objects.create(item=item, code='KK-250', unit_value=250, price=450.00)
-    SKU.objects.create(item=item, code='KK-500', unit_value=500, price=900.00)
-    SKU.objects.create(item=item, code='KK-1000', unit_value=1000, price=1800.00)
+    SKU.objects.create(item=item, code='KK-250', unit_value=250, price=45000)
+    SKU.objects.create(item=item, code='KK-500', unit_value=500, price=90000)
+    SKU.objects.create(item=item, code='KK-1000', unit_value=1000, price=180000)
     # Inactive SKU - should not appear
-    SKU.objects.create(item=item, code='KK-OLD', unit_value=100, price=180.00, is_active=False)
+    SKU.objects.create(item=item, code='KK-OLD', unit_value=100, price=18000, is_active=False)
     return item
 
 
@@ -506,9 +526,9 @@ def item_with_inventory_and_skus(db):
         sale_type='weight',
         inventory_qty=5000  # 5000 grams in stock
     )
-    SKU.objects.create(item=item, code='KK-250', unit_value=250, price=450.00)
-    SKU.objects.create(item=item, code='KK-500', unit_value=500, price=900.00)
-    SKU.objects.create(item=item, code='KK-1000', unit_value=1000, price=1800.00)
+    SKU.objects.create(item=item, code='KK-250', unit_value=250, price=45000)
+    SKU.objects.create(item=item, code='KK-500', unit_value=500, price=90000)
+    SKU.objects.create(item=item, code='KK-1000', unit_value=1000, price=180000)
     return item
 
 
@@ -522,8 +542,8 @@ def count_item_with_inventory(db):
         sale_type='count',
         inventory_qty=50  # 50 pieces in stock
     )
-    SKU.objects.create(item=item, code='GJ-1', unit_value=1, price=25.00)
-    SKU.objects.create(item=item, code='GJ-6', unit_value=6, price=140.00)
+    SKU.objects.create(item=item, code='GJ-1', unit_value=1, price=2500)
+    SKU.objects.create(item=item, code='GJ-6', unit_value=6, price=14000)
     return item
 
 
@@ -669,7 +689,7 @@ class TestPurchase:
             item=item_with_inventory_and_skus,
             code='KK-OLD',
             unit_value=100,
-            price=180.00,
+            price=18000,
             is_active=False
         )
         url = reverse('purchase')
@@ -678,3 +698,2737 @@ class TestPurchase:
         response = customer_client.post(url, data, format='json')
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.fixture
+def low_stock_item(db):
+    """Count item with a reorder level of 10 pieces"""
+    from items.models import Item, SKU
+    item = Item.objects.create(
+        name='Milk Peda',
+        category='milk',
+        sale_type='count',
+        inventory_qty=14,
+        reorder_level=10
+    )
+    SKU.objects.create(item=item, code='MP-1', unit_value=1, price=2000)
+    SKU.objects.create(item=item, code='MP-4', unit_value=4, price=7500)
+    return item
+
+
+@pytest.mark.django_db
+class TestLowStockAlerts:
+    """Tests for reorder-level crossing alerts"""
+
+    def _buy(self, client, code, quantity=1):
+        from items.models import SKU
+        sku = SKU.objects.get(code=code)
+        return client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': quantity}, format='json')
+
+    def test_alert_fires_when_purchase_crosses_level(self, customer_client, low_stock_item):
+        """Dropping from 14 to 9 pieces raises one alert"""
+        from items.models import LowStockAlert
+        self._buy(customer_client, 'MP-1', quantity=5)
+
+        alert = LowStockAlert.objects.get()
+        assert alert.item == low_stock_item
+        assert alert.inventory_qty == 9
+        assert alert.reorder_level == 10
+
+    def test_alert_fires_only_on_crossing(self, customer_client, low_stock_item):
+        """Purchases above the level and further purchases below it stay silent"""
+        from items.models import LowStockAlert
+        self._buy(customer_client, 'MP-4')  # 14 -> 10, still at level
+        assert LowStockAlert.objects.count() == 0
+
+        self._buy(customer_client, 'MP-1')  # 10 -> 9, crosses
+        self._buy(customer_client, 'MP-1')  # 9 -> 8, already low
+
+        assert LowStockAlert.objects.count() == 1
+
+    def test_restock_rearms_alert(self, admin_client, low_stock_item):
+        """Setting inventory above the level lets the next crossing alert again"""
+        from items.models import LowStockAlert
+        self._buy(admin_client, 'MP-1', quantity=5)
+        admin_client.post(reverse('set-inventory', kwargs={'pk': low_stock_item.id}), {'quantity': 12}, format='json')
+        self._buy(admin_client, 'MP-4')
+
+        assert LowStockAlert.objects.count() == 2
+
+    def test_set_inventory_below_level_alerts(self, admin_client, low_stock_item):
+        """Setting stock below the reorder level is a crossing too"""
+        from items.models import LowStockAlert
+        url = reverse('set-inventory', kwargs={'pk': low_stock_item.id})
+
+        response = admin_client.post(url, {'quantity': 3}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert LowStockAlert.objects.get().inventory_qty == 3
+
+    def test_admin_can_set_reorder_level(self, admin_client, weight_item):
+        """Reorder level can be set together with inventory"""
+        url = reverse('set-inventory', kwargs={'pk': weight_item.id})
+
+        response = admin_client.post(url, {'quantity': 5000, 'reorder_level': 1000}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['reorder_level'] == 1000
+
+    def test_zero_reorder_level_never_alerts(self, customer_client, count_item_with_inventory):
+        """Items without a reorder level never alert"""
+        from items.models import LowStockAlert
+        from items.models import SKU
+        sku = SKU.objects.get(code='GJ-6')
+        customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 8}, format='json')
+
+        assert LowStockAlert.objects.count() == 0
+
+    def test_alert_queues_low_stock_tasks(self, settings, customer_client, low_stock_item, django_capture_on_commit_callbacks):
+        """Alerts are handed to LOW_STOCK_TASKS through the task queue"""
+        from items.models import LowStockAlert
+        from taskqueue.models import Task
+        settings.LOW_STOCK_TASKS = ['taskqueue.tests.record']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self._buy(customer_client, 'MP-1', quantity=5)
+
+        assert Task.objects.get().kwargs == {'alert_id': LowStockAlert.objects.get().id}
+
+    def test_non_crossing_purchase_adds_no_queries(self, customer_client, low_stock_item, count_item_with_inventory):
+        """Purchases that stay above the level cost the same as items without alerts"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        sku_id = count_item_with_inventory.skus.get(code='GJ-1').id
+        # The first purchase in a process loads price lists and compiles promotions
+        customer_client.post(reverse('purchase'), {'sku_id': sku_id, 'quantity': 1}, format='json')
+        with CaptureQueriesContext(connection) as plain:
+            customer_client.post(reverse('purchase'), {'sku_id': sku_id, 'quantity': 1}, format='json')
+        watched_id = low_stock_item.skus.get(code='MP-1').id
+        with CaptureQueriesContext(connection) as watched:
+            customer_client.post(reverse('purchase'), {'sku_id': watched_id, 'quantity': 1}, format='json')
+
+        assert len(watched) == len(plain)
+
+
+@pytest.mark.django_db
+class TestLowStockList:
+    """Tests for the low-stock endpoint"""
+
+    def test_lists_only_items_below_level(self, admin_client, low_stock_item, count_item_with_inventory):
+        """Only active items under their reorder level are listed"""
+        from items.models import Item
+        Item.objects.filter(pk=low_stock_item.id).update(inventory_qty=4)
+        Item.objects.create(name='Old Barfi', category='milk', sale_type='count', inventory_qty=1, reorder_level=5, is_active=False)
+
+        response = admin_client.get(reverse('low-stock'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [i['name'] for i in response.data] == ['Milk Peda']
+        assert response.data[0]['reorder_level'] == 10
+
+    def test_customer_cannot_list_low_stock(self, customer_client):
+        """Low-stock list is admin only"""
+        response = customer_client.get(reverse('low-stock'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentPurchases:
+    """Stock updates and alerts under concurrent purchases"""
+
+    def test_concurrent_purchases_cross_once(self, low_stock_item, customer_user):
+        """Concurrent buyers never oversell and trigger exactly one alert"""
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connection
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+        from items.models import Item, LowStockAlert, SKU
+        token = str(AccessToken.for_user(customer_user))
+        sku_id = SKU.objects.get(code='MP-1').id
+
+        def buy(_):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            try:
+                return client.post(reverse('purchase'), {'sku_id': sku_id, 'quantity': 1}, format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(buy, range(20)))
+
+        assert codes.count(status.HTTP_201_CREATED) == 14
+        assert Item.objects.get(pk=low_stock_item.id).inventory_qty == 0
+        assert LowStockAlert.objects.count() == 1
+
+
+@pytest.fixture
+def catalog(db):
+    """Small catalog for search tests"""
+    from items.models import Item, SKU
+    kaju = Item.objects.create(name='Kaju Katli', category='dry', sale_type='weight')
+    SKU.objects.create(item=kaju, code='KK-250', unit_value=250, price=45000)
+    jamun = Item.objects.create(name='Gulab Jamun', category='milk', sale_type='count')
+    SKU.objects.create(item=jamun, code='GJ-6', unit_value=6, price=14000)
+    Item.objects.create(name='Kaju Roll', category='dry', sale_type='count')
+    Item.objects.create(name='Kesar Peda', category='milk', sale_type='count')
+    Item.objects.create(name='Kaju Pista Roll', category='dry', sale_type='weight', is_active=False)
+    return kaju
+
+
+@pytest.mark.django_db
+class TestSearchItems:
+    """Tests for catalog search"""
+
+    def _names(self, client, **params):
+        response = client.get(reverse('search-items'), params)
+        assert response.status_code == status.HTTP_200_OK
+        return [item['name'] for item in response.data]
+
+    def test_prefix_match(self, api_client, catalog):
+        """Word prefixes match item names"""
+        assert set(self._names(api_client, q='kaj')) == {'Kaju Katli', 'Kaju Roll'}
+
+    def test_short_prefix_match(self, api_client, catalog):
+        """Prefixes shorter than a trigram still match"""
+        assert self._names(api_client, q='gu') == ['Gulab Jamun']
+
+    def test_typo_tolerant_match(self, api_client, catalog):
+        """Misspelled words still find the item"""
+        assert self._names(api_client, q='kaju katly')[0] == 'Kaju Katli'
+        assert self._names(api_client, q='jamn') == ['Gulab Jamun']
+
+    def test_matches_sku_code(self, api_client, catalog):
+        """SKU codes are searchable"""
+        assert self._names(api_client, q='gj-6') == ['Gulab Jamun']
+
+    def test_filters_by_category_and_sale_type(self, api_client, catalog):
+        """Category and sale type narrow the results"""
+        assert self._names(api_client, q='kaju', sale_type='count') == ['Kaju Roll']
+        assert self._names(api_client, q='peda', category='dry') == []
+
+    def test_excludes_inactive_items(self, api_client, catalog):
+        """Inactive items never appear in search"""
+        assert 'Kaju Pista Roll' not in self._names(api_client, q='pista')
+
+    def test_filters_apply_before_the_candidate_limit(self, api_client, catalog, monkeypatch):
+        """Inactive or filtered-out matches do not use up the candidate rows"""
+        from items.models import Item
+        monkeypatch.setattr('items.search.CANDIDATE_LIMIT', 3)
+        for i in range(5):
+            Item.objects.create(name=f'Kaju Katli {i}', category='dry', sale_type='weight', is_active=False)
+            Item.objects.create(name=f'Kaju Barfi {i}', category='dry', sale_type='weight')
+
+        assert self._names(api_client, q='kaju', sale_type='count') == ['Kaju Roll']
+        assert self._names(api_client, q='kaju', category='milk') == []
+        assert self._names(api_client, q='katli') == ['Kaju Katli']
+        assert self._names(api_client, q='ka', sale_type='count') == ['Kaju Roll']
+
+    def test_sku_code_ignores_inactive_skus_and_items(self, api_client, catalog):
+        """Codes of inactive SKUs, or of SKUs on inactive items, find nothing"""
+        from items.models import Item, SKU
+        SKU.objects.create(item=catalog, code='OLD-500', unit_value=500, price=90000, is_active=False)
+        retired = Item.objects.get(name='Kaju Pista Roll')
+        SKU.objects.create(item=retired, code='KPR-777', unit_value=777, price=50000)
+
+        assert self._names(api_client, q='old-500') == []
+        assert self._names(api_client, q='kpr-777') == []
+
+    def test_postgres_code_match_ignores_inactive(self, catalog):
+        """The SKU code condition used on PostgreSQL applies the same is_active filters"""
+        from items.models import Item, SKU
+        from items.search import _code_matches, _filters
+        SKU.objects.create(item=catalog, code='OLD-500', unit_value=500, price=90000, is_active=False)
+        retired = Item.objects.get(name='Kaju Pista Roll')
+        SKU.objects.create(item=retired, code='KPR-777', unit_value=777, price=50000)
+
+        def found(code):
+            return list(Item.objects.filter(_filters(None, None), _code_matches(code)).values_list('name', flat=True))
+
+        assert found('kk-2') == ['Kaju Katli']
+        assert found('old') == []
+        assert found('kpr') == []
+
+    def test_index_follows_renames_and_sku_changes(self, api_client, catalog):
+        """Renamed items and deactivated SKUs are reflected immediately"""
+        catalog.name = 'Kaju Barfi'
+        catalog.save()
+        catalog.skus.update(is_active=False)
+
+        assert self._names(api_client, q='barfi') == ['Kaju Barfi']
+        assert self._names(api_client, q='kk-250') == []
+
+    def test_unrelated_query_returns_nothing(self, api_client, catalog):
+        """Queries without a close match return an empty list"""
+        assert self._names(api_client, q='xyzzy') == []
+
+    def test_query_is_required(self, api_client):
+        """Missing q is rejected"""
+        response = api_client.get(reverse('search-items'))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+class TestReplicaRouting:
+    """Catalog reads go to the replica, writes and read-after-write to the primary"""
+
+    @pytest.fixture(autouse=True)
+    def use_replica(self, settings):
+        settings.DATABASE_REPLICAS = ['replica']
+
+    def test_safe_reads_use_replica(self, api_client, weight_item):
+        """The replica (empty here) answers public catalog reads"""
+        response = api_client.get(reverse('list-items'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
+
+    def test_detail_read_uses_replica(self, api_client, weight_item):
+        """Item detail is read from the replica"""
+        response = api_client.get(reverse('item-detail', kwargs={'pk': weight_item.id}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_write_response_reads_primary(self, admin_user, weight_item):
+        """SetInventoryView's response reflects its own write"""
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework_simplejwt.tokens import AccessToken
+        from items.models import Item
+        Item.objects.using('replica').create(id=weight_item.id, name='Stale Copy', category='dry', sale_type='weight')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin_user)}")
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = client.post(reverse('set-inventory', kwargs={'pk': weight_item.id}), {'quantity': 700}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['name'] == 'Kaju Katli'
+        assert response.data['inventory_qty'] == 700
+        assert len(replica_queries) == 0
+
+    def test_client_stays_pinned_after_write(self, admin_client, weight_item):
+        """After a write the pin cookie keeps the client's reads on the primary"""
+        from config.db_routing import PIN_COOKIE
+        response = admin_client.post(reverse('set-inventory', kwargs={'pk': weight_item.id}), {'quantity': 700}, format='json')
+        assert PIN_COOKIE in response.cookies
+
+        response = admin_client.get(reverse('item-detail', kwargs={'pk': weight_item.id}))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['inventory_qty'] == 700
+
+    def test_writes_outside_requests_do_not_pin(self):
+        """A command or task worker that writes keeps reading from replicas"""
+        import contextvars
+        from config.db_routing import PrimaryReplicaRouter, pinned_to_primary
+        from items.models import Item
+        router = PrimaryReplicaRouter()
+
+        def write_then_read():
+            router.db_for_write(Item)
+            with pinned_to_primary(True):
+                pinned = router.db_for_read(Item)
+            return router.db_for_read(Item), pinned
+
+        assert contextvars.Context().run(write_then_read) == ('replica', 'default')
+
+    def test_no_replicas_reads_primary(self, settings, api_client, weight_item):
+        """Without replicas configured everything uses the primary"""
+        settings.DATABASE_REPLICAS = []
+
+        response = api_client.get(reverse('list-items'))
+
+        assert [item['name'] for item in response.data] == ['Kaju Katli']
+
+
+@pytest.mark.django_db
+class TestBatch:
+    """Several API calls in one request through /api/batch"""
+
+    def _batch(self, client, *requests):
+        response = client.post(reverse('batch'), {'requests': list(requests)}, format='json')
+        assert response.status_code == status.HTTP_200_OK, response.data
+        return response.data['responses']
+
+    def test_list_and_details_match_single_calls(self, api_client, item_with_inventory_and_skus, count_item_with_inventory):
+        ids = [item_with_inventory_and_skus.id, count_item_with_inventory.id]
+
+        responses = self._batch(
+            api_client,
+            {'path': '/api/items/list'},
+            *({'path': f'/api/items/{pk}'} for pk in ids),
+            {'path': '/api/items/999999'},
+        )
+
+        assert [r['status'] for r in responses] == [200, 200, 200, 404]
+        assert responses[0]['body'] == api_client.get(reverse('list-items')).data
+        assert responses[2]['body'] == api_client.get(reverse('item-detail', args=[ids[1]])).data
+
+    def test_writes_run_in_order_as_the_batch_user(self, customer_client, customer_user, count_item_with_inventory):
+        from items.models import SKU
+        sku = SKU.objects.get(code='GJ-6')
+        detail = {'path': f'/api/items/{count_item_with_inventory.id}'}
+
+        before, purchase, after = self._batch(
+            customer_client, detail,
+            {'method': 'POST', 'path': '/api/items/purchase', 'body': {'sku_id': sku.id, 'quantity': 2}},
+            detail,
+        )
+
+        assert purchase['status'] == status.HTTP_201_CREATED
+        assert purchase['body']['user'] == customer_user.id
+        assert (before['body']['inventory_qty'], after['body']['inventory_qty']) == (50, 38)
+
+    def test_authenticates_once(self, customer_client, count_item_with_inventory, monkeypatch):
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from items.models import SKU
+        calls = []
+        authenticate = JWTAuthentication.authenticate
+        monkeypatch.setattr(JWTAuthentication, 'authenticate', lambda self, request: calls.append(1) or authenticate(self, request))
+        purchase = {'method': 'POST', 'path': '/api/items/purchase', 'body': {'sku_id': SKU.objects.get(code='GJ-1').id, 'quantity': 1}}
+
+        responses = self._batch(customer_client, purchase, purchase, {'path': '/api/items/list'})
+
+        assert [r['status'] for r in responses] == [201, 201, 200]
+        assert len(calls) == 1
+
+    def test_sub_requests_keep_their_permissions(self, customer_client, api_client):
+        customer = self._batch(customer_client, {'method': 'POST', 'path': '/api/items/', 'body': {'name': 'X'}})
+        api_client.credentials()
+        anonymous = self._batch(api_client, {'method': 'POST', 'path': '/api/items/purchase', 'body': {}})
+
+        assert customer[0]['status'] == status.HTTP_403_FORBIDDEN
+        assert anonymous[0]['status'] == status.HTTP_401_UNAUTHORIZED
+
+    def test_login_in_a_batch(self, api_client, customer_user):
+        login, = self._batch(api_client, {
+            'method': 'POST', 'path': '/api/auth/login',
+            'body': {'email': 'customer@test.com', 'password': 'CustomerPass123!'},
+        })
+
+        assert login['status'] == status.HTTP_200_OK
+        assert 'access' in login['body']
+
+    def test_identical_reads_run_once(self, api_client, count_item_with_inventory):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        detail = {'path': f'/api/items/{count_item_with_inventory.id}'}
+        with CaptureQueriesContext(connection) as once:
+            self._batch(api_client, detail)
+
+        with CaptureQueriesContext(connection) as thrice:
+            responses = self._batch(api_client, detail, detail, detail)
+
+        assert len(thrice) == len(once)
+        assert responses[0] == responses[2]
+
+    @pytest.mark.parametrize('requests', [
+        [{'path': '/admin/'}],
+        [{'path': '/api/batch'}],
+        [{'method': 'TRACE', 'path': '/api/items/list'}],
+        [],
+        [{'path': '/api/items/list'}] * 21,
+    ])
+    def test_invalid_batches(self, api_client, requests):
+        response = api_client.post(reverse('batch'), {'requests': requests}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+class TestConcurrentBatch:
+    """Read-only sub-requests on worker threads"""
+
+    def test_reads_run_concurrently(self, api_client, sample_items, settings, monkeypatch):
+        import threading
+        from items.models import Item
+        from items.views import ItemDetailView
+        settings.BATCH_WORKERS = 4
+        threads = []
+        get = ItemDetailView.get
+        monkeypatch.setattr(ItemDetailView, 'get', lambda self, request, pk: threads.append(threading.current_thread().name) or get(self, request, pk))
+        ids = list(Item.objects.filter(is_active=True).values_list('id', flat=True))
+
+        response = api_client.post(reverse('batch'), {'requests': [{'path': f'/api/items/{pk}'} for pk in ids]}, format='json')
+
+        assert [r['body']['id'] for r in response.data['responses']] == ids
+        assert all(name.startswith('batch') for name in threads)
+
+    def test_worker_connections_follow_conn_max_age(self, api_client, sample_items, settings, monkeypatch):
+        """Pool threads close their connections after a sub-request like the request cycle does"""
+        from django.db import connections
+        from items.models import Item
+        from items.views import ItemDetailView
+        settings.BATCH_WORKERS = 4
+        assert settings.DATABASES['default']['CONN_MAX_AGE'] == 0
+        used = []
+        get = ItemDetailView.get
+        monkeypatch.setattr(ItemDetailView, 'get', lambda self, request, pk: used.append(connections['default']) or get(self, request, pk))
+        ids = list(Item.objects.filter(is_active=True).values_list('id', flat=True))
+
+        response = api_client.post(reverse('batch'), {'requests': [{'path': f'/api/items/{pk}'} for pk in ids]}, format='json')
+
+        assert all(r['status'] == 200 for r in response.data['responses'])
+        assert used and all(wrapper.connection is None for wrapper in used)
+
+    def test_reads_use_replica_until_a_write(self, customer_client, count_item_with_inventory, settings):
+        """Reads after a write in the same batch see it on the primary"""
+        from items.models import SKU
+        sku = SKU.objects.get(code='GJ-1')
+        settings.DATABASE_REPLICAS = ['replica']
+        detail = {'path': f'/api/items/{count_item_with_inventory.id}'}
+
+        before, _, after = customer_client.post(reverse('batch'), {'requests': [
+            detail,
+            {'method': 'POST', 'path': '/api/items/purchase', 'body': {'sku_id': sku.id, 'quantity': 1}},
+            detail,
+        ]}, format='json').data['responses']
+
+        assert before['status'] == status.HTTP_404_NOT_FOUND  # the replica is empty here
+        assert after['body']['inventory_qty'] == 49
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGroupCommitPurchases:
+    """Tests for the opt-in group-commit purchase pipeline"""
+
+    @pytest.fixture(autouse=True)
+    def group_commit(self, settings):
+        from items.purchasing import reset_dispatcher
+        settings.PURCHASE_GROUP_COMMIT = True
+        settings.PURCHASE_GROUP_COMMIT_WINDOW_MS = 50
+        reset_dispatcher()
+        yield
+        reset_dispatcher()
+
+    def _concurrent_buys(self, user, requests):
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connection
+        from rest_framework_simplejwt.tokens import AccessToken
+        token = str(AccessToken.for_user(user))
+
+        def buy(body):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            try:
+                return client.post(reverse('purchase'), body, format='json')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+            return list(pool.map(buy, requests))
+
+    def test_single_purchase(self, customer_client, count_item_with_inventory):
+        """A lone purchase behaves exactly like a regular one"""
+        from items.models import SKU, Item
+        sku = SKU.objects.get(code='GJ-6')
+
+        response = customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 2}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['sku']['code'] == 'GJ-6'
+        assert float(response.data['total_price']) == 280.00
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 38
+
+    def test_unknown_sku_is_404(self, customer_client):
+        """SKU lookup errors are still reported per request"""
+        response = customer_client.post(reverse('purchase'), {'sku_id': 99999, 'quantity': 1}, format='json')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_contended_purchases_are_exact(self, customer_user, count_item_with_inventory):
+        """Concurrent buyers get individual results and stock is never oversold"""
+        from items.models import SKU, Item, Purchase
+        from items.purchasing import get_dispatcher
+        sku = SKU.objects.get(code='GJ-6')  # 50 pieces in stock, 6 per pack
+
+        responses = self._concurrent_buys(customer_user, [{'sku_id': sku.id, 'quantity': 1}] * 12)
+
+        codes = [r.status_code for r in responses]
+        assert codes.count(status.HTTP_201_CREATED) == 8
+        assert codes.count(status.HTTP_400_BAD_REQUEST) == 4
+        assert all('insufficient' in r.data['error'].lower() for r in responses if r.status_code == 400)
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 2
+        created_ids = {r.data['id'] for r in responses if r.status_code == 201}
+        assert set(Purchase.objects.values_list('id', flat=True)) == created_ids
+        assert get_dispatcher().batches < 12
+
+    def test_batch_spanning_items(self, customer_user, count_item_with_inventory, item_with_inventory_and_skus):
+        """One batch can deduct from several items"""
+        from items.models import SKU, Item
+        requests = [
+            {'sku_id': SKU.objects.get(code='GJ-1').id, 'quantity': 5},
+            {'sku_id': SKU.objects.get(code='KK-1000').id, 'quantity': 2},
+            {'sku_id': SKU.objects.get(code='GJ-6').id, 'quantity': 1},
+        ]
+
+        responses = self._concurrent_buys(customer_user, requests)
+
+        assert [r.status_code for r in responses] == [201, 201, 201]
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 39
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).inventory_qty == 3000
+
+
+
+@pytest.mark.django_db
+class TestOfflinePurchaseBatch:
+    """Tests for uploading purchases recorded while a till was offline"""
+
+    def _line(self, sku, quantity=1, minute=0, client_id=None, created_at=None):
+        """A sale at `minute` past the hour before last, or at created_at"""
+        import uuid
+        from datetime import timedelta
+        from django.utils import timezone
+        if created_at is None:
+            created_at = (timezone.now() - timedelta(hours=2)).replace(minute=minute, second=0, microsecond=0)
+        return {
+            'client_id': str(client_id or uuid.uuid4()),
+            'sku_id': sku.id,
+            'quantity': quantity,
+            'created_at': created_at.isoformat(),
+        }
+
+    def test_upload_creates_purchases(self, cashier_client, count_item_with_inventory):
+        """Each line becomes a purchase carrying its offline sale time"""
+        from items.models import SKU, Item, Purchase
+        sku = SKU.objects.get(code='GJ-6')
+        lines = [self._line(sku, 2, minute=5), self._line(sku, 1, minute=6)]
+
+        response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r['status'] for r in response.data['results']] == ['created', 'created']
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 32
+        purchase = Purchase.objects.get(pk=response.data['results'][0]['purchase_id'])
+        assert str(purchase.client_id) == lines[0]['client_id']
+        assert purchase.created_at.minute == 5
+        assert purchase.total_price == 28000
+
+    def test_retry_is_idempotent(self, cashier_client, count_item_with_inventory):
+        """Re-uploading the same lines reports duplicates and deducts nothing"""
+        from items.models import SKU, Item, Purchase
+        sku = SKU.objects.get(code='GJ-1')
+        lines = [self._line(sku, 3), self._line(sku, 4)]
+
+        first = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+        second = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        assert [r['status'] for r in second.data['results']] == ['duplicate', 'duplicate']
+        assert [r['purchase_id'] for r in second.data['results']] == [r['purchase_id'] for r in first.data['results']]
+        assert Purchase.objects.count() == 2
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 43
+
+    def test_repeated_line_in_one_batch(self, cashier_client, count_item_with_inventory):
+        """A client_id appearing twice in one upload is applied once"""
+        from items.models import SKU, Purchase
+        line = self._line(SKU.objects.get(code='GJ-1'))
+
+        response = cashier_client.post(reverse('purchase-batch'), {'purchases': [line, line]}, format='json')
+
+        assert [r['status'] for r in response.data['results']] == ['created', 'duplicate']
+        assert Purchase.objects.count() == 1
+
+    def test_lines_rejected_individually(self, cashier_client, count_item_with_inventory):
+        """Unknown SKUs and oversold lines are rejected without failing the batch"""
+        from items.models import SKU, Item
+        sku = SKU.objects.get(code='GJ-6')  # 50 pieces in stock, 6 per pack
+        lines = [
+            self._line(sku, 5, minute=30),
+            self._line(sku, 8, minute=10),  # earlier sale wins the stock
+            {**self._line(sku), 'sku_id': 99999},
+        ]
+
+        response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        results = response.data['results']
+        assert [r['status'] for r in results] == ['rejected', 'created', 'rejected']
+        assert results[0]['error'] == 'Insufficient inventory available'
+        assert results[2]['error'] == 'SKU not found'
+        assert Item.objects.get(pk=count_item_with_inventory.id).inventory_qty == 2
+
+    def test_query_count_does_not_grow_with_lines(self, cashier_client, count_item_with_inventory, django_assert_max_num_queries):
+        """Bulk lookups and writes keep the upload to a fixed number of queries"""
+        from items.models import SKU
+        sku = SKU.objects.get(code='GJ-1')
+        lines = [self._line(sku, minute=i % 60) for i in range(40)]
+
+        with django_assert_max_num_queries(20):
+            response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        assert all(r['status'] == 'created' for r in response.data['results'])
+
+    def test_purchase_tasks_are_queued_in_one_insert(self, cashier_client, count_item_with_inventory, settings,
+                                                     django_capture_on_commit_callbacks):
+        """PURCHASE_TASKS for a whole upload are written with one query after commit"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from items.models import SKU
+        from taskqueue.models import Task
+        settings.PURCHASE_TASKS = ['taskqueue.tests.record', 'taskqueue.tests.explode']
+        sku = SKU.objects.get(code='GJ-1')
+        lines = [self._line(sku, minute=i % 60) for i in range(40)]
+
+        with CaptureQueriesContext(connection) as context:
+            with django_capture_on_commit_callbacks(execute=True) as callbacks:
+                response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        assert all(r['status'] == 'created' for r in response.data['results'])
+        assert len(context) <= 20 + 1  # the upload's own budget plus the task insert
+        assert len(callbacks) == 1
+        assert len([q for q in context.captured_queries if q['sql'].startswith('INSERT INTO "taskqueue_task"')]) == 1
+        assert Task.objects.count() == 80
+
+    def test_customers_cannot_upload(self, customer_client, count_item_with_inventory):
+        """Offline uploads are for tills: customer accounts get a 403"""
+        from items.models import SKU, Purchase
+        line = self._line(SKU.objects.get(code='GJ-1'))
+
+        response = customer_client.post(reverse('purchase-batch'), {'purchases': [line]}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        assert not Purchase.objects.exists()
+
+    def test_sales_outside_offline_window_rejected(self, cashier_client, count_item_with_inventory, settings):
+        """Lines dated in the future (beyond clock skew) or older than OFFLINE_MAX_AGE_SECONDS are rejected"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from items.models import SKU, Purchase
+        settings.OFFLINE_MAX_AGE_SECONDS = 86400
+        settings.OFFLINE_CLOCK_SKEW_SECONDS = 300
+        sku = SKU.objects.get(code='GJ-1')
+        now = timezone.now()
+        lines = [
+            self._line(sku, created_at=now + timedelta(days=3650)),
+            self._line(sku, created_at=now - timedelta(days=3650)),
+            self._line(sku, created_at=now - timedelta(days=2)),
+            self._line(sku, created_at=now + timedelta(seconds=60)),  # within skew
+            self._line(sku, created_at=now - timedelta(hours=23)),
+        ]
+
+        response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        results = response.data['results']
+        assert [r['status'] for r in results] == ['rejected', 'rejected', 'rejected', 'created', 'created']
+        assert results[0]['error'] == 'Sale time is in the future'
+        assert results[1]['error'] == results[2]['error'] == 'Sale is older than the offline upload window'
+        assert Purchase.objects.count() == 2
+
+    def test_invalid_payload(self, cashier_client):
+        """Malformed lines fail validation"""
+        response = cashier_client.post(
+            reverse('purchase-batch'),
+            {'purchases': [{'client_id': 'nope', 'sku_id': 1, 'quantity': 0}]},
+            format='json'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_batch_size_limit(self, cashier_client, count_item_with_inventory, settings):
+        """Uploads over OFFLINE_BATCH_MAX_LINES are refused"""
+        from items.models import SKU
+        settings.OFFLINE_BATCH_MAX_LINES = 2
+        sku = SKU.objects.get(code='GJ-1')
+
+        response = cashier_client.post(
+            reverse('purchase-batch'), {'purchases': [self._line(sku) for _ in range(3)]}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_requires_authentication(self, api_client):
+        """Anonymous uploads are refused"""
+        response = api_client.post(reverse('purchase-batch'), {'purchases': []}, format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestPurchaseArchive:
+    """Tests for archiving closed months of purchases and reading them back"""
+
+    @pytest.fixture(autouse=True)
+    def archive_dir(self, settings, tmp_path):
+        settings.PURCHASE_ARCHIVE_DIR = str(tmp_path)
+        return tmp_path
+
+    @pytest.fixture
+    def history(self, customer_user, count_item_with_inventory):
+        """Two purchases a month for the last six months"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from items.archive import add_months, period_bounds, period_of
+        from items.models import SKU, Purchase
+        sku = SKU.objects.get(code='GJ-1')
+        current = period_of(timezone.now())
+        purchases = []
+        for months_ago in range(6):
+            month_start, _ = period_bounds(add_months(current, -months_ago))
+            for day in (0, 1):
+                created_at = month_start + timedelta(days=day, hours=12)
+                purchases.append(Purchase(
+                    user=customer_user, sku=sku, quantity=months_ago + 1,
+                    total_price=2500 * (months_ago + 1), created_at=created_at
+                ))
+        return Purchase.objects.bulk_create(purchases)
+
+    def _report(self, client):
+        from datetime import timedelta
+        from django.utils import timezone
+        today = timezone.now().date()
+        return client.get(reverse('sales-report'), {'start': today - timedelta(days=250), 'end': today})
+
+    def test_period_bounds(self):
+        """Periods are UTC months and roll over the year"""
+        from datetime import datetime, timezone
+        from items.archive import add_months, period_bounds, period_of
+        assert period_of(datetime(2025, 12, 31, 23, 0, tzinfo=timezone.utc)) == '202512'
+        assert add_months('202512', 1) == '202601'
+        assert add_months('202601', -13) == '202412'
+        assert period_bounds('202512') == (
+            datetime(2025, 12, 1, tzinfo=timezone.utc), datetime(2026, 1, 1, tzinfo=timezone.utc)
+        )
+
+    def test_archive_moves_closed_months(self, history, archive_dir):
+        """Months beyond the hot window leave the database for archive files"""
+        from django.core.management import call_command
+        from items.archive import FIELDS, read_archive
+        from items.models import Purchase, PurchaseArchive
+        original = {row[0]: row for row in Purchase.objects.values_list(*FIELDS)}
+
+        call_command('archive_purchases', keep_months=3)
+
+        assert Purchase.objects.count() == 6
+        archives = PurchaseArchive.objects.order_by('period')
+        assert [a.rows for a in archives] == [2, 2, 2]
+        assert len(list(archive_dir.glob('purchases-*'))) == 3
+        for archive in archives:
+            for row in read_archive(archive.path):
+                assert row == original[row[0]]
+
+    def test_report_reads_archives_transparently(self, admin_client, history):
+        """The sales report is the same before and after archiving"""
+        from django.core.management import call_command
+
+        before = self._report(admin_client)
+        call_command('archive_purchases', keep_months=1)
+        after = self._report(admin_client)
+
+        assert before.status_code == status.HTTP_200_OK
+        assert len(before.data['rows']) == 12
+        assert after.data == before.data
+
+    def test_late_sale_archived_as_new_part(self, history, customer_user):
+        """A sale uploaded into an archived month is archived again as a second part"""
+        from django.core.management import call_command
+        from items.models import Purchase, PurchaseArchive
+        from items.reports import sales_by_day
+        from items.archive import period_bounds
+
+        call_command('archive_purchases', keep_months=3)
+        oldest = PurchaseArchive.objects.order_by('period').first()
+        start, end = period_bounds(oldest.period)
+        Purchase.objects.create(user=customer_user, sku=history[0].sku, quantity=7, total_price=17500, created_at=start)
+
+        assert sum(row['quantity'] for row in sales_by_day(start, end)) == 6 + 6 + 7
+        call_command('archive_purchases', keep_months=3)
+
+        assert PurchaseArchive.objects.filter(period=oldest.period).count() == 2
+        assert sum(row['quantity'] for row in sales_by_day(start, end)) == 6 + 6 + 7
+
+    def test_nothing_to_archive(self, history):
+        """Keeping every month leaves the table untouched"""
+        from django.core.management import call_command
+        from items.models import Purchase, PurchaseArchive
+
+        call_command('archive_purchases', keep_months=12)
+
+        assert Purchase.objects.count() == 12
+        assert not PurchaseArchive.objects.exists()
+
+    def test_report_validation(self, admin_client):
+        """Reversed or overlong ranges are rejected"""
+        reversed_range = admin_client.get(reverse('sales-report'), {'start': '2026-02-01', 'end': '2026-01-01'})
+        too_long = admin_client.get(reverse('sales-report'), {'start': '2024-01-01', 'end': '2026-01-01'})
+
+        assert reversed_range.status_code == status.HTTP_400_BAD_REQUEST
+        assert too_long.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_report_admin_only(self, customer_client):
+        """Customers cannot read sales reports"""
+        response = customer_client.get(reverse('sales-report'), {'start': '2026-01-01', 'end': '2026-01-31'})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestColumnarSegments:
+    """Tests for memory-mapped columnar purchase segments and their aggregates"""
+
+    @pytest.fixture
+    def sales(self, customer_user, count_item_with_inventory, item_with_inventory_and_skus):
+        """Purchases spread over ten days and five SKUs of two items"""
+        import random
+        import uuid
+        from datetime import datetime, timedelta, timezone
+        from items.models import SKU, Purchase, Store
+        from items.pricelists import create_price_list
+        from items.models import Promotion
+        rng = random.Random(7)
+        skus = list(SKU.objects.all())
+        store = Store.objects.create(name='Dadar')
+        start = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        price_list = create_price_list('March', start, {skus[0].id: 40000})
+        promotion = Promotion.objects.create(name='Holi', kind='category_discount', category='milk', percent=10)
+        purchases = []
+        for _ in range(300):
+            sku = rng.choice(skus)
+            quantity = rng.randint(1, 4)
+            purchases.append(Purchase(
+                user=customer_user, sku=sku, quantity=quantity, total_price=sku.price * quantity,
+                created_at=start + timedelta(seconds=rng.randrange(10 * 86400), microseconds=rng.randrange(10**6)),
+                client_id=uuid.uuid4() if rng.random() < 0.5 else None,
+                store=store if rng.random() < 0.3 else None,
+                price_list=price_list if rng.random() < 0.5 else None,
+                promotion=promotion if rng.random() < 0.2 else None,
+            ))
+        return Purchase.objects.bulk_create(purchases)
+
+    @pytest.fixture
+    def segment(self, sales, tmp_path):
+        from items.archive import FIELDS
+        from items.columnar import Segment, write_segment
+        from items.models import Purchase
+        write_segment(tmp_path / 'segment', Purchase.objects.values_list(*FIELDS))
+        return Segment(tmp_path / 'segment')
+
+    def test_round_trip(self, sales, segment):
+        """Every column reads back exactly, in sale-time order"""
+        from items.archive import FIELDS
+        from items.models import Purchase
+
+        expected = list(Purchase.objects.order_by('created_at', 'id').values_list(*FIELDS))
+
+        assert len(segment) == 300
+        assert list(segment.rows()) == expected
+
+    def test_segment_without_store_column(self, segment):
+        """Segments written before store_id existed read as central-stock sales"""
+        from items.columnar import Segment
+        (segment.path / 'store_id.npy').unlink()
+
+        assert {row[7] for row in Segment(segment.path).rows()} == {None}
+
+    def test_archived_pricing_round_trip(self, sales, segment):
+        """Archived sales keep the price list and promotion that priced them"""
+        from items.columnar import Segment
+        from items.models import Purchase
+        expected = {p.id: (p.price_list_id, p.promotion_id) for p in sales}
+
+        assert {row[0]: row[8:] for row in segment.rows()} == expected
+        assert Purchase.objects.filter(price_list__isnull=False).exists()
+        assert Purchase.objects.filter(promotion__isnull=False).exists()
+        (segment.path / 'price_list_id.npy').unlink()
+        (segment.path / 'promotion_id.npy').unlink()
+        assert {row[8:] for row in Segment(segment.path).rows()} == {(None, None)}
+
+    def test_time_range_slicing(self, segment):
+        """Row ranges are found by binary search on the sorted sale times"""
+        from datetime import datetime, timezone
+        from items.models import Purchase
+        start = datetime(2025, 3, 3, tzinfo=timezone.utc)
+        end = datetime(2025, 3, 5, 12, tzinfo=timezone.utc)
+
+        rows = segment.between(start, end)
+
+        assert rows.stop - rows.start == Purchase.objects.filter(created_at__gte=start, created_at__lt=end).count()
+
+    def test_sales_by_day_matches_orm(self, segment):
+        """Vectorized per-day, per-SKU sums equal the database GROUP BY"""
+        from datetime import timezone
+        from django.db.models import Sum
+        from django.db.models.functions import TruncDate
+        from items.columnar import day_of
+        from items.models import Purchase
+        expected = {
+            (row['day'], row['sku_id']): (row['quantity'], row['revenue'])
+            for row in Purchase.objects.annotate(day=TruncDate('created_at', tzinfo=timezone.utc))
+            .values('day', 'sku_id').annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+        }
+
+        days, skus, quantities, revenues = segment.sales_by_day()
+        actual = {
+            (day_of(day * 86_400_000_000), sku): (quantity, revenue)
+            for day, sku, quantity, revenue in zip(days.tolist(), skus.tolist(), quantities.tolist(), revenues.tolist())
+        }
+
+        assert actual == expected
+
+    def test_grams_per_item_matches_orm(self, admin_client, sales, settings, tmp_path):
+        """The item report gives the same grams and pieces once the month is archived"""
+        from django.db.models import F, Sum
+        from items.archive import archive_period
+        from items.models import Purchase
+        settings.PURCHASE_ARCHIVE_DIR = str(tmp_path)
+        expected = {
+            row['sku__item_id']: row['units']
+            for row in Purchase.objects.values('sku__item_id').annotate(units=Sum(F('quantity') * F('sku__unit_value')))
+        }
+        params = {'start': '2025-03-01', 'end': '2025-03-31'}
+        before = admin_client.get(reverse('item-sales-report'), params)
+
+        archive_period('202503')
+        after = admin_client.get(reverse('item-sales-report'), params)
+
+        assert not Purchase.objects.exists()
+        assert {row['item_id']: row['units'] for row in after.data['rows']} == expected
+        assert after.data == before.data
+        assert {row['sale_type'] for row in after.data['rows']} == {'weight', 'count'}
+
+    def test_export_command(self, sales, tmp_path):
+        """The export command writes a segment for the requested days"""
+        from django.core.management import call_command
+        from items.columnar import Segment
+        from items.models import Purchase
+
+        call_command('export_purchases', str(tmp_path / 'export'), start='2025-03-02', end='2025-03-02')
+
+        assert len(Segment(tmp_path / 'export')) == Purchase.objects.filter(created_at__date='2025-03-02').count()
+
+
+class TestForecasting:
+    """Tests for the vectorized forecasting helpers against plain loops"""
+
+    def test_exponential_smoothing_matches_recursion(self):
+        """The weighted-sum form equals the usual recursive update"""
+        import numpy as np
+        from items.forecasting import exponential_smoothing
+        series = np.random.default_rng(3).integers(0, 500, size=(20, 15)).astype(float)
+
+        for row, level in zip(series, exponential_smoothing(series, 0.3)):
+            expected = row[0]
+            for value in row[1:]:
+                expected = 0.3 * value + 0.7 * expected
+            assert level == pytest.approx(expected)
+
+    def test_demand_matrix_scatters_entries(self):
+        """Entries land in their item row and day column; others are dropped"""
+        import numpy as np
+        from items.forecasting import demand_matrix
+        entries = (
+            np.array([5, 9, 5, 7, 9]),       # item ids; 7 is not planned
+            np.array([100, 101, 100, 100, 99]),  # day numbers; 99 is before the window
+            np.array([250, 6, 500, 1, 3]),
+        )
+
+        matrix = demand_matrix([5, 9], 100, 3, entries)
+
+        assert matrix.tolist() == [[750, 0, 0], [0, 6, 0]]
+
+    def test_forecast_uses_same_weekday(self):
+        """Only the same weekday in earlier weeks feeds a day's forecast"""
+        import numpy as np
+        from items.forecasting import forecast_day
+        matrix = np.tile([10.0, 2, 2, 2, 2, 2, 2], (1, 4))  # four weeks, busy first weekday
+
+        busy, busy_average = forecast_day(matrix, 0, 28, 0.3, 4)
+        quiet, _ = forecast_day(matrix, 0, 29, 0.3, 4)
+
+        assert busy[0] == pytest.approx(10)
+        assert busy_average[0] == pytest.approx(10)
+        assert quiet[0] == pytest.approx(2)
+
+
+@pytest.mark.django_db
+class TestProductionPlan:
+    """Tests for the suggested production endpoint"""
+
+    @pytest.fixture(autouse=True)
+    def history_weeks(self, settings):
+        settings.FORECAST_HISTORY_WEEKS = 6
+
+    @pytest.fixture
+    def weekly_sales(self, customer_user, item_with_inventory_and_skus, count_item_with_inventory):
+        """Six weeks of Kaju Katli selling 2 kg on the target weekday and 500 g otherwise"""
+        from datetime import date, datetime, time, timedelta, timezone
+        from items.models import SKU, Purchase
+        kilo = SKU.objects.get(code='KK-1000')
+        half = SKU.objects.get(code='KK-500')
+        target = date(2026, 3, 16)
+        purchases = []
+        for offset in range(1, 43):
+            day = target - timedelta(days=offset)
+            sku, quantity = (kilo, 2) if offset % 7 == 0 else (half, 1)
+            purchases.append(Purchase(
+                user=customer_user, sku=sku, quantity=quantity, total_price=sku.price * quantity,
+                created_at=datetime.combine(day, time(11), tzinfo=timezone.utc)
+            ))
+        Purchase.objects.bulk_create(purchases)
+        return target
+
+    def test_suggested_production(self, admin_client, weekly_sales, settings):
+        """Forecast follows the weekday pattern and stock on hand is subtracted"""
+        settings.FORECAST_SAFETY_MARGIN = 0.1
+
+        response = admin_client.get(reverse('production-plan'), {'date': weekly_sales})
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = {row['name']: row for row in response.data['rows']}
+        kaju = rows['Kaju Katli']
+        assert kaju['forecast'] == pytest.approx(2000)
+        assert kaju['average'] == pytest.approx(2000)
+        assert kaju['suggested'] == 0  # 5000 g already in stock
+        assert rows['Gulab Jamun']['forecast'] == 0
+
+    def test_suggestion_covers_shortfall(self, admin_client, weekly_sales, item_with_inventory_and_skus):
+        """With little stock the suggestion is the padded forecast minus stock"""
+        item_with_inventory_and_skus.inventory_qty = 400
+        item_with_inventory_and_skus.save()
+
+        response = admin_client.get(reverse('production-plan'), {'date': weekly_sales})
+
+        kaju = next(row for row in response.data['rows'] if row['name'] == 'Kaju Katli')
+        assert kaju['suggested'] == 2200 - 400
+
+    def test_other_weekday_and_category_filter(self, admin_client, weekly_sales):
+        """A different weekday gets its own forecast; category narrows the items"""
+        from datetime import timedelta
+
+        response = admin_client.get(
+            reverse('production-plan'), {'date': weekly_sales + timedelta(days=1), 'category': 'dry'}
+        )
+
+        assert [row['name'] for row in response.data['rows']] == ['Kaju Katli']
+        assert response.data['rows'][0]['forecast'] == pytest.approx(500)
+
+    def test_includes_archived_history(self, admin_client, weekly_sales, settings, tmp_path):
+        """Archived months feed the forecast like hot ones"""
+        from items.archive import archive_period, period_of
+        from items.models import Purchase
+        settings.PURCHASE_ARCHIVE_DIR = str(tmp_path)
+        before = admin_client.get(reverse('production-plan'), {'date': weekly_sales})
+
+        for period in sorted({period_of(p.created_at) for p in Purchase.objects.all()}):
+            archive_period(period)
+        after = admin_client.get(reverse('production-plan'), {'date': weekly_sales})
+
+        assert not Purchase.objects.exists()
+        assert after.data == before.data
+
+    def test_admin_only(self, customer_client):
+        """Customers cannot see the production plan"""
+        response = customer_client.get(reverse('production-plan'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestMoney:
+    """Integer paise must be indistinguishable from the old Decimal fields at the API"""
+
+    def _decimal_field(self):
+        from rest_framework import serializers
+        return serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    @given(
+        price=st.decimals(min_value='0.01', max_value='99999.99', places=2),
+        quantity=st.integers(min_value=1, max_value=1000),
+    )
+    def test_totals_match_decimal_arithmetic(self, price, quantity):
+        """price * quantity in paise formats exactly like the Decimal total did"""
+        from items.money import RupeesField, format_paise
+        paise = RupeesField().to_internal_value(str(price))
+
+        assert format_paise(paise * quantity) == self._decimal_field().to_representation(price * quantity)
+
+    @given(st.one_of(
+        st.decimals(min_value='-1e9', max_value='1e9', places=3, allow_nan=False).map(str),
+        st.decimals(min_value='-1e9', max_value='1e9', places=2, allow_nan=False),
+        st.integers(min_value=-10**11, max_value=10**11),
+        st.floats(min_value=-1e9, max_value=1e9).map(lambda value: round(value, 2)),
+        st.text(max_size=12),
+    ))
+    def test_input_validation_matches_decimal_field(self, value):
+        """RupeesField accepts and renders exactly what DecimalField did"""
+        from rest_framework.exceptions import ValidationError
+        from items.money import RupeesField
+        decimal_field, rupees_field = self._decimal_field(), RupeesField()
+        try:
+            expected = decimal_field.to_representation(decimal_field.to_internal_value(value))
+        except ValidationError:
+            with pytest.raises(ValidationError):
+                rupees_field.to_internal_value(value)
+            return
+        # Integers have no negative zero; "-0.00" becomes "0.00"
+        assume(expected != '-0.00')
+
+        assert rupees_field.to_representation(rupees_field.to_internal_value(value)) == expected
+
+    def test_to_paise_rounds_to_nearest_paisa(self):
+        """Conversions from rupees never drift through binary floats"""
+        from decimal import Decimal
+        from items.money import format_paise, to_paise
+        assert to_paise(0.1 + 0.2) == 30
+        assert to_paise('120') == 12000
+        assert to_paise(Decimal('0.005')) == 1
+        assert format_paise(-5) == '-0.05'
+        assert format_paise(12000) == '120.00'
+
+@pytest.fixture
+def stores(db, item_with_inventory_and_skus, count_item_with_inventory):
+    """Three Mumbai outlets; Andheri has no Gulab Jamun"""
+    from items.models import Store, StoreStock
+    dadar = Store.objects.create(name='Dadar', latitude=19.0178, longitude=72.8478)
+    andheri = Store.objects.create(name='Andheri', latitude=19.1136, longitude=72.8697)
+    thane = Store.objects.create(name='Thane', latitude=19.2183, longitude=72.9781)
+    kaju, jamun = item_with_inventory_and_skus, count_item_with_inventory
+    StoreStock.objects.bulk_create([
+        StoreStock(store=dadar, item=kaju, inventory_qty=800),
+        StoreStock(store=dadar, item=jamun, inventory_qty=30),
+        StoreStock(store=andheri, item=kaju, inventory_qty=3000),
+        StoreStock(store=thane, item=kaju, inventory_qty=2000),
+        StoreStock(store=thane, item=jamun, inventory_qty=12),
+    ])
+    return dadar, andheri, thane
+
+
+@pytest.mark.django_db
+class TestStores:
+    """Per-store stock, store-scoped purchases and routing carts to stores"""
+
+    def _sku(self, code):
+        from items.models import SKU
+        return SKU.objects.get(code=code).id
+
+    def test_admin_can_create_store(self, admin_client):
+        response = admin_client.post(reverse('create-store'), {'name': 'Bandra', 'latitude': 19.06, 'longitude': 72.83}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['name'] == 'Bandra'
+
+    def test_customer_cannot_create_store(self, customer_client):
+        response = customer_client.post(reverse('create-store'), {'name': 'Bandra'}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_set_store_inventory(self, admin_client, stores, item_with_inventory_and_skus):
+        from items.models import Item
+        dadar = stores[0]
+        url = reverse('set-store-inventory', args=[dadar.id, item_with_inventory_and_skus.id])
+
+        response = admin_client.post(url, {'quantity': 1500}, format='json')
+
+        assert response.data['inventory_qty'] == 1500
+        assert response.data['store_id'] == dadar.id
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).inventory_qty == 5000
+
+    def test_store_item_detail(self, api_client, stores, count_item_with_inventory):
+        dadar, andheri, _ = stores
+
+        stocked = api_client.get(reverse('store-item-detail', args=[dadar.id, count_item_with_inventory.id]))
+        missing = api_client.get(reverse('store-item-detail', args=[andheri.id, count_item_with_inventory.id]))
+
+        assert (stocked.data['inventory_qty'], stocked.data['available_qty']) == (30, 30)
+        assert missing.data['inventory_qty'] == 0
+        assert [sku['code'] for sku in stocked.data['skus']] == ['GJ-1', 'GJ-6']
+
+    def test_store_purchase_uses_store_stock(self, customer_client, stores, item_with_inventory_and_skus):
+        from items.models import Item, Purchase, StoreStock
+        dadar = stores[0]
+        url = reverse('store-purchase', args=[dadar.id])
+
+        response = customer_client.post(url, {'sku_id': self._sku('KK-250'), 'quantity': 2}, format='json')
+        short = customer_client.post(url, {'sku_id': self._sku('KK-500'), 'quantity': 1}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['store'] == dadar.id
+        assert 'insufficient' in short.data['error'].lower()
+        assert StoreStock.objects.get(store=dadar, item=item_with_inventory_and_skus).inventory_qty == 300
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).inventory_qty == 5000
+        assert Purchase.objects.get().store_id == dadar.id
+
+    def test_store_purchase_without_stock_row(self, customer_client, stores):
+        andheri = stores[1]
+
+        response = customer_client.post(
+            reverse('store-purchase', args=[andheri.id]), {'sku_id': self._sku('GJ-1'), 'quantity': 1}, format='json'
+        )
+
+        assert 'out of stock' in response.data['error'].lower()
+
+    def test_availability_ranks_nearest_first(self, api_client, stores):
+        dadar, andheri, thane = stores
+        cart = {'items': [{'sku_id': self._sku('KK-500'), 'quantity': 2}], 'latitude': 19.20, 'longitude': 72.97}
+
+        response = api_client.post(reverse('store-availability'), cart, format='json')
+
+        # Dadar has 800 g, less than the 1 kg in the cart
+        assert [row['store_id'] for row in response.data['stores']] == [thane.id, andheri.id]
+        assert response.data['stores'][0]['distance_km'] < 3
+
+    def test_availability_needs_every_item(self, api_client, stores):
+        dadar, andheri, thane = stores
+        cart = {'items': [
+            {'sku_id': self._sku('KK-250'), 'quantity': 2},
+            {'sku_id': self._sku('GJ-6'), 'quantity': 1},
+            {'sku_id': self._sku('GJ-1'), 'quantity': 6},
+        ]}
+
+        response = api_client.post(reverse('store-availability'), cart, format='json')
+
+        # 12 Gulab Jamun at Thane covers the 6 + 6 pieces; Andheri has none
+        assert response.data['stores'] == [
+            {'store_id': dadar.id, 'name': 'Dadar', 'distance_km': None},
+            {'store_id': thane.id, 'name': 'Thane', 'distance_km': None},
+        ]
+
+    def test_availability_skips_inactive_stores(self, api_client, stores):
+        from items.models import Store
+        Store.objects.filter(name='Thane').update(is_active=False)
+        cart = {'items': [{'sku_id': self._sku('GJ-1'), 'quantity': 1}]}
+
+        response = api_client.post(reverse('store-availability'), cart, format='json')
+
+        assert [row['name'] for row in response.data['stores']] == ['Dadar']
+
+    def test_availability_validation(self, api_client, stores):
+        url = reverse('store-availability')
+
+        unknown = api_client.post(url, {'items': [{'sku_id': 999999, 'quantity': 1}]}, format='json')
+        half_location = api_client.post(url, {'items': [{'sku_id': self._sku('GJ-1'), 'quantity': 1}], 'latitude': 19.0}, format='json')
+        empty = api_client.post(url, {'items': []}, format='json')
+
+        assert unknown.status_code == half_location.status_code == empty.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_availability_at_scale_matches_per_store_check(self, db):
+        """200 stores with random stock: the grouped query agrees with checking each store"""
+        import random
+        from items.models import Item, Store, StoreStock
+        from items.stores import stores_with_stock
+        rng = random.Random(11)
+        Item.objects.bulk_create(Item(name=f'Sweet {i}', category='dry', sale_type='weight') for i in range(250))
+        Store.objects.bulk_create(Store(name=f'Store {i}') for i in range(200))
+        item_ids = list(Item.objects.values_list('id', flat=True))
+        store_ids = list(Store.objects.values_list('id', flat=True))
+        stock = {
+            (store_id, item_id): rng.randrange(0, 2000)
+            for store_id in store_ids for item_id in item_ids if rng.random() < 0.9
+        }
+        StoreStock.objects.bulk_create(
+            (StoreStock(store_id=store_id, item_id=item_id, inventory_qty=qty) for (store_id, item_id), qty in stock.items()),
+            batch_size=5000,
+        )
+
+        for _ in range(20):
+            needed = {item_id: rng.randrange(1, 1500) for item_id in rng.sample(item_ids, rng.randint(1, 4))}
+            expected = [
+                store_id for store_id in store_ids
+                if all(stock.get((store_id, item_id), 0) >= units for item_id, units in needed.items())
+            ]
+            assert sorted(stores_with_stock(needed)) == expected
+
+
+@pytest.mark.django_db
+class TestStockHolds:
+    """Cart holds reserve stock until they are bought, released or expire"""
+
+    def _hold(self, client, code, quantity):
+        from items.models import SKU
+        sku = SKU.objects.get(code=code)
+        return client.post(reverse('stock-holds'), {'sku_id': sku.id, 'quantity': quantity}, format='json')
+
+    def _expire(self, *hold_ids):
+        from datetime import timedelta
+        from django.utils import timezone
+        from items.models import StockHold
+        StockHold.objects.filter(pk__in=hold_ids).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_hold_reserves_stock(self, customer_client, item_with_inventory_and_skus):
+        response = self._hold(customer_client, 'KK-500', 2)
+        detail = customer_client.get(reverse('item-detail', args=[item_with_inventory_and_skus.id]))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['units'] == 1000
+        assert detail.data['inventory_qty'] == 5000
+        assert detail.data['available_qty'] == 4000
+
+    def test_held_stock_cannot_be_bought_by_others(self, customer_client, admin_user, item_with_inventory_and_skus):
+        from items.models import SKU
+        from items.purchasing import PurchaseRejected, purchase_sku
+        self._hold(customer_client, 'KK-500', 9)
+
+        with pytest.raises(PurchaseRejected, match='Insufficient'):
+            purchase_sku(admin_user, SKU.objects.get(code='KK-1000').id, 1)
+        purchase_sku(admin_user, SKU.objects.get(code='KK-250').id, 2)
+
+    def test_purchase_hold(self, customer_client, item_with_inventory_and_skus):
+        from items.models import Item, StockHold
+        hold_id = self._hold(customer_client, 'KK-500', 2).data['id']
+
+        response = customer_client.post(reverse('stock-hold-purchase', args=[hold_id]))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['total_price'] == '1800.00'
+        item = Item.objects.get(pk=item_with_inventory_and_skus.id)
+        assert (item.inventory_qty, item.held_qty) == (4000, 0)
+        assert not StockHold.objects.exists()
+
+    def test_expired_hold_cannot_be_bought(self, customer_client, item_with_inventory_and_skus):
+        from items.models import Item
+        hold_id = self._hold(customer_client, 'KK-500', 2).data['id']
+        self._expire(hold_id)
+
+        response = customer_client.post(reverse('stock-hold-purchase', args=[hold_id]))
+
+        assert response.data['error'] == 'Hold has expired'
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).inventory_qty == 5000
+
+    def test_short_sale_releases_expired_holds(self, customer_client, admin_user, item_with_inventory_and_skus):
+        from items.models import Item, SKU, StockHold
+        from items.purchasing import purchase_sku
+        self._expire(self._hold(customer_client, 'KK-1000', 3).data['id'])
+        self._hold(customer_client, 'KK-1000', 1)
+
+        purchase_sku(admin_user, SKU.objects.get(code='KK-1000').id, 4)
+
+        item = Item.objects.get(pk=item_with_inventory_and_skus.id)
+        assert (item.inventory_qty, item.held_qty) == (1000, 1000)
+        assert StockHold.objects.count() == 1
+
+    def test_release_holds_command(self, customer_client, item_with_inventory_and_skus):
+        from django.core.management import call_command
+        from items.models import Item, StockHold
+        expired = [self._hold(customer_client, 'KK-250', 1).data['id'] for _ in range(5)]
+        kept = self._hold(customer_client, 'KK-500', 1).data['id']
+        self._expire(*expired)
+
+        call_command('release_holds', batch=2)
+
+        assert list(StockHold.objects.values_list('id', flat=True)) == [kept]
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).held_qty == 500
+
+    def test_release_hold(self, customer_client, admin_user, item_with_inventory_and_skus):
+        from items.models import Item
+        from items.purchasing import release_hold
+        hold_id = self._hold(customer_client, 'KK-500', 2).data['id']
+
+        assert release_hold(admin_user, hold_id) is False
+        response = customer_client.delete(reverse('stock-hold-detail', args=[hold_id]))
+        missing = customer_client.delete(reverse('stock-hold-detail', args=[hold_id]))
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert Item.objects.get(pk=item_with_inventory_and_skus.id).held_qty == 0
+
+    def test_holds_are_logged_as_stock_changes(self, customer_client, item_with_inventory_and_skus):
+        """Placing, releasing and expiring holds reach tills through the change feed"""
+        from items.holds import release_expired
+        from items.sync import changes_since
+        item_id = item_with_inventory_and_skus.id
+
+        def available_after(cursor):
+            delta = changes_since(cursor)
+            return delta['cursor'], [(i.id, i.available_qty) for i in delta['items']]
+
+        cursor = changes_since(0)['cursor']
+        first = self._hold(customer_client, 'KK-500', 2).data['id']
+        second = self._hold(customer_client, 'KK-250', 2).data['id']
+        cursor, placed = available_after(cursor)
+        customer_client.delete(reverse('stock-hold-detail', args=[first]))
+        cursor, released = available_after(cursor)
+        self._expire(second)
+        release_expired()
+        cursor, expired = available_after(cursor)
+
+        assert placed == [(item_id, 3500)]
+        assert released == [(item_id, 4500)]
+        assert expired == [(item_id, 5000)]
+
+    def test_holds_per_user_are_limited(self, customer_client, item_with_inventory_and_skus, settings):
+        settings.STOCK_HOLDS_PER_USER = 2
+        self._hold(customer_client, 'KK-250', 1)
+        self._hold(customer_client, 'KK-250', 1)
+
+        response = self._hold(customer_client, 'KK-250', 1)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'too many' in response.data['error'].lower()
+
+    def test_hold_beyond_stock_is_rejected(self, customer_client, item_with_inventory_and_skus):
+        response = self._hold(customer_client, 'KK-1000', 6)
+
+        assert 'insufficient' in response.data['error'].lower()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentHolds:
+    """Holds, purchases and the expiry sweep racing on one item"""
+
+    def _run(self, funcs):
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connection
+
+        def call(func):
+            try:
+                return func()
+            except Exception as exc:
+                return exc
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(call, funcs))
+
+    def test_concurrent_holds_never_over_reserve(self, low_stock_item, customer_user):
+        from items.models import Item, SKU
+        from items.purchasing import create_hold
+        sku_id = SKU.objects.get(code='MP-1').id
+
+        results = self._run([lambda: create_hold(customer_user, sku_id, 1)] * 20)
+
+        assert sum(not isinstance(result, Exception) for result in results) == 14
+        item = Item.objects.get(pk=low_stock_item.id)
+        assert (item.inventory_qty, item.held_qty, item.available_qty) == (14, 14, 0)
+
+    def test_each_hold_is_bought_or_released_once(self, low_stock_item, customer_user, settings):
+        from datetime import timedelta
+        from django.utils import timezone
+        from items.holds import release_all_expired
+        from items.models import Item, SKU, StockHold
+        from items.purchasing import create_hold, purchase_hold
+        settings.STOCK_HOLDS_PER_USER = 20
+        sku_id = SKU.objects.get(code='MP-1').id
+        holds = [create_hold(customer_user, sku_id, 1).id for _ in range(12)]
+        StockHold.objects.filter(pk__in=holds[:6]).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        buys = [lambda hold_id=hold_id: purchase_hold(customer_user, hold_id) for hold_id in holds]
+        results = self._run(buys + [lambda: release_all_expired(batch=2)] * 3)
+
+        bought = [result for result in results[:12] if not isinstance(result, Exception)]
+        assert len(bought) == 6
+        assert not StockHold.objects.exists()
+        item = Item.objects.get(pk=low_stock_item.id)
+        assert (item.inventory_qty, item.held_qty) == (8, 0)
+
+
+@pytest.mark.django_db
+class TestAdmin:
+    """Admin changelists run a fixed number of queries however many rows they show"""
+
+    @pytest.fixture
+    def staff_client(self, db):
+        from django.test import Client
+        from accounts.models import User
+        client = Client()
+        client.force_login(User.objects.create_superuser(
+            username='root@test.com', email='root@test.com', name='Root', password='RootPass123!'
+        ))
+        return client
+
+    def _add_rows(self, n, offset=0):
+        from datetime import timedelta
+        from django.utils import timezone
+        from accounts.models import User
+        from items.models import Item, SKU, Store, StoreStock, Purchase, StockHold, LowStockAlert
+        from items.pricelists import create_price_list
+        for i in range(offset, offset + n):
+            user = User.objects.create_user(username=f'u{i}@test.com', email=f'u{i}@test.com', name=f'U{i}', password='x')
+            item = Item.objects.create(name=f'Sweet {i}', category='dry', sale_type='weight', inventory_qty=1000)
+            sku = SKU.objects.create(item=item, code=f'S-{i}', unit_value=250, price=45000)
+            store = Store.objects.create(name=f'Store {i}')
+            StoreStock.objects.create(store=store, item=item, inventory_qty=500)
+            Purchase.objects.create(user=user, sku=sku, store=store, quantity=1, total_price=45000)
+            StockHold.objects.create(
+                user=user, item=item, sku=sku, quantity=1, units=250, expires_at=timezone.now() + timedelta(minutes=5)
+            )
+            LowStockAlert.objects.create(item=item, inventory_qty=10, reorder_level=20)
+            create_price_list(f'List {i}', timezone.now(), {sku.id: 40000})
+
+    def _queries(self, client, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+        return [query['sql'] for query in context.captured_queries]
+
+    @pytest.mark.parametrize('model', ['item', 'sku', 'store', 'storestock', 'pricelist', 'purchase', 'stockhold', 'lowstockalert'])
+    def test_changelist_queries_do_not_grow_with_rows(self, staff_client, model):
+        url = reverse(f'admin:items_{model}_changelist')
+        self._add_rows(3)
+        few = self._queries(staff_client, url)
+        self._add_rows(30, offset=3)
+        many = self._queries(staff_client, url)
+
+        assert len(many) == len(few)
+
+    def test_purchase_changelist_never_counts_the_whole_table(self, staff_client):
+        self._add_rows(5)
+
+        queries = self._queries(staff_client, reverse('admin:items_purchase_changelist') + '?store__id__exact=1')
+
+        counts = [sql for sql in queries if 'COUNT(' in sql and 'items_purchase' in sql]
+        assert counts and all('LIMIT' in sql for sql in counts)
+
+    def test_search_and_filters(self, staff_client):
+        self._add_rows(3)
+        from items.models import Purchase
+        purchase = Purchase.objects.first()
+
+        by_id = staff_client.get(reverse('admin:items_purchase_changelist'), {'q': purchase.id})
+        by_text = staff_client.get(reverse('admin:items_purchase_changelist'), {'q': 'not-a-number'})
+        by_date = staff_client.get(reverse('admin:items_purchase_changelist'), {'created_at__gte': '2020-01-01 00:00:00+00:00'})
+        sku = staff_client.get(reverse('admin:items_sku_changelist'), {'q': 'Sweet 1'})
+
+        assert by_id.context['cl'].result_count == 1
+        assert by_text.status_code == 200
+        assert by_date.context['cl'].result_count == 3
+        assert sku.context['cl'].result_count == 1
+
+    def test_purchase_search_uses_exact_keys(self, staff_client):
+        """Ids and till client ids are looked up exactly; other terms match nothing"""
+        import uuid
+        from items.models import Purchase
+        self._add_rows(3)
+        purchase = Purchase.objects.last()
+        purchase.client_id = uuid.uuid4()
+        purchase.save()
+        url = reverse('admin:items_purchase_changelist')
+
+        by_client_id = staff_client.get(url, {'q': str(purchase.client_id)})
+        huge = staff_client.get(url, {'q': '9' * 30})
+        queries = self._queries(staff_client, f'{url}?q={purchase.id}')
+
+        assert list(by_client_id.context['cl'].result_list) == [purchase]
+        assert huge.context['cl'].result_count == 0
+        assert not [sql for sql in queries if 'items_purchase' in sql and ('LIKE' in sql or 'UPPER' in sql)]
+
+    def test_holds_are_released_not_edited(self, staff_client, customer_user):
+        """Holds cannot be added or edited here, and deleting them gives their stock back"""
+        from items.models import CatalogChange, Item, SKU, StockHold
+        from items.purchasing import create_hold
+        item = Item.objects.create(name='Kaju Katli', category='dry', sale_type='weight', inventory_qty=5000)
+        sku = SKU.objects.create(item=item, code='KK-250', unit_value=250, price=45000)
+        first, second, third = (create_hold(customer_user, sku.id, 1) for _ in range(3))
+        start = CatalogChange.objects.count()
+
+        add = staff_client.get(reverse('admin:items_stockhold_add'))
+        change = staff_client.post(reverse('admin:items_stockhold_change', args=[first.id]), {'quantity': 9})
+        staff_client.post(reverse('admin:items_stockhold_delete', args=[first.id]), {'post': 'yes'})
+        staff_client.post(reverse('admin:items_stockhold_changelist'), {
+            'action': 'delete_selected', '_selected_action': [second.id, third.id], 'post': 'yes',
+        })
+
+        assert add.status_code == change.status_code == 403
+        assert not StockHold.objects.exists()
+        assert Item.objects.get(pk=item.id).held_qty == 0
+        assert set(CatalogChange.objects.order_by('pk')[start:].values_list('kind', flat=True)) == {'stock'}
+
+    def test_prices_are_edited_in_rupees(self, staff_client):
+        """Admin forms show and take rupees while the database keeps paise"""
+        from items.models import Item, SKU, PriceList
+        item = Item.objects.create(name='Kaju Katli', category='dry', sale_type='weight')
+
+        response = staff_client.post(reverse('admin:items_sku_add'), {
+            'item': item.id, 'code': 'KK-250', 'unit_value': 250, 'price': '120', 'is_active': 'on',
+        })
+        assert response.status_code == 302
+        sku = SKU.objects.get(code='KK-250')
+        assert sku.price == 12000
+
+        change = staff_client.get(reverse('admin:items_sku_change', args=[sku.id]))
+        assert change.context['adminform'].form['price'].value() == '120.00'
+        assert b'value="120.00"' in change.content
+
+        response = staff_client.post(reverse('admin:items_pricelist_add'), {
+            'name': 'Diwali', 'effective_from_0': '2030-11-01', 'effective_from_1': '00:00:00',
+            'entries-TOTAL_FORMS': '1', 'entries-INITIAL_FORMS': '0',
+            'entries-0-sku': sku.id, 'entries-0-price': '99.50',
+        })
+        assert response.status_code == 302
+        assert PriceList.objects.get(name='Diwali').entries.get().price == 9950
+
+    def test_estimated_count_paginator(self, settings):
+        """Exact below the limit; past it an unfiltered table is estimated without a full count"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from config.admin_pagination import EstimatedCountPaginator
+        from items.models import Purchase
+        self._add_rows(6)
+        Purchase.objects.filter(pk=Purchase.objects.order_by('pk').first().pk).delete()
+        settings.ADMIN_EXACT_COUNT_LIMIT = 3
+
+        with CaptureQueriesContext(connection) as context:
+            estimated = EstimatedCountPaginator(Purchase.objects.order_by('-pk'), 2).count
+        exact = EstimatedCountPaginator(Purchase.objects.filter(quantity=1).order_by('-pk'), 2).count
+        settings.ADMIN_EXACT_COUNT_LIMIT = 100
+        below_limit = EstimatedCountPaginator(Purchase.objects.order_by('-pk'), 2).count
+
+        assert estimated == Purchase.objects.order_by('-pk').first().pk  # highest id, counts the deleted row
+        assert not any('COUNT(*)' in query['sql'] and 'LIMIT' not in query['sql'] for query in context.captured_queries)
+        assert exact == below_limit == 5
+
+
+LADDER = [(250, 45000), (500, 85000), (1000, 160000)]
+
+
+class TestWeightPricing:
+    """Price tables for loose weight sales, built from an item's packs"""
+
+    def test_rate_charges_pack_price_at_pack_sizes(self):
+        """An amount equal to a pack costs exactly that pack"""
+        from items.pricing import build_price_table
+        prices = build_price_table(LADDER, 2000)
+        assert [int(prices[grams]) for grams, _ in LADDER] == [price for _, price in LADDER]
+        assert prices[0] == 0
+
+    def test_rate_interpolates_between_packs(self):
+        """350 g sits 100/250 of the way from the 250 g to the 500 g pack"""
+        from items.pricing import build_price_table
+        prices = build_price_table(LADDER, 2000)
+        assert prices[350] == 45000 + 40000 * 100 // 250
+        assert prices[100] == 18000  # smallest pack's rate below it
+        assert prices[1500] == 240000  # largest pack's rate above it
+
+    def test_rate_rounds_half_up_to_the_paisa(self):
+        from items.pricing import build_price_table
+        prices = build_price_table([(2, 1), (3, 100)], 3)
+        assert prices[1] == 1  # 0.5 paise rounds up
+        assert build_price_table([(3, 100)], 2)[1] == 33  # 33.33 rounds down
+        assert build_price_table([(3, 100)], 2)[2] == 67  # 66.67 rounds up
+
+    def test_rounding_to_whole_rupees(self):
+        """WEIGHT_PRICE_ROUNDING rounds the final price half up to a multiple"""
+        from items.pricing import build_price_table
+        assert build_price_table(LADDER, 1000, rounding=100)[253] == 45500  # 454.80
+        assert build_price_table([(1000, 100100)], 1000, rounding=100)[500] == 50100  # 500.50
+        assert build_price_table(LADDER, 1000, rounding=100)[350] == 61000
+
+    def test_packs_mode_charges_cheapest_covering_packs(self):
+        from items.pricing import build_price_table
+        prices = build_price_table(LADDER, 2000, mode='packs')
+        assert prices[1] == 45000
+        assert prices[350] == 85000  # one 500 g pack beats two 250 g packs
+        assert prices[750] == 130000  # 500 g + 250 g beats 1 kg
+        assert prices[1250] == 205000
+
+    def test_unknown_mode_is_rejected(self):
+        from items.pricing import build_price_table
+        with pytest.raises(ValueError):
+            build_price_table(LADDER, 10, mode='cheapest')
+
+    @given(
+        ladder=st.dictionaries(st.integers(1, 400), st.integers(1, 10**6), min_size=1, max_size=5),
+        rounding=st.sampled_from([1, 50, 100]),
+    )
+    def test_tables_are_monotone_and_match_packs(self, ladder, rounding):
+        """More grams never cost less when bigger packs are cheaper per gram"""
+        from items.pricing import build_price_table, round_half_up
+        ladder = sorted(ladder.items())
+        rates = [price / grams for grams, price in ladder]
+        assume(all(a >= b for a, b in zip(rates, rates[1:])) and all(
+            a[1] <= b[1] for a, b in zip(ladder, ladder[1:])
+        ))
+        rate = build_price_table(ladder, 500, rounding=rounding)
+        packs = build_price_table(ladder, 500, mode='packs', rounding=rounding)
+
+        assert all(rate[1:] >= rate[:-1]) and all(packs[1:] >= packs[:-1])
+        for grams, price in ladder:
+            assert rate[grams] == round_half_up(price, rounding) * rounding
+            assert packs[grams] <= round_half_up(price, rounding) * rounding
+
+
+@pytest.mark.django_db
+class TestWeightSales:
+    """Selling weighed amounts off the scale"""
+
+    @pytest.fixture(autouse=True)
+    def empty_price_cache(self):
+        from items.pricing import _cache
+        _cache().clear()
+
+    @pytest.fixture
+    def ladder_item(self, item_with_inventory_and_skus):
+        from items.models import SKU
+        SKU.objects.filter(code='KK-500').update(price=85000)
+        SKU.objects.filter(code='KK-1000').update(price=160000)
+        return item_with_inventory_and_skus
+
+    def test_price_table_is_cached(self, ladder_item, django_assert_num_queries):
+        from items.pricing import price_weight
+        assert price_weight(ladder_item.id, 350) == 61000
+        with django_assert_num_queries(0):
+            assert price_weight(ladder_item.id, 1200) == 192000
+
+    def test_sku_change_invalidates_price_table(self, ladder_item):
+        from items.models import SKU
+        from items.pricing import price_weight
+        assert price_weight(ladder_item.id, 1000) == 160000
+        sku = SKU.objects.get(code='KK-1000')
+        sku.price = 150000
+        sku.save()
+        assert price_weight(ladder_item.id, 1000) == 150000
+        sku.delete()
+        assert price_weight(ladder_item.id, 1000) == 170000  # 500 g rate
+
+    def test_packs_mode(self, ladder_item, settings):
+        from items.pricing import price_weight
+        settings.WEIGHT_PRICING = 'packs'
+        assert price_weight(ladder_item.id, 750) == 130000
+
+    def test_weight_purchase(self, customer_client, ladder_item):
+        """Grams are deducted and recorded against the item's loose SKU"""
+        from items.models import Item, Purchase
+        url = reverse('purchase-weight')
+
+        response = customer_client.post(url, {'item_id': ladder_item.id, 'grams': 350}, format='json')
+        customer_client.post(url, {'item_id': ladder_item.id, 'grams': 1200}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['total_price'] == '610.00'
+        assert response.data['quantity'] == 350
+        assert Item.objects.get(pk=ladder_item.id).inventory_qty == 5000 - 1550
+        purchases = Purchase.objects.filter(sku__item=ladder_item)
+        assert {purchase.sku.code for purchase in purchases} == {f'LOOSE-{ladder_item.id}'}
+        assert sum(purchase.quantity * purchase.sku.unit_value for purchase in purchases) == 1550
+
+    def test_weight_sale_logs_only_stock(self, customer_client, ladder_item):
+        """A weighed sale moves stock only, so the cached item list stays fresh"""
+        from config.singleflight import _fresh
+        from items.catalog import ITEM_LIST_KEY, item_list, local_catalog
+        from items.models import CatalogChange
+        url = reverse('purchase-weight')
+        # The first sale creates the loose SKU, which is a catalog change of its own
+        customer_client.post(url, {'item_id': ladder_item.id, 'grams': 100}, format='json')
+        item_list()
+        start = CatalogChange.objects.count()
+
+        response = customer_client.post(url, {'item_id': ladder_item.id, 'grams': 250}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert list(CatalogChange.objects.order_by('pk')[start:].values_list('kind', flat=True)) == ['stock']
+        assert _fresh(local_catalog.get(ITEM_LIST_KEY))
+
+    def test_loose_sku_is_not_listed(self, customer_client, ladder_item):
+        customer_client.post(reverse('purchase-weight'), {'item_id': ladder_item.id, 'grams': 100}, format='json')
+
+        response = customer_client.get(reverse('item-detail', args=[ladder_item.id]))
+
+        assert [sku['code'] for sku in response.data['skus']] == ['KK-250', 'KK-500', 'KK-1000']
+
+    def test_weight_purchase_rejections(self, customer_client, ladder_item, count_item_with_inventory, settings):
+        url = reverse('purchase-weight')
+        settings.WEIGHT_SALE_MAX_GRAMS = 6000
+
+        not_weight = customer_client.post(url, {'item_id': count_item_with_inventory.id, 'grams': 100}, format='json')
+        too_much = customer_client.post(url, {'item_id': ladder_item.id, 'grams': 5001}, format='json')
+        too_big = customer_client.post(url, {'item_id': ladder_item.id, 'grams': 6001}, format='json')
+        zero = customer_client.post(url, {'item_id': ladder_item.id, 'grams': 0}, format='json')
+
+        assert not_weight.data['error'] == 'Item is not sold by weight'
+        assert 'insufficient' in too_much.data['error'].lower()
+        assert too_big.status_code == zero.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'grams' in too_big.data and 'grams' in zero.data
+
+    def test_weight_without_packs_is_rejected(self, customer_client, weight_item):
+        from items.models import Item
+        Item.objects.filter(pk=weight_item.id).update(inventory_qty=1000)
+
+        response = customer_client.post(reverse('purchase-weight'), {'item_id': weight_item.id, 'grams': 100}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Item.objects.get(pk=weight_item.id).inventory_qty == 1000
+
+    def test_price_quote(self, api_client, ladder_item, count_item_with_inventory):
+        url = reverse('weight-price', args=[ladder_item.id])
+
+        response = api_client.get(url, {'grams': 350})
+        count = api_client.get(reverse('weight-price', args=[count_item_with_inventory.id]), {'grams': 350})
+
+        assert response.data == {'item_id': ladder_item.id, 'grams': 350, 'price': '610.00'}
+        assert count.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestPriceLists:
+    """Scheduled price lists and the prices purchases record"""
+
+    @pytest.fixture
+    def switch(self):
+        from datetime import datetime, timezone
+        return datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+    @pytest.fixture
+    def festival(self, item_with_inventory_and_skus, switch):
+        """KK-250 at 400.00 from `switch`; the other packs keep their SKU price"""
+        from items.models import SKU
+        from items.pricelists import create_price_list
+        sku = SKU.objects.get(code='KK-250')
+        return create_price_list('Diwali', switch, {sku.id: 40000})
+
+    def test_create_price_list(self, admin_client, item_with_inventory_and_skus):
+        from items.models import SKU
+        sku = SKU.objects.get(code='KK-500')
+
+        response = admin_client.post(reverse('price-lists'), {
+            'name': 'Diwali',
+            'effective_from': '2099-11-01T00:00:00Z',
+            'entries': [{'sku_id': sku.id, 'price': '850.00'}],
+        }, format='json')
+        listed = admin_client.get(reverse('price-lists'))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['entries'] == [{'sku_id': sku.id, 'price': '850.00'}]
+        assert [row['name'] for row in listed.data] == ['Diwali']
+
+    def test_create_requires_admin(self, customer_client):
+        response = customer_client.post(reverse('price-lists'), {'name': 'x', 'entries': []}, format='json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize('body, field', [
+        ({'effective_from': '2020-01-01T00:00:00Z'}, 'effective_from'),
+        ({'entries': [{'sku_id': 999999, 'price': '10.00'}]}, 'entries'),
+        ({'entries': []}, 'entries'),
+        ({'duplicate': True}, 'entries'),
+    ])
+    def test_invalid_price_lists(self, admin_client, item_with_inventory_and_skus, body, field):
+        from items.models import SKU
+        sku = SKU.objects.get(code='KK-250')
+        data = {'name': 'Bad', 'entries': [{'sku_id': sku.id, 'price': '10.00'}]}
+        if body.pop('duplicate', False):
+            data['entries'] *= 2
+        data.update(body)
+
+        response = admin_client.post(reverse('price-lists'), data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert field in response.data
+
+    def test_switchover_instant(self, festival, switch):
+        """The list applies from effective_from exactly, and only to the SKUs it prices"""
+        from datetime import timedelta
+        from items.models import SKU
+        from items.pricelists import BASE, resolve_price
+        small, large = SKU.objects.get(code='KK-250'), SKU.objects.get(code='KK-500')
+        before = switch - timedelta(microseconds=1)
+
+        assert resolve_price(small, before) == (45000, BASE)
+        assert resolve_price(small, switch) == (40000, festival.id)
+        assert resolve_price(large, switch) == (90000, festival.id)
+
+    def test_later_list_replaces_earlier(self, festival, switch):
+        from datetime import timedelta
+        from items.models import SKU
+        from items.pricelists import create_price_list, resolve_price
+        sku = SKU.objects.get(code='KK-250')
+        after = create_price_list('After Diwali', switch + timedelta(days=5), {sku.id: 44000})
+
+        assert resolve_price(sku, switch + timedelta(days=4)) == (40000, festival.id)
+        assert resolve_price(sku, switch + timedelta(days=5)) == (44000, after.id)
+
+    def test_resolution_is_in_memory_once_warm(self, festival, switch, django_assert_num_queries):
+        from datetime import timedelta
+        from items.models import SKU
+        from items.pricelists import resolve_price
+        sku = SKU.objects.get(code='KK-250')
+        resolve_price(sku, switch)
+
+        with django_assert_num_queries(0):
+            for minute in range(-5, 5):
+                resolve_price(sku, switch + timedelta(minutes=minute))
+
+    def test_list_created_elsewhere_is_seen_after_refresh(self, item_with_inventory_and_skus, switch, settings):
+        """Without this process's signal the schedule is re-read every PRICE_LIST_SCHEDULE_SECONDS"""
+        from items.models import SKU, PriceList, PriceListEntry
+        from items.pricelists import BASE, current_version
+        sku = SKU.objects.get(code='KK-250')
+        assert current_version(switch) == BASE
+        price_list, = PriceList.objects.bulk_create([PriceList(name='Elsewhere', effective_from=switch)])
+        PriceListEntry.objects.bulk_create([PriceListEntry(price_list=price_list, sku=sku, price=1)])
+
+        assert current_version(switch) == BASE
+        settings.PRICE_LIST_SCHEDULE_SECONDS = 0
+        assert current_version(switch) == PriceList.objects.get().id
+
+    def test_purchase_records_price_list(self, customer_client, item_with_inventory_and_skus):
+        from django.utils import timezone
+        from items.models import SKU, Purchase
+        from items.pricelists import create_price_list
+        sku = SKU.objects.get(code='KK-250')
+        before = customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 2}, format='json')
+        price_list = create_price_list('Today', timezone.now(), {sku.id: 40000})
+
+        response = customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 2}, format='json')
+
+        assert before.data['price_list'] is None
+        assert before.data['total_price'] == '900.00'
+        assert response.data['price_list'] == price_list.id
+        assert response.data['total_price'] == '800.00'
+        assert Purchase.objects.get(pk=response.data['id']).price_list == price_list
+
+    def test_offline_sales_priced_at_sale_time(self, cashier_client, item_with_inventory_and_skus, settings):
+        """Offline lines keep the list and promotions of their sale time, which cannot predate the upload window"""
+        import uuid
+        from datetime import timedelta
+        from django.utils import timezone
+        from items.models import SKU, Purchase, Promotion
+        from items.pricelists import create_price_list
+        settings.OFFLINE_MAX_AGE_SECONDS = 4 * 3600
+        sku = SKU.objects.get(code='KK-250')
+        now = timezone.now()
+        old = create_price_list('Old', now - timedelta(hours=6), {sku.id: 5000})
+        sale = create_price_list('Sale', now - timedelta(hours=3), {sku.id: 10000})
+        regular = create_price_list('Regular', now - timedelta(hours=1), {sku.id: 20000})
+        promotion = Promotion.objects.create(name='Morning 50%', kind='category_discount', category='dry', percent=50,
+                                             starts_at=now - timedelta(hours=3), ends_at=now - timedelta(hours=1))
+        times = [now - timedelta(hours=5), now - timedelta(hours=2), now - timedelta(minutes=30)]
+        lines = [
+            {'client_id': str(uuid.uuid4()), 'sku_id': sku.id, 'quantity': 1, 'created_at': when.isoformat()}
+            for when in times
+        ]
+
+        response = cashier_client.post(reverse('purchase-batch'), {'purchases': lines}, format='json')
+
+        stale, morning, latest = response.data['results']
+        assert 'older' in stale['error']
+        assert not Purchase.objects.filter(price_list=old).exists()
+        priced = [Purchase.objects.get(pk=row['purchase_id']) for row in (morning, latest)]
+        assert [(p.total_price, p.price_list_id, p.promotion_id, p.created_at) for p in priced] == [
+            (5000, sale.id, promotion.id, times[1]), (20000, regular.id, None, times[2]),
+        ]
+
+    def test_item_detail_and_weight_prices_follow_the_list(self, api_client, item_with_inventory_and_skus):
+        from django.utils import timezone
+        from items.models import SKU
+        from items.pricelists import create_price_list
+        from items.pricing import price_weight
+        sku = SKU.objects.get(code='KK-250')
+        assert price_weight(item_with_inventory_and_skus.id, 250) == 45000
+        create_price_list('Today', timezone.now(), {sku.id: 40000})
+
+        response = api_client.get(reverse('item-detail', args=[item_with_inventory_and_skus.id]))
+
+        assert {row['code']: row['price'] for row in response.data['skus']}['KK-250'] == '400.00'
+        assert price_weight(item_with_inventory_and_skus.id, 250) == 40000
+
+
+@pytest.mark.django_db
+class TestPromotions:
+    """Promotion rules and their precedence"""
+
+    @pytest.fixture
+    def catalog(self, item_with_inventory_and_skus, count_item_with_inventory):
+        """Kaju Katli (dry, weight) and Gulab Jamun (milk, count)"""
+        return item_with_inventory_and_skus, count_item_with_inventory
+
+    def _rule(self, name, kind, **fields):
+        from items.models import Promotion
+        return Promotion.objects.create(name=name, kind=kind, **fields)
+
+    def _price(self, *lines, at=None):
+        from items.models import SKU
+        from items.promotions import price_cart
+        skus = dict(SKU.objects.values_list('code', 'id'))
+        return [(line['total_price'], line['promotion_id']) for line in
+                price_cart([(skus[code], quantity) for code, quantity in lines], at)]
+
+    def test_category_discount(self, catalog):
+        rule = self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+
+        assert self._price(('KK-250', 2), ('GJ-1', 2)) == [(81000, rule.id), (5000, None)]
+
+    def test_buy_x_get_y(self, catalog):
+        rule = self._rule('Buy 2 get 1', 'buy_x_get_y', item=catalog[1], buy_qty=2, free_qty=1)
+
+        assert self._price(('GJ-1', 2), ('GJ-1', 7), ('GJ-6', 3)) == [(5000, None), (12500, rule.id), (28000, rule.id)]
+
+    def test_weight_slabs(self, catalog):
+        rule = self._rule('Bulk kaju', 'weight_slabs', item=catalog[0], slabs=[[2000, 150000], [1000, 160000]])
+
+        assert self._price(('KK-500', 1), ('KK-1000', 1), ('KK-500', 4)) == [
+            (90000, None), (160000, rule.id), (300000, rule.id),
+        ]
+
+    def test_kinds_only_apply_to_their_sale_type(self, catalog):
+        """Rules on an item whose sale type changed no longer apply"""
+        from items.models import Item
+        self._rule('Buy 1 get 1', 'buy_x_get_y', item=catalog[1], buy_qty=1, free_qty=1)
+        Item.objects.filter(pk=catalog[1].pk).update(sale_type='weight')
+
+        assert self._price(('GJ-1', 2)) == [(5000, None)]
+
+    def test_higher_priority_wins_over_better_price(self, catalog):
+        self._rule('Dry 20%', 'category_discount', category='dry', percent=20)
+        slabs = self._rule('Kaju slab', 'weight_slabs', item=catalog[0], slabs=[[1000, 170000]], priority=1)
+
+        assert self._price(('KK-1000', 1)) == [(170000, slabs.id)]
+
+    def test_best_price_then_oldest_within_a_priority(self, catalog):
+        self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+        better = self._rule('Dry 20%', 'category_discount', category='dry', percent=20)
+        newer = self._rule('Dry 20% again', 'category_discount', category='dry', percent=20)
+
+        assert self._price(('KK-250', 1)) == [(36000, better.id)]
+        better.delete()
+        assert self._price(('KK-250', 1)) == [(36000, newer.id)]
+
+    def test_rule_that_saves_nothing_does_not_block_lower_priorities(self, catalog):
+        """A slab the line does not reach leaves the line to lower-priority rules"""
+        self._rule('Bulk kaju', 'weight_slabs', item=catalog[0], slabs=[[5000, 100000]], priority=5)
+        discount = self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+
+        assert self._price(('KK-250', 1)) == [(40500, discount.id)]
+
+    def test_inactive_and_out_of_window_rules_are_skipped(self, catalog):
+        from datetime import datetime, timezone
+        window = {'starts_at': datetime(2026, 11, 1, tzinfo=timezone.utc), 'ends_at': datetime(2026, 11, 5, tzinfo=timezone.utc)}
+        self._rule('Off', 'category_discount', category='dry', percent=50, is_active=False)
+        diwali = self._rule('Diwali', 'category_discount', category='dry', percent=10, **window)
+
+        assert self._price(('KK-250', 1), at=window['starts_at']) == [(40500, diwali.id)]
+        assert self._price(('KK-250', 1), at=window['ends_at']) == [(45000, None)]
+
+    def test_cart_is_priced_with_a_fixed_number_of_queries(self, catalog, api_client, django_assert_max_num_queries):
+        """Rules are compiled once; a cart costs the same queries whatever its length"""
+        from items.models import SKU
+        self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+        self._rule('Buy 2 get 1', 'buy_x_get_y', item=catalog[1], buy_qty=2, free_qty=1)
+        skus = list(SKU.objects.values_list('id', flat=True))
+        cart = [{'sku_id': skus[i % len(skus)], 'quantity': 1 + i % 5} for i in range(500)]
+        api_client.post(reverse('cart-price'), {'items': cart[:1]}, format='json')
+
+        with django_assert_max_num_queries(2):
+            response = api_client.post(reverse('cart-price'), {'items': cart}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['lines']) == 500
+
+    def test_rule_changes_recompile(self, catalog):
+        rule = self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+        assert self._price(('KK-250', 1)) == [(40500, rule.id)]
+
+        rule.percent = 20
+        rule.save()
+        assert self._price(('KK-250', 1)) == [(36000, rule.id)]
+        rule.delete()
+        assert self._price(('KK-250', 1)) == [(45000, None)]
+
+    def test_stacks_on_price_list(self, catalog):
+        from django.utils import timezone
+        from items.models import SKU
+        from items.pricelists import create_price_list
+        create_price_list('Today', timezone.now(), {SKU.objects.get(code='KK-250').id: 40000})
+        rule = self._rule('Dry 10%', 'category_discount', category='dry', percent=10)
+
+        assert self._price(('KK-250', 1)) == [(36000, rule.id)]
+
+    def test_cart_endpoint(self, catalog, api_client):
+        from items.models import SKU
+        self._rule('Buy 2 get 1', 'buy_x_get_y', item=catalog[1], buy_qty=2, free_qty=1)
+        gj = SKU.objects.get(code='GJ-1')
+
+        response = api_client.post(reverse('cart-price'), {'items': [{'sku_id': gj.id, 'quantity': 3}]}, format='json')
+        unknown = api_client.post(reverse('cart-price'), {'items': [{'sku_id': 999999, 'quantity': 1}]}, format='json')
+
+        assert response.data['base_price'] == '75.00'
+        assert response.data['total_price'] == '50.00'
+        assert response.data['lines'][0]['promotion'] is not None
+        assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_purchases_record_promotion(self, catalog, customer_client):
+        from items.models import SKU, Purchase
+        rule = self._rule('Buy 2 get 1', 'buy_x_get_y', item=catalog[1], buy_qty=2, free_qty=1)
+        slabs = self._rule('Kaju slab', 'weight_slabs', item=catalog[0], slabs=[[1000, 160000]])
+
+        response = customer_client.post(reverse('purchase'), {'sku_id': SKU.objects.get(code='GJ-1').id, 'quantity': 3}, format='json')
+        weighed = customer_client.post(reverse('purchase-weight'), {'item_id': catalog[0].id, 'grams': 1500}, format='json')
+
+        assert response.data['total_price'] == '50.00'
+        assert Purchase.objects.get(pk=response.data['id']).promotion == rule
+        assert weighed.data['total_price'] == '2400.00'
+        assert weighed.data['promotion'] == slabs.id
+
+    def test_create_promotion(self, admin_client, catalog):
+        response = admin_client.post(reverse('promotions'), {
+            'name': 'Bulk kaju', 'kind': 'weight_slabs', 'item': catalog[0].id,
+            'slabs': [{'min_grams': 2000, 'price_per_kg': '1500.00'}, {'min_grams': 1000, 'price_per_kg': '1600.00'}],
+        }, format='json')
+        deactivated = admin_client.patch(
+            reverse('promotion-detail', args=[response.data['id']]), {'is_active': False}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['slabs'] == [
+            {'min_grams': 1000, 'price_per_kg': '1600.00'}, {'min_grams': 2000, 'price_per_kg': '1500.00'},
+        ]
+        assert deactivated.data['is_active'] is False
+
+    @pytest.mark.parametrize('body, field', [
+        ({'kind': 'category_discount', 'category': 'dry'}, 'percent'),
+        ({'kind': 'category_discount', 'category': 'dry', 'percent': 101}, 'percent'),
+        ({'kind': 'buy_x_get_y', 'item': 'weight', 'buy_qty': 1, 'free_qty': 1}, 'item'),
+        ({'kind': 'weight_slabs', 'item': 'weight', 'slabs': []}, 'slabs'),
+        ({'kind': 'category_discount', 'category': 'dry', 'percent': 5,
+          'starts_at': '2026-11-05T00:00:00Z', 'ends_at': '2026-11-01T00:00:00Z'}, 'ends_at'),
+    ])
+    def test_invalid_promotions(self, admin_client, catalog, body, field):
+        if body.get('item') == 'weight':
+            body['item'] = catalog[0].id
+
+        response = admin_client.post(reverse('promotions'), {'name': 'Bad', **body}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert field in response.data
+
+    def test_promotions_require_admin(self, customer_client):
+        assert customer_client.get(reverse('promotions')).status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestCatalogChanges:
+    """Tests for the catalog change feed used by offline tills"""
+
+    def _sync(self, client, cursor=0, **params):
+        response = client.get(reverse('catalog-changes'), {'cursor': cursor, **params})
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def test_initial_sync_returns_catalog(self, api_client, item_with_skus):
+        """Cursor 0 returns every item and SKU"""
+        delta = self._sync(api_client)
+
+        assert [i['name'] for i in delta['items']] == ['Kaju Katli']
+        assert len(delta['skus']) == 4
+        assert delta['cursor'] > 0
+        assert delta['has_more'] is False
+
+    def test_delta_contains_only_changes(self, api_client, customer_client, item_with_inventory_and_skus, count_item_with_inventory):
+        """After a purchase only the item whose stock changed is returned"""
+        from items.models import SKU
+        cursor = self._sync(api_client)['cursor']
+        sku = SKU.objects.get(code='GJ-1')
+        customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 2}, format='json')
+
+        delta = self._sync(api_client, cursor)
+
+        assert [(i['name'], i['inventory_qty']) for i in delta['items']] == [('Gulab Jamun', 48)]
+        assert delta['skus'] == []
+        assert self._sync(api_client, delta['cursor'])['items'] == []
+
+    def test_deactivation_and_deletion(self, api_client, item_with_skus):
+        """Deactivated SKUs come back inactive; deleted ones as tombstones"""
+        from items.models import SKU
+        cursor = self._sync(api_client)['cursor']
+        first, second = SKU.objects.filter(is_active=True)[:2]
+        first.is_active = False
+        first.save()
+        second_id = second.id
+        second.delete()
+
+        delta = self._sync(api_client, cursor)
+
+        assert [(s['id'], s['is_active']) for s in delta['skus']] == [(first.id, False)]
+        assert delta['deleted_skus'] == [second_id]
+
+    def test_paginates_with_has_more(self, api_client, sample_items):
+        """Large deltas are split into pages"""
+        first = self._sync(api_client, limit=2)
+        second = self._sync(api_client, first['cursor'], limit=2)
+
+        assert first['has_more'] is True
+        assert len(first['items']) == 2
+        assert len(second['items']) == 2
+        assert second['has_more'] is False
+
+    def test_recent_gap_holds_cursor(self, settings, weight_item):
+        """A gap that an open transaction may still fill stops the page"""
+        from items.models import CatalogChange
+        from items.sync import changes_since
+        settings.SYNC_GAP_TIMEOUT = 60
+        cursor = changes_since(0)['cursor']
+        CatalogChange.objects.create(pk=cursor + 2, kind='item', object_id=weight_item.id)
+
+        assert changes_since(cursor)['cursor'] == cursor
+
+    def test_settled_gap_is_skipped(self, settings, weight_item):
+        """Old gaps come from rollbacks and are stepped over"""
+        from items.models import CatalogChange
+        from items.sync import changes_since
+        settings.SYNC_GAP_TIMEOUT = 0
+        cursor = changes_since(0)['cursor']
+        CatalogChange.objects.create(pk=cursor + 2, kind='item', object_id=weight_item.id)
+
+        assert changes_since(cursor)['cursor'] == cursor + 2
+
+    def test_compaction_keeps_latest_state(self, settings, api_client, weight_item):
+        """Compaction removes superseded entries without changing the delta"""
+        from django.core.management import call_command
+        from items.models import CatalogChange
+        settings.SYNC_GAP_TIMEOUT = 0
+        for qty in (10, 20, 30):
+            weight_item.inventory_qty = qty
+            weight_item.save()
+
+        call_command('compact_catalog_changes')
+
+        assert CatalogChange.objects.count() == 1
+        assert self._sync(api_client)['items'][0]['inventory_qty'] == 30
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogChangesConcurrency:
+    """Cursor correctness while writers are active"""
+
+    def test_replica_built_from_deltas_matches_catalog(self, weight_item, count_item):
+        """A till syncing during concurrent writes ends with the exact catalog"""
+        import threading
+        from django.db import connection
+        from django.db.models import Max
+        from items.models import Item, CatalogChange
+        from items.sync import changes_since
+
+        def writer(item_id):
+            try:
+                for qty in range(1, 41):
+                    item = Item.objects.get(pk=item_id)
+                    item.inventory_qty = qty
+                    item.save()
+            finally:
+                connection.close()
+
+        # Start from a full load, as a till does on first install
+        replica = dict(Item.objects.values_list('id', 'inventory_qty'))
+        cursor = CatalogChange.objects.aggregate(Max('pk'))['pk__max']
+
+        def pull():
+            nonlocal cursor
+            delta = changes_since(cursor)
+            for item in delta['items']:
+                replica[item.id] = item.inventory_qty
+            cursor = delta['cursor']
+
+        threads = [threading.Thread(target=writer, args=(pk,)) for pk in (weight_item.id, count_item.id)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            pull()
+        pull()
+
+        assert replica == dict(Item.objects.values_list('id', 'inventory_qty'))
+        assert replica[weight_item.id] == 40
+
+
+class TestProductionSettings:
+    """config.production and gunicorn.conf.py"""
+
+    def _settings(self, **env):
+        import subprocess
+        import sys
+        from django.conf import settings
+        code = ("import json; from config import production as p; "
+                "print(json.dumps([p.DEBUG, p.REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'], p.DATABASES['default']['CONN_MAX_AGE']]))")
+        return subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                              env={'PATH': '', **env})
+
+    def test_debug_off_and_json_only(self):
+        import json
+        result = self._settings(SECRET_KEY='a-real-secret', CONN_MAX_AGE='120')
+        assert json.loads(result.stdout) == [False, ['rest_framework.renderers.JSONRenderer'], 120]
+
+    def test_requires_a_secret_key(self):
+        result = self._settings()
+        assert result.returncode != 0
+        assert 'Set SECRET_KEY' in result.stderr
+
+    def test_gunicorn_worker_model(self, monkeypatch):
+        import runpy
+        from django.conf import settings
+        monkeypatch.setenv('WEB_CONCURRENCY', '3')
+        monkeypatch.setenv('GUNICORN_THREADS', '4')
+        config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        assert (config['workers'], config['threads'], config['worker_class']) == (3, 4, 'gthread')
+        assert config['preload_app'] is True
+        assert config['max_requests_jitter'] > 0
+
+        monkeypatch.delenv('WEB_CONCURRENCY')
+        monkeypatch.setenv('GUNICORN_THREADS', '1')
+        config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        assert config['worker_class'] == 'sync'
+        assert config['workers'] >= 3
+
+
+class TestStartup:
+    """Cold start import time (config.startup)"""
+
+    def test_cold_start_within_budget(self, settings):
+        from config.startup import LAZY_MODULES, profile
+        result = profile()
+        assert result['import_ms'] < settings.STARTUP_IMPORT_BUDGET_MS
+        assert not set(LAZY_MODULES) & result['modules']
+        assert 'items.views' in result['modules']
+        assert {name for name, _, _ in result['groups']} >= {'items', 'accounts', 'django', 'python'}
+
+    def test_group_of(self):
+        from config.startup import group_of
+        apps = ['django.contrib.admin', 'items', 'django']
+        assert group_of('django.contrib.admin.sites', apps) == 'django.contrib.admin'
+        assert group_of('django.db.models', apps) == 'django'
+        assert group_of('items', apps) == 'items'
+        assert group_of('itemsx', apps) == 'itemsx'
+        assert group_of('json.decoder', apps) == 'python'
+        assert group_of('numpy.core', apps) == 'numpy'
+
+    def test_command_fails_over_budget(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        out = StringIO()
+        call_command('profile_startup', '--setup-only', stdout=out)
+        assert 'Per app or package' in out.getvalue()
+        assert 'items.money' in out.getvalue()
+        with pytest.raises(CommandError, match='over the 1 ms budget'):
+            call_command('profile_startup', '--setup-only', '--budget', '1', stdout=StringIO())
+
+
+class TestCatalogCoherence:
+    """Process-local catalog caches following writes made by other processes"""
+
+    @pytest.fixture
+    def priced_item(self, item_with_inventory_and_skus):
+        from items.pricing import price_weight
+        assert price_weight(item_with_inventory_and_skus.id, 1000) == 180000
+        return item_with_inventory_and_skus
+
+    def _changed_elsewhere(self, sku):
+        """What another process's SKU save leaves behind here: a change log row, no local invalidation"""
+        from items.models import CatalogChange, SKU
+        from items.sync import record_changes
+        SKU.objects.filter(pk=sku.pk).update(price=170000)
+        record_changes(CatalogChange.Kind.SKU, [sku.pk])
+
+    def test_check_is_one_query(self, priced_item, django_assert_num_queries):
+        from items.coherence import check
+        with django_assert_num_queries(1):
+            assert check() == set()
+
+    def test_check_before_anything_is_cached_is_free(self, db, django_assert_num_queries):
+        from items.coherence import check
+        with django_assert_num_queries(0):
+            check()
+
+    def test_sku_change_elsewhere_drops_tables(self, priced_item):
+        from items.coherence import check
+        from items.models import SKU
+        from items.pricing import price_weight
+        self._changed_elsewhere(SKU.objects.get(code='KK-1000'))
+        assert price_weight(priced_item.id, 1000) == 180000
+        assert check() == {'sku'}
+        assert price_weight(priced_item.id, 1000) == 170000
+        assert check() == set()
+
+    def test_item_change_keeps_tables(self, priced_item, django_assert_num_queries):
+        from items.coherence import check
+        from items.pricing import price_weight
+        priced_item.inventory_qty = 10
+        priced_item.save()
+        assert check() == {'item'}
+        with django_assert_num_queries(0):
+            price_weight(priced_item.id, 1000)
+
+    def test_stock_change_keeps_caches_and_syncs_the_item(self, priced_item, django_assert_num_queries):
+        """Stock-only saves are logged as 'stock': no cache is touched, tills still get the item row"""
+        from items.coherence import check
+        from items.pricing import price_weight
+        from items.sync import changes_since
+        priced_item.inventory_qty = 10
+        priced_item.save(update_fields=['inventory_qty', 'updated_at'])
+
+        assert check() == {'stock'}
+        with django_assert_num_queries(0):
+            price_weight(priced_item.id, 1000)
+        delta = changes_since(0)
+        assert [item.inventory_qty for item in delta['items'] if item.pk == priced_item.pk] == [10]
+
+    def test_check_runs_its_query_outside_the_lock(self, priced_item):
+        """Request threads do not queue behind each other's version reads"""
+        import threading
+        from django.db import connection
+        from items import coherence
+        coherence.check()
+        done = []
+
+        def request():
+            try:
+                done.append(coherence.check())
+            finally:
+                connection.close()
+
+        with coherence._lock:
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join(5)
+        assert done == [set()]
+
+    def test_interval(self, priced_item, settings, django_assert_num_queries):
+        from items.coherence import check
+        settings.CATALOG_COHERENCE_SECONDS = 60
+        check()
+        with django_assert_num_queries(0):
+            check()
+
+    def test_change_past_a_gap_applies_once(self, priced_item):
+        from django.db.models import Max
+        from items import coherence
+        from items.models import CatalogChange
+        # Recent changes already read when the table was built are not applied again
+        assert coherence.check() == set()
+        cursor = CatalogChange.objects.aggregate(Max('pk'))['pk__max']
+        assert coherence._cursor == cursor
+        CatalogChange.objects.create(pk=cursor + 2, kind='sku', object_id=1)
+        assert coherence.check() == {'sku'}
+        assert coherence.check() == set()
+        assert coherence._cursor == cursor
+
+        CatalogChange.objects.create(pk=cursor + 1, kind='item', object_id=1)
+        assert coherence.check() == {'item'}
+        assert coherence._cursor == cursor + 2
+
+    def test_middleware_checks_each_request(self, api_client, priced_item):
+        from items.models import SKU
+        self._changed_elsewhere(SKU.objects.get(code='KK-1000'))
+        response = api_client.get(reverse('weight-price', args=[priced_item.id]), {'grams': 1000})
+        assert response.data['price'] == '1700.00'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCatalogCoherenceAcrossProcesses:
+    """A worker process sees another process's SKU change within CATALOG_COHERENCE_SECONDS"""
+
+    def test_staleness_bound(self, item_with_inventory_and_skus, settings):
+        import multiprocessing
+        import time
+        from django.db import connections
+        from items.coherence import check, reset_coherence
+        from items.models import SKU
+        from items.pricing import price_weight
+        settings.CATALOG_COHERENCE_SECONDS = 0.2
+        item_id = item_with_inventory_and_skus.id
+
+        def worker(pipe):
+            reset_coherence()
+            pipe.send(price_weight(item_id, 1000))
+            check()
+            pipe.recv()
+            start = time.monotonic()
+            stale = price_weight(item_id, 1000)
+            price = stale
+            while price == stale and time.monotonic() - start < 10:
+                time.sleep(0.01)
+                check()
+                price = price_weight(item_id, 1000)
+            pipe.send((stale, price, time.monotonic() - start))
+            connections.close_all()
+
+        connections.close_all()
+        parent, child = multiprocessing.get_context('fork').Pipe()
+        process = multiprocessing.get_context('fork').Process(target=worker, args=(child,))
+        process.start()
+        try:
+            assert parent.recv() == 180000
+            sku = SKU.objects.get(code='KK-1000')
+            sku.price = 170000
+            sku.save()
+            parent.send('saved')
+            stale, price, seen_after = parent.recv()
+        finally:
+            process.join(10)
+
+        # Served from the worker's own table until its next check
+        assert stale == 180000
+        assert price == 170000, f'still stale after {seen_after:.2f} s'
+        # The check interval, plus slack for a busy machine
+        assert seen_after < settings.CATALOG_COHERENCE_SECONDS + 2
+
+
+class TestSingleFlight:
+    """Dogpile protection for cached values (config.singleflight)"""
+
+    @pytest.fixture
+    def cache(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+        yield caches['default']
+        caches['default'].clear()
+
+    def _concurrently(self, func, count):
+        import threading
+        import time
+        barrier = threading.Barrier(count)
+        results, latencies = [None] * count, [None] * count
+
+        def call(index):
+            barrier.wait()
+            start = time.perf_counter()
+            try:
+                results[index] = func()
+            except Exception as exc:
+                results[index] = exc
+            latencies[index] = time.perf_counter() - start
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, sorted(latencies)
+
+    def _slow_counter(self, seconds=0.05):
+        import threading
+        import time
+        calls = []
+        lock = threading.Lock()
+
+        def compute():
+            with lock:
+                calls.append(1)
+            time.sleep(seconds)
+            return {'version': len(calls)}
+        return compute, calls
+
+    def test_concurrent_misses_compute_once(self, cache):
+        from config.singleflight import cached
+        compute, calls = self._slow_counter()
+        results, latencies = self._concurrently(lambda: cached(cache, 'k', compute, 30, 300, 10), 500)
+        assert len(calls) == 1
+        assert all(result == {'version': 1} for result in results)
+        # Waiters are released as soon as the one computation finishes
+        assert latencies[int(len(latencies) * 0.99)] < 2
+
+    def test_stale_value_served_while_one_refreshes(self, cache):
+        from config.singleflight import cached, expire
+        cache.set('k', ({'version': 0}, 0), 300)
+        expire(cache, 'k', 300)
+        compute, calls = self._slow_counter(0.2)
+        results, _ = self._concurrently(lambda: cached(cache, 'k', compute, 30, 300, 10), 50)
+        assert len(calls) == 1
+        assert results.count({'version': 1}) == 1
+        assert results.count({'version': 0}) == 49
+        assert cached(cache, 'k', compute, 30, 300, 10) == {'version': 1}
+
+    def test_waits_for_another_process_holding_the_lock(self, cache):
+        import threading
+        import time
+        from config.singleflight import cached
+        compute, calls = self._slow_counter(0)
+        cache.add('k:lock', 1, 10)
+        # The other process stores its value after 50 ms
+        threading.Timer(0.05, lambda: cache.set('k', ({'version': 'other'}, time.time() + 30), 330)).start()
+        assert cached(cache, 'k', compute, 30, 300, 10) == {'version': 'other'}
+        assert calls == []
+
+    def test_computes_when_the_lock_holder_is_gone(self, cache):
+        from config.singleflight import cached
+        compute, calls = self._slow_counter(0)
+        cache.add('k:lock', 1, 10)
+        assert cached(cache, 'k', compute, 30, 300, 0.1) == {'version': 1}
+        assert len(calls) == 1
+
+    def test_errors_reach_every_waiter(self, cache):
+        import time
+        from config.singleflight import cached
+
+        def fail():
+            time.sleep(0.05)
+            raise ValueError('boom')
+        results, _ = self._concurrently(lambda: cached(cache, 'k', fail, 30, 300, 10), 20)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert cache.get('k:lock') is None
+        assert cached(cache, 'k', lambda: 'ok', 30, 300, 10) == 'ok'
+
+
+class TestItemListCache:
+    """ListItemsView served from items.catalog"""
+
+    def test_list_is_cached(self, api_client, sample_items, django_assert_num_queries):
+        url = reverse('list-items')
+        first = api_client.get(url)
+        with django_assert_num_queries(1):  # the coherence check
+            assert api_client.get(url).data == first.data
+
+    def test_item_write_is_listed_next(self, api_client, sample_items):
+        from items.models import Item
+        url = reverse('list-items')
+        before = len(api_client.get(url).data)
+        Item.objects.create(name='Rasgulla', category='milk', sale_type='count', inventory_qty=10)
+        assert len(api_client.get(url).data) == before + 1
+
+    def test_sales_keep_list_cached(self, customer_client, count_item_with_inventory, customer_user):
+        """Sales only move stock, which the list does not carry, so they neither drop nor expire it"""
+        from django.db import transaction
+        from config.singleflight import _fresh
+        from items.catalog import ITEM_LIST_KEY, item_list, local_catalog
+        from items.coherence import check
+        from items.models import CatalogChange, Purchase, SKU
+        from items.purchasing import apply_purchases
+        item_list()
+        start = CatalogChange.objects.count()
+        sku = SKU.objects.get(code='GJ-6')
+        with transaction.atomic():
+            apply_purchases([Purchase(user=customer_user, sku=sku, quantity=1)])
+        customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+
+        assert check() == {'stock'}
+        assert _fresh(local_catalog.get(ITEM_LIST_KEY))
+        assert set(CatalogChange.objects.order_by('pk')[start:].values_list('kind', flat=True)) == {'stock'}
+
+    def test_item_change_elsewhere_marks_list_stale(self, sample_items):
+        """Another process's item write leaves the list here to be served stale while one request rebuilds it"""
+        from config.singleflight import _fresh
+        from items.catalog import ITEM_LIST_KEY, item_list, local_catalog
+        from items.coherence import check
+        from items.models import CatalogChange, Item
+        from items.sync import record_changes
+        before = item_list()
+        item = sample_items[0]
+        Item.objects.filter(pk=item.pk).update(name='Renamed')
+        record_changes(CatalogChange.Kind.ITEM, [item.pk])
+
+        assert check() == {'item'}
+        assert local_catalog.get(ITEM_LIST_KEY)[0] == before
+        assert not _fresh(local_catalog.get(ITEM_LIST_KEY))
+        assert 'Renamed' in [row['name'] for row in item_list()]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_misses_rebuild_once(self, sample_items):
+        import threading
+        from django.db import connection
+        from items import catalog
+        builds = []
+        build = catalog.build_item_list
+
+        def counted():
+            builds.append(1)
+            return build()
+        catalog.build_item_list = counted
+        barrier = threading.Barrier(100)
+        results = []
+
+        def request():
+            barrier.wait()
+            try:
+                results.append(catalog.item_list())
+            finally:
+                connection.close()
+        try:
+            threads = [threading.Thread(target=request) for _ in range(100)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            catalog.build_item_list = build
+
+        assert len(builds) == 1
+        assert len(results) == 100 and all(result == results[0] for result in results)
+        assert len(results[0]) == len([item for item in sample_items if item.is_active])
@@ -1,11 +1,33 @@
 from django.urls import path
-from .views import CreateItemView, ListItemsView, CreateSKUView, ItemDetailView, SetInventoryView, PurchaseView
+from .views import CreateItemView, CreateStoreView, ListStoresView, StoreAvailabilityView, StoreItemDetailView, SetStoreInventoryView, StorePurchaseView, ListItemsView, SearchItemsView, CatalogChangesView, CreateSKUView, PriceListView, PromotionView, PromotionDetailView, CartPriceView, ItemDetailView, SetInventoryView, LowStockView, SalesReportView, ItemSalesReportView, ProductionPlanView, PurchaseView, StockHoldView, StockHoldDetailView, StockHoldPurchaseView, WeightPurchaseView, WeightPriceView, OfflinePurchaseBatchView
 
 urlpatterns = [
     path('', CreateItemView.as_view(), name='create-item'),
     path('list', ListItemsView.as_view(), name='list-items'),
+    path('search', SearchItemsView.as_view(), name='search-items'),
+    path('changes', CatalogChangesView.as_view(), name='catalog-changes'),
     path('skus', CreateSKUView.as_view(), name='create-sku'),
+    path('price-lists', PriceListView.as_view(), name='price-lists'),
+    path('promotions', PromotionView.as_view(), name='promotions'),
+    path('promotions/<int:pk>', PromotionDetailView.as_view(), name='promotion-detail'),
+    path('cart/price', CartPriceView.as_view(), name='cart-price'),
     path('purchase', PurchaseView.as_view(), name='purchase'),
+    path('holds', StockHoldView.as_view(), name='stock-holds'),
+    path('holds/<int:pk>', StockHoldDetailView.as_view(), name='stock-hold-detail'),
+    path('holds/<int:pk>/purchase', StockHoldPurchaseView.as_view(), name='stock-hold-purchase'),
+    path('purchase/weight', WeightPurchaseView.as_view(), name='purchase-weight'),
+    path('purchase/batch', OfflinePurchaseBatchView.as_view(), name='purchase-batch'),
+    path('stores', CreateStoreView.as_view(), name='create-store'),
+    path('stores/list', ListStoresView.as_view(), name='list-stores'),
+    path('stores/availability', StoreAvailabilityView.as_view(), name='store-availability'),
+    path('stores/<int:store_id>/purchase', StorePurchaseView.as_view(), name='store-purchase'),
+    path('stores/<int:store_id>/<int:pk>', StoreItemDetailView.as_view(), name='store-item-detail'),
+    path('stores/<int:store_id>/<int:pk>/inventory', SetStoreInventoryView.as_view(), name='set-store-inventory'),
+    path('low-stock', LowStockView.as_view(), name='low-stock'),
+    path('reports/sales', SalesReportView.as_view(), name='sales-report'),
+    path('reports/items', ItemSalesReportView.as_view(), name='item-sales-report'),
+    path('production', ProductionPlanView.as_view(), name='production-plan'),
     path('<int:pk>', ItemDetailView.as_view(), name='item-detail'),
+    path('<int:pk>/price', WeightPriceView.as_view(), name='weight-price'),
     path('<int:pk>/inventory', SetInventoryView.as_view(), name='set-inventory'),
 ]
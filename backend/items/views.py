@@ -1,12 +1,26 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db import transaction
-from accounts.views import IsAdminUser
-from .serializers import ItemSerializer, SKUSerializer, ItemDetailSerializer, InventorySerializer, PurchaseCreateSerializer, PurchaseResponseSerializer
-from .models import Item, SKU, Purchase
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from accounts.views import IsAdminUser, IsStaffUser
+from accounts.throttling import PurchaseIPThrottle, PurchaseUserThrottle
+from .serializers import ItemSerializer, SKUSerializer, ItemDetailSerializer, StoreSerializer, StoreItemDetailSerializer, StoreAvailabilityQuerySerializer, StoreAvailabilityRowSerializer, PriceListSerializer, PromotionSerializer, CartPriceQuerySerializer, CartLineSerializer, InventorySerializer, LowStockItemSerializer, SearchQuerySerializer, SyncQuerySerializer, SyncItemSerializer, SyncSKUSerializer, SalesReportQuerySerializer, SalesReportRowSerializer, ItemSalesReportRowSerializer, ProductionPlanQuerySerializer, ProductionPlanRowSerializer, PurchaseCreateSerializer, StockHoldSerializer, WeightSerializer, WeightPurchaseSerializer, WeightPriceSerializer, OfflinePurchaseBatchSerializer, PurchaseResponseSerializer
+from .models import Item, SKU, PriceList, Promotion, Store, StoreStock
+from .alerts import record_stock_change
+from .catalog import item_list
+from .money import format_paise
+from .pricing import price_weight
+from .promotions import price_cart
+from .purchasing import PurchaseRejected, create_hold, purchase_hold, purchase_sku, purchase_sku_grouped, purchase_store_sku, purchase_weight, release_hold, upload_offline_purchases
+from .search import search_items
+from .stores import cart_units, rank_stores
+from .sync import changes_since
 
 
 class CreateItemView(APIView):
@@ -28,9 +42,41 @@ class ListItemsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        items = Item.objects.filter(is_active=True)
-        serializer = ItemSerializer(items, many=True)
-        return Response(serializer.data)
+        return Response(item_list())
+
+
+class SearchItemsView(APIView):
+    """Search active items by name or SKU code - public access"""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        items = search_items(
+            params['q'],
+            category=params.get('category'),
+            sale_type=params.get('sale_type'),
+            limit=params['limit'],
+        )
+        return Response(ItemSerializer(items, many=True).data)
+
+
+class CatalogChangesView(APIView):
+    """Item/SKU changes since a catalog version - public access"""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        serializer = SyncQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        delta = changes_since(serializer.validated_data['cursor'], serializer.validated_data['limit'])
+        delta['items'] = SyncItemSerializer(delta['items'], many=True).data
+        delta['skus'] = SyncSKUSerializer(delta['skus'], many=True).data
+        return Response(delta)
 
 
 class CreateSKUView(APIView):
@@ -46,6 +92,77 @@ class CreateSKUView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PriceListView(APIView):
+    """Schedule a price list, or list them newest first - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        price_lists = PriceList.objects.order_by('-effective_from').prefetch_related('entries')
+        return Response(PriceListSerializer(price_lists, many=True).data)
+
+    def post(self, request):
+        serializer = PriceListSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PromotionView(APIView):
+    """Create a promotion, or list them by precedence - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        promotions = Promotion.objects.order_by('-is_active', '-priority', 'id')
+        return Response(PromotionSerializer(promotions, many=True).data)
+
+    def post(self, request):
+        serializer = PromotionSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PromotionDetailView(APIView):
+    """Change or delete a promotion - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def patch(self, request, pk):
+        serializer = PromotionSerializer(get_object_or_404(Promotion, pk=pk), data=request.data, partial=True)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def delete(self, request, pk):
+        get_object_or_404(Promotion, pk=pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartPriceView(APIView):
+    """Price a cart with the price list and promotions in effect - public access"""
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = CartPriceQuerySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            lines = price_cart([(line['sku_id'], line['quantity']) for line in serializer.validated_data['items']])
+        except SKU.DoesNotExist as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'lines': CartLineSerializer(lines, many=True).data,
+            'base_price': format_paise(sum(line['base_price'] for line in lines)),
+            'total_price': format_paise(sum(line['total_price'] for line in lines)),
+        })
+
+
 class ItemDetailView(APIView):
     """Get item details with SKUs - public access"""
 
@@ -57,27 +174,209 @@ class ItemDetailView(APIView):
         return Response(serializer.data)
 
 
+class WeightPriceView(APIView):
+    """Price of a weighed amount of an item, for the counter display - public access"""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        item = get_object_or_404(Item, pk=pk, is_active=True, sale_type=Item.SaleType.WEIGHT)
+        serializer = WeightSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        grams = serializer.validated_data['grams']
+        price = price_weight(item.pk, grams)
+        if price is None:
+            return Response({'error': 'Item has no price for this weight'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(WeightPriceSerializer({'item_id': item.pk, 'grams': grams, 'price': price}).data)
+
+
 class SetInventoryView(APIView):
     """Set inventory quantity for an item - admin only"""
 
     permission_classes = [IsAuthenticated, IsAdminUser]
 
+    @transaction.atomic
     def post(self, request, pk):
-        item = get_object_or_404(Item, pk=pk)
+        item = get_object_or_404(Item.objects.select_for_update(), pk=pk)
         serializer = InventorySerializer(data=request.data)
         if serializer.is_valid():
+            previous_qty = item.inventory_qty
             item.inventory_qty = serializer.validated_data['quantity']
+            item.reorder_level = serializer.validated_data.get('reorder_level', item.reorder_level)
             item.save()
+            record_stock_change(item, previous_qty)
             return Response(ItemDetailSerializer(item).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CreateStoreView(APIView):
+    """Create store - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request):
+        serializer = StoreSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ListStoresView(APIView):
+    """List active stores - public access"""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        stores = Store.objects.filter(is_active=True).order_by('name')
+        return Response(StoreSerializer(stores, many=True).data)
+
+
+class StoreItemDetailView(APIView):
+    """Get item details with one store's stock - public access"""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, store_id, pk):
+        store = get_object_or_404(Store, pk=store_id, is_active=True)
+        item = get_object_or_404(Item, pk=pk, is_active=True)
+        stock = StoreStock.objects.filter(store=store, item=item).values_list('inventory_qty', flat=True).first()
+        serializer = StoreItemDetailSerializer(item, context={'store': store, 'inventory_qty': stock or 0})
+        return Response(serializer.data)
+
+
+class SetStoreInventoryView(APIView):
+    """Set inventory quantity for an item at one store - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @transaction.atomic
+    def post(self, request, store_id, pk):
+        store = get_object_or_404(Store, pk=store_id)
+        item = get_object_or_404(Item, pk=pk)
+        serializer = InventorySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stock, _ = StoreStock.objects.select_for_update().get_or_create(store=store, item=item)
+        stock.inventory_qty = serializer.validated_data['quantity']
+        stock.save()
+        return Response(StoreItemDetailSerializer(item, context={'store': store, 'inventory_qty': stock.inventory_qty}).data)
+
+
+class StoreAvailabilityView(APIView):
+    """Stores that can fill a whole cart, nearest first - public access"""
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = StoreAvailabilityQuerySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        try:
+            needed = cart_units([(line['sku_id'], line['quantity']) for line in data['items']])
+        except SKU.DoesNotExist as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        rows = rank_stores(needed, data.get('latitude'), data.get('longitude'))
+        return Response({'stores': StoreAvailabilityRowSerializer(rows, many=True).data})
+
+
+class LowStockView(APIView):
+    """List active items below their reorder level - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        # Same predicate as the partial index item_low_stock_idx
+        items = Item.objects.filter(
+            is_active=True, reorder_level__gt=0, inventory_qty__lt=F('reorder_level')
+        ).order_by('inventory_qty')
+        return Response(LowStockItemSerializer(items, many=True).data)
+
+
+def _report_range(start, end):
+    """UTC datetimes covering the inclusive date range of a report"""
+    return (
+        datetime.combine(start, time.min, tzinfo=dt_timezone.utc),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=dt_timezone.utc),
+    )
+
+
+class SalesReportView(APIView):
+    """Daily sales per SKU, including archived months - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        serializer = SalesReportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start = serializer.validated_data['start']
+        end = serializer.validated_data['end']
+        from .reports import sales_by_day
+        rows = sales_by_day(*_report_range(start, end))
+        return Response({
+            'start': start,
+            'end': end,
+            'rows': SalesReportRowSerializer(rows, many=True).data,
+        })
+
+
+class ItemSalesReportView(APIView):
+    """Units (grams or pieces) and revenue per item, including archived months - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        serializer = SalesReportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start = serializer.validated_data['start']
+        end = serializer.validated_data['end']
+        from .reports import sales_by_item
+        rows = sales_by_item(*_report_range(start, end))
+        items = Item.objects.in_bulk([row['item_id'] for row in rows])
+        for row in rows:
+            row['name'] = items[row['item_id']].name
+            row['sale_type'] = items[row['item_id']].sale_type
+        return Response({
+            'start': start,
+            'end': end,
+            'rows': ItemSalesReportRowSerializer(rows, many=True).data,
+        })
+
+
+class ProductionPlanView(APIView):
+    """Suggested production per item for a day, tomorrow by default - admin only"""
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        serializer = ProductionPlanQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        day = serializer.validated_data.get('date') or datetime.now(dt_timezone.utc).date() + timedelta(days=1)
+        from .forecasting import suggest_production
+        rows = suggest_production(day, serializer.validated_data.get('category'))
+        return Response({
+            'date': day,
+            'rows': ProductionPlanRowSerializer(rows, many=True).data,
+        })
+
+
 class PurchaseView(APIView):
     """Purchase a SKU - authenticated users only"""
 
     permission_classes = [IsAuthenticated]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
 
-    @transaction.atomic
     def post(self, request):
         serializer = PurchaseCreateSerializer(data=request.data)
         if not serializer.is_valid():
@@ -86,42 +385,132 @@ class PurchaseView(APIView):
         sku_id = serializer.validated_data['sku_id']
         quantity = serializer.validated_data['quantity']
 
-        # Get SKU (must be active)
-        sku = get_object_or_404(SKU, pk=sku_id, is_active=True)
-        item = sku.item
+        # Group commit shares one transaction between concurrent purchases
+        buy = purchase_sku_grouped if settings.PURCHASE_GROUP_COMMIT else purchase_sku
+        try:
+            purchase = buy(request.user, sku_id, quantity)
+        except PurchaseRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calculate total inventory needed
-        total_needed = sku.unit_value * quantity
+        return Response(
+            PurchaseResponseSerializer(purchase).data,
+            status=status.HTTP_201_CREATED
+        )
 
-        # Check inventory
-        if item.inventory_qty == 0:
-            return Response(
-                {'error': 'Item is out of stock'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        if item.inventory_qty < total_needed:
-            return Response(
-                {'error': 'Insufficient inventory available'},
-                status=status.HTTP_400_BAD_REQUEST
+class StorePurchaseView(APIView):
+    """Purchase a SKU from one store's stock - authenticated users only"""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
+
+    def post(self, request, store_id):
+        serializer = PurchaseCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            purchase = purchase_store_sku(
+                request.user, store_id, serializer.validated_data['sku_id'], serializer.validated_data['quantity']
             )
+        except PurchaseRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            PurchaseResponseSerializer(purchase).data,
+            status=status.HTTP_201_CREATED
+        )
+
+
+class StockHoldView(APIView):
+    """Hold stock of a SKU for the customer's cart - authenticated users only"""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
+
+    def post(self, request):
+        serializer = PurchaseCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            hold = create_hold(request.user, serializer.validated_data['sku_id'], serializer.validated_data['quantity'])
+        except PurchaseRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(StockHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+
+class StockHoldDetailView(APIView):
+    """Release one of the customer's holds - authenticated users only"""
+
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, pk):
+        if not release_hold(request.user, pk):
+            return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-        # Calculate total price
-        total_price = sku.price * quantity
 
-        # Deduct inventory
-        item.inventory_qty -= total_needed
-        item.save()
+class StockHoldPurchaseView(APIView):
+    """Buy what a hold reserved - authenticated users only"""
 
-        # Create purchase record
-        purchase = Purchase.objects.create(
-            user=request.user,
-            sku=sku,
-            quantity=quantity,
-            total_price=total_price
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
+
+    def post(self, request, pk):
+        try:
+            purchase = purchase_hold(request.user, pk)
+        except PurchaseRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            PurchaseResponseSerializer(purchase).data,
+            status=status.HTTP_201_CREATED
         )
 
+
+class WeightPurchaseView(APIView):
+    """Sell a weighed amount of a weight item - authenticated users only"""
+
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
+
+    def post(self, request):
+        serializer = WeightPurchaseSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            purchase = purchase_weight(
+                request.user, serializer.validated_data['item_id'], serializer.validated_data['grams']
+            )
+        except PurchaseRejected as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response(
             PurchaseResponseSerializer(purchase).data,
             status=status.HTTP_201_CREATED
         )
+
+
+class OfflinePurchaseBatchView(APIView):
+    """Upload sales made while a till was offline - cashiers and admins only.
+
+    Safe to retry: lines already uploaded come back as duplicates instead of
+    being charged twice.
+    """
+
+    permission_classes = [IsAuthenticated, IsStaffUser]
+    throttle_classes = [PurchaseIPThrottle, PurchaseUserThrottle]
+
+    def post(self, request):
+        serializer = OfflinePurchaseBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = upload_offline_purchases(request.user, serializer.validated_data['purchases'])
+        except IntegrityError:
+            # Another upload of the same lines committed first; a retry reports duplicates
+            return Response({'error': 'Batch is being uploaded concurrently, retry'}, status=status.HTTP_409_CONFLICT)
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_at', 'updated_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    ordering = ['run_after']
+    date_hierarchy = 'created_at'
+    readonly_fields = ['attempts', 'locked_at', 'last_error', 'created_at', 'updated_at']
+    actions = ['retry']
+
+    @admin.action(description='Retry selected tasks now')
+    def retry(self, request, queryset):
+        """Queue failed (or waiting) tasks to run on the next worker poll with a fresh attempt budget"""
+        count = queryset.exclude(status=Task.Status.RUNNING).update(
+            status=Task.Status.PENDING, attempts=0, run_after=timezone.now(), locked_at=None,
+        )
+        self.message_user(request, f'{count} task(s) queued to retry.')
@@ -0,0 +1,47 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from taskqueue.queue import run_pending, work
+
+
+def _worker_main(poll_interval):
+    import django
+    django.setup()
+    connections.close_all()
+    work(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers against the database queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = run_pending()
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} task(s)'))
+            return
+
+        if options['processes'] == 1:
+            work(options['poll_interval'])
+            return
+
+        # Children must not inherit the parent's database connection
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_main, args=(options['poll_interval'],), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,140 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from config.db_routing import pinned_to_primary
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=3):
+    """Register a function as a background task.
+
+    The task is addressed by its dotted path and gains an ``enqueue(**kwargs)``
+    helper. Keyword arguments must be JSON serializable.
+    """
+    def register(f):
+        name = f'{f.__module__}.{f.__qualname__}'
+        f.task_name = name
+        f.max_attempts = max_attempts
+        f.enqueue = lambda **kwargs: enqueue(name, **kwargs)
+        _registry[name] = f
+        return f
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def get_task(name):
+    """Return the task function for a dotted name, importing its module if needed"""
+    if name not in _registry:
+        module, _, _ = name.rpartition('.')
+        import_module(module)
+    return _registry[name]
+
+
+def enqueue(name, **kwargs):
+    """Queue a task once the current transaction commits.
+
+    Outside a transaction the task is queued immediately. If the transaction
+    rolls back, nothing is queued.
+    """
+    enqueue_many([(name, kwargs)])
+
+
+def enqueue_many(tasks):
+    """Queue (name, kwargs) pairs like enqueue, inserting them all with one query"""
+    tasks = list(tasks)
+    if tasks:
+        transaction.on_commit(lambda: _submit(tasks))
+
+
+def _submit(tasks):
+    funcs = [(get_task(name), kwargs) for name, kwargs in tasks]
+    if settings.TASKS_EAGER:
+        for func, kwargs in funcs:
+            func(**kwargs)
+        return
+    Task.objects.bulk_create(
+        Task(name=func.task_name, kwargs=kwargs, max_attempts=func.max_attempts) for func, kwargs in funcs
+    )
+
+
+def _ready(now):
+    stale = now - timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+    return (
+        Q(status=Task.Status.PENDING, run_after__lte=now)
+        | Q(status=Task.Status.RUNNING, locked_at__lt=stale)
+    )
+
+
+def claim_next():
+    """Atomically take the next runnable task, or return None.
+
+    Claiming is a conditional UPDATE, so concurrent workers never run the same
+    task and no backend-specific row locking is needed. Tasks whose worker
+    died are reclaimed once their lease expires. Every read goes to the
+    primary: a replica may not have the task yet, or still show it unclaimed.
+    """
+    now = timezone.now()
+    ready = _ready(now)
+    with pinned_to_primary(True):
+        candidates = Task.objects.filter(ready).order_by('run_after').values_list('pk', flat=True)[:10]
+        for pk in candidates:
+            claimed = Task.objects.filter(ready, pk=pk).update(
+                status=Task.Status.RUNNING,
+                locked_at=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(queued):
+    """Run a claimed task; delete it on success, reschedule or fail it on error"""
+    try:
+        get_task(queued.name)(**queued.kwargs)
+    except Exception:
+        queued.last_error = traceback.format_exc()
+        if queued.attempts >= queued.max_attempts:
+            queued.status = Task.Status.FAILED
+            logger.error('Task %s failed after %s attempts', queued.name, queued.attempts)
+        else:
+            queued.status = Task.Status.PENDING
+            queued.run_after = timezone.now() + timedelta(seconds=settings.TASKS_RETRY_DELAY * 2 ** (queued.attempts - 1))
+        queued.locked_at = None
+        queued.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+        return False
+    queued.delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Run runnable tasks until the queue is drained; return the number run"""
+    count = 0
+    while limit is None or count < limit:
+        queued = claim_next()
+        if queued is None:
+            break
+        run_task(queued)
+        count += 1
+    return count
+
+
+def work(poll_interval=1.0, should_stop=lambda: False):
+    """Worker loop: run tasks as they become available, sleeping when idle"""
+    while not should_stop():
+        if not run_pending(limit=100):
+            time.sleep(poll_interval)
@@ -0,0 +1,228 @@
+from datetime import timedelta
+
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from taskqueue.models import Task
+from taskqueue.queue import task, enqueue, claim_next, run_pending
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode(value):
+    raise RuntimeError(value)
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+@pytest.mark.django_db
+class TestEnqueue:
+    """Tests for queueing tasks on commit"""
+
+    def test_task_queued_only_after_commit(self, django_capture_on_commit_callbacks):
+        """Nothing is written to the queue until the transaction commits"""
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            record.enqueue(value=1)
+            assert Task.objects.count() == 0
+
+        assert len(callbacks) == 1
+        queued = Task.objects.get()
+        assert queued.name == 'taskqueue.tests.record'
+        assert queued.kwargs == {'value': 1}
+
+    def test_rolled_back_transaction_queues_nothing(self, transactional_db):
+        """Tasks enqueued in a rolled-back transaction are dropped"""
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                enqueue('taskqueue.tests.record', value=1)
+                raise RuntimeError('rollback')
+
+        assert Task.objects.count() == 0
+
+    def test_eager_mode_runs_inline(self, settings, django_capture_on_commit_callbacks):
+        """With TASKS_EAGER the task runs on commit without a worker"""
+        settings.TASKS_EAGER = True
+        with django_capture_on_commit_callbacks(execute=True):
+            record.enqueue(value='now')
+
+        assert calls == ['now']
+        assert Task.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestWorker:
+    """Tests for claiming, running and retrying tasks"""
+
+    def test_run_pending_runs_and_removes_tasks(self):
+        """Successful tasks run once and leave the queue"""
+        Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'a'})
+        Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'b'})
+
+        assert run_pending() == 2
+        assert sorted(calls) == ['a', 'b']
+        assert Task.objects.count() == 0
+
+    def test_claimed_task_is_not_claimed_twice(self):
+        """A running task is invisible to other workers"""
+        Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'a'})
+
+        first = claim_next()
+
+        assert first is not None
+        assert first.attempts == 1
+        assert claim_next() is None
+
+    def test_failed_task_is_retried_with_backoff(self, settings):
+        """A failing task is rescheduled into the future"""
+        settings.TASKS_RETRY_DELAY = 10
+        Task.objects.create(name='taskqueue.tests.explode', kwargs={'value': 'x'}, max_attempts=2)
+
+        run_pending()
+
+        queued = Task.objects.get()
+        assert queued.status == Task.Status.PENDING
+        assert queued.run_after > timezone.now() + timedelta(seconds=5)
+        assert 'RuntimeError' in queued.last_error
+
+    def test_task_fails_after_max_attempts(self):
+        """Tasks stop retrying after max_attempts"""
+        Task.objects.create(name='taskqueue.tests.explode', kwargs={'value': 'x'}, max_attempts=2)
+
+        for _ in range(2):
+            run_pending()
+            Task.objects.update(run_after=timezone.now())
+
+        queued = Task.objects.get()
+        assert queued.status == Task.Status.FAILED
+        assert queued.attempts == 2
+        assert run_pending() == 0
+
+    def test_stale_running_task_is_reclaimed(self, settings):
+        """Tasks of a dead worker are picked up after the lease expires"""
+        settings.TASKS_LEASE_SECONDS = 60
+        Task.objects.create(
+            name='taskqueue.tests.record', kwargs={'value': 'late'},
+            status=Task.Status.RUNNING, attempts=1,
+            locked_at=timezone.now() - timedelta(seconds=120),
+        )
+
+        assert run_pending() == 1
+        assert calls == ['late']
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_claim_reads_the_primary(self, settings):
+        """Workers run outside requests, so claiming pins its reads to the primary itself"""
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+        settings.DATABASE_REPLICAS = ['replica']
+        queued = Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'a'})
+        Task.objects.using('replica').create(pk=queued.pk, name='taskqueue.tests.record', kwargs={'value': 'a'}, attempts=2)
+
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            claimed = claim_next()
+
+        assert (claimed.pk, claimed.attempts, claimed.status) == (queued.pk, 1, Task.Status.RUNNING)
+        assert len(replica_queries) == 0
+
+    def test_runworker_once_command(self):
+        """runworker --once drains the queue"""
+        from django.core.management import call_command
+        Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'cmd'})
+
+        call_command('runworker', '--once')
+
+        assert calls == ['cmd']
+
+
+@pytest.fixture
+def customer_client(db):
+    from accounts.models import User
+    User.objects.create_user(
+        username='customer@test.com', email='customer@test.com', name='Customer User',
+        password='CustomerPass123!', role='customer'
+    )
+    client = APIClient()
+    response = client.post(reverse('login'), {'email': 'customer@test.com', 'password': 'CustomerPass123!'}, format='json')
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+@pytest.fixture
+def sku(db):
+    from items.models import Item, SKU
+    item = Item.objects.create(name='Gulab Jamun', category='milk', sale_type='count', inventory_qty=10)
+    return SKU.objects.create(item=item, code='GJ-1', unit_value=1, price=2500)
+
+
+@pytest.mark.django_db
+class TestPurchaseTasks:
+    """Tests for post-purchase side effects"""
+
+    def test_purchase_queues_configured_tasks_after_commit(self, settings, customer_client, sku, django_capture_on_commit_callbacks):
+        """Each committed purchase queues PURCHASE_TASKS with its id"""
+        settings.PURCHASE_TASKS = ['taskqueue.tests.record']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 1}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Task.objects.get().kwargs == {'purchase_id': response.data['id']}
+
+    def test_rejected_purchase_queues_nothing(self, settings, customer_client, sku, django_capture_on_commit_callbacks):
+        """Purchases refused for stock do not queue side effects"""
+        settings.PURCHASE_TASKS = ['taskqueue.tests.record']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = customer_client.post(reverse('purchase'), {'sku_id': sku.id, 'quantity': 50}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Task.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestTaskAdmin:
+    """Tests for the operator view of the queue"""
+
+    @pytest.fixture
+    def admin_client(self):
+        from django.test import Client
+        from accounts.models import User
+        client = Client()
+        client.force_login(User.objects.create_superuser(
+            username='root@test.com', email='root@test.com', name='Root', password='RootPass123!'
+        ))
+        return client
+
+    def test_changelist_filters_by_status(self, admin_client):
+        """Operators can list failed tasks"""
+        Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 1})
+        Task.objects.create(name='taskqueue.tests.explode', kwargs={'value': 2}, status=Task.Status.FAILED)
+
+        response = admin_client.get(reverse('admin:taskqueue_task_changelist'), {'status__exact': 'failed'})
+
+        assert response.status_code == 200
+        assert [t.name for t in response.context['cl'].result_list] == ['taskqueue.tests.explode']
+
+    def test_retry_action_requeues_failed_tasks(self, admin_client):
+        """The retry action gives failed tasks a fresh run"""
+        failed = Task.objects.create(name='taskqueue.tests.record', kwargs={'value': 'again'},
+                                     status=Task.Status.FAILED, attempts=3, run_after=timezone.now() + timedelta(days=1))
+
+        admin_client.post(reverse('admin:taskqueue_task_changelist'),
+                          {'action': 'retry', '_selected_action': [failed.pk]})
+
+        assert run_pending() == 1
+        assert calls == ['again']